@@ -6,6 +6,7 @@ from app.utils.database import get_database
 import logging
 from datetime import datetime,timezone
 from app.monitoring.monitoring import FEEDBACK_RECEIVED
+from app.services.feedback_stats import FEEDBACK_COLLECTION, record_feedback
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -21,7 +22,7 @@ async def submit_feedback(feedback: Feedback):
     try:
         # Récupère la collection MongoDB
         db = await get_database()
-        collection = db["feedbacks_v1"]  # ou le nom que tu veux
+        collection = db[FEEDBACK_COLLECTION]
 
         # Convertit le feedback en dictionnaire
         feedback_data = feedback.model_dump()
@@ -33,6 +34,10 @@ async def submit_feedback(feedback: Feedback):
         # Insère dans MongoDB
         result = await collection.insert_one(feedback_data)
 
+        # Met à jour les stats matérialisées de la pratique dans le même chemin d'écriture
+        if feedback.practice_name:
+            await record_feedback(db, feedback.practice_name, feedback.rating)
+
         # Log + métrique Prometheus
         logger.info(f"Feedback sauvegardé avec ID {result.inserted_id}: {feedback}")
         FEEDBACK_RECEIVED.labels(rating=str(feedback.rating)).inc()
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness():
+    """Le processus répond : ne dépend d'aucun composant."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness(request: Request):
+    """
+    État de chargement de chaque composant (pending, loading, ready, failed) et sa durée.
+    200 quand tout est prêt ; 503 sinon, avec le statut "starting" (Retry-After) pendant le
+    chargement, ou "failed" (sans Retry-After : inutile d'attendre) si un composant a échoué.
+    """
+    components = request.app.state.components
+    if components.is_ready():
+        return JSONResponse(status_code=200, content={"status": "ready", "components": components.report()})
+    if components.has_failed():
+        return JSONResponse(status_code=503, content={"status": "failed", "components": components.report()})
+    return JSONResponse(
+        status_code=503,
+        content={"status": "starting", "components": components.report()},
+        headers={"Retry-After": "5"},
+    )
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
 
-from app.models.models import FreeTextRequest, QuestionnaireRequest, RecommendationResponse, ErrorResponse
-from app.services.nlp_analyzer import NLPAnalyzer
+from app.models.models import FreeTextRequest, QuestionnaireRequest, RecommendationResponse, ErrorResponse, BatchRecommendationRequest
+from app.services.nlp_executor import AsyncNLPAnalyzer
 from app.services.recommender import Recommender
-from app.services.rag_agent_service import RAGAgentService
+from app.services.sufficiency_classifier import schedule_validation_outcome
+from app.services.validation_pipeline import run_validation_pipeline
 from app.utils.dependencies import get_nlp_analyzer, get_recommender, get_rag_agent_service
 from app.utils.database import get_database
 from app.monitoring.monitoring import RECOMMENDATION_REQUESTS, RECOMMENDATION_LATENCY, API_ERRORS
 from app.utils.dependencies import get_input_validation_service
-from app.services.input_validation_service import InputValidationService
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    # Imports de typage seulement : ces modules chargent langchain / agno
+    from app.services.rag_agent_service import RAGAgentService
+    from app.services.input_validation_service import InputValidationService
 
 
 import logging 
@@ -28,10 +37,10 @@ router = APIRouter()
                         })
 async def recommend_from_text(
     request: FreeTextRequest,
-    validation_service: InputValidationService = Depends(get_input_validation_service),
-    nlp_analyzer: NLPAnalyzer = Depends(get_nlp_analyzer),
+    validation_service: "InputValidationService" = Depends(get_input_validation_service),
+    nlp_analyzer: AsyncNLPAnalyzer = Depends(get_nlp_analyzer),
     recommender: Recommender = Depends(get_recommender),
-    rag_agent: RAGAgentService = Depends(get_rag_agent_service)
+    rag_agent: "RAGAgentService" = Depends(get_rag_agent_service)
 ):
     """
     Receives free text from a user (transcripted speech or other), analyzes it, and returns a practice recommendation
@@ -48,8 +57,20 @@ async def recommend_from_text(
     # Valider l'entrée utilisateur
 
     # --- NOUVEAU FLUX DE VALIDATION ---
+    recommendations = None
     if request.text:
-        validation_result = await validation_service.validate_and_process_input(request.text)
+        # Validation, analyse NLP et scoring : en mode "speculative", l'analyse et le scoring
+        # du texte brut avancent pendant que l'agent de validation répond
+        settings = get_settings()
+        pipeline = await run_validation_pipeline(
+            request.text, validation_service, nlp_analyzer, recommender,
+            mode=settings.VALIDATION_PIPELINE, min_similarity=settings.SPECULATION_MIN_SIMILARITY,
+        )
+        validation_result = pipeline.validation
+        if validation_result.get("source") == "llm" and settings.SUFFICIENCY_LOG_OUTCOMES:
+            # Décisions du LLM journalisées pour le réentraînement du pré-classifieur (tâche de fond)
+            schedule_validation_outcome(await get_database(), nlp_analyzer, request.text, validation_result,
+                                        settings.EMBEDDING_MODEL_NAME, settings.SUFFICIENCY_OUTCOMES_TTL_DAYS)
 
         # premier check d'urgence : mots clés qui nécessitent une action immédiate
         if validation_result["status"] == "emergency":
@@ -61,22 +82,21 @@ async def recommend_from_text(
             "veuillez fournir plus de détails sur vos symptômes, vous pouvez également répondre à un questionnaire pour obtenir une recommandation plus précise.")
 
         
-        # Le contexte est suffisant, on utilise le texte corrigé
+        # Le contexte est suffisant : analyse du texte corrigé (ou analyse spéculative réutilisée)
         # 1. Analyze input
-        logger.info("Starting NLP analysis on free text...")
-        logger.info(f"✅ Text to analyze: {validation_result['corrected_text']}")
-        text_to_analyze = validation_result["corrected_text"]
-        nlp_analysis = nlp_analyzer.analyze_free_text(text_to_analyze)
+        logger.info(f"✅ Text analyzed: {validation_result['corrected_text']}")
+        nlp_analysis = pipeline.nlp_analysis
+        recommendations = pipeline.recommendations
 
     elif request.responses:
         # Pour le questionnaire, on saute la validation de contexte
-        nlp_analysis = nlp_analyzer.analyze_questionnaire_responses(request.responses)
+        nlp_analysis = await nlp_analyzer.analyze_questionnaire_responses(request.responses)
     else:
         raise HTTPException(status_code=400, detail="Request must contain either 'text' or 'responses'.")
     # --- FIN DU NOUVEAU FLUX DE VALIDATION ---
 
     
-    #nlp_analysis = nlp_analyzer.analyze_free_text(request.text)
+    #nlp_analysis = await nlp_analyzer.analyze_free_text(request.text)
     if not nlp_analysis or nlp_analysis.get("user_embedding") is None:
 
         API_ERRORS.labels(error_type='nlp_analysis').inc() # Incrémenter le compteur d'erreur (metrique promotheus)
@@ -85,8 +105,9 @@ async def recommend_from_text(
     logger.info("NLP analysis successful.")
 
     # 2. Get top recommendations
-    logger.info("Fetching recommendations...")
-    recommendations = await recommender.recommend(nlp_analysis)
+    if recommendations is None:
+        logger.info("Fetching recommendations...")
+        recommendations = await recommender.recommend(nlp_analysis)
     if not recommendations:
         RECOMMENDATION_REQUESTS.labels(input_type=input_type, match_found='false').inc() # Incrémenter le compteur
         logger.warning(f"No recommendations found for session: {request.session_id}")
@@ -106,10 +127,11 @@ async def recommend_from_text(
     practice_id = top_recommendation.get("_id")
     logger.info(f"Fetching data for practice ID: {practice_id}")
     db = await get_database()
-    practice_data = await db.practices.find_one({"_id": practice_id})
+    practice_data = await db.practices.find_one({"_id": practice_id}, {"embedding": 0})
 
     #  Extraire les besoins de l'utilisateur pour l'agent RAG
-    user_needs_list = [s['keyword'] for s in nlp_analysis.get("structured_analysis", {}).get("symptoms", [])]
+    symptoms = nlp_analysis.get("structured_analysis", {}).get("symptoms", [])
+    user_needs_list = [s['keyword'] for s in symptoms]
     user_needs = ", ".join(user_needs_list)
     
     if not practice_data:
@@ -119,7 +141,8 @@ async def recommend_from_text(
     # 4. Generate detailed advice with RAG agent
     generated_advice = await rag_agent.generate_advice(
         user_needs=user_needs,
-        practices=recommendations[:2]
+        practices=recommendations[:2],
+        categories=sorted({s['category'] for s in symptoms})
     )
     logger.info("Advice generated successfully.")
 
@@ -143,9 +166,9 @@ async def recommend_from_text(
              responses={404: {"model": ErrorResponse}})
 async def recommend_from_questionnaire(
     request: QuestionnaireRequest,
-    nlp_analyzer: NLPAnalyzer = Depends(get_nlp_analyzer),
+    nlp_analyzer: AsyncNLPAnalyzer = Depends(get_nlp_analyzer),
     recommender: Recommender = Depends(get_recommender),
-    rag_agent: RAGAgentService = Depends(get_rag_agent_service)
+    rag_agent: "RAGAgentService" = Depends(get_rag_agent_service)
 ):
     """
     Receives questionnaire responses, analyzes them, and returns a practice
@@ -157,7 +180,7 @@ async def recommend_from_questionnaire(
 
     # 1. Analyze questionnaire responses directly
     logger.info("Starting NLP analysis on questionnaire responses...")
-    nlp_analysis = nlp_analyzer.analyze_questionnaire_responses(request.responses)
+    nlp_analysis = await nlp_analyzer.analyze_questionnaire_responses(request.responses)
     if not nlp_analysis or nlp_analysis.get("user_embedding") is None:
         API_ERRORS.labels(error_type='nlp_analysis').inc() 
         logger.error(f"NLP analysis failed for session: {request.session_id}. Questionnaire response was empty or invalid.")
@@ -185,7 +208,7 @@ async def recommend_from_questionnaire(
     # 3. Fetch full data for the top recommended practice
     logger.info(f"Fetching data for practice ID: {top_recommendation.get('_id')}")
     db = await get_database()
-    practice_data = await db.practices.find_one({"_id": top_recommendation.get("_id")})
+    practice_data = await db.practices.find_one({"_id": top_recommendation.get("_id")}, {"embedding": 0})
     
     if not practice_data:
         logger.error(f"Practice with ID {top_recommendation.get('_id')} found in recommender but not in DB.")
@@ -216,3 +239,80 @@ async def recommend_from_questionnaire(
 
 
 
+# Endpoint for batch recommendations (campagnes de re-recommandation, intégrations partenaires)
+
+@router.post("/recommendations/batch",
+             response_class=StreamingResponse,
+             responses={200: {"content": {"application/x-ndjson": {}},
+                              "description": "Un objet JSON par ligne et par item, dans l'ordre de la requête."}})
+async def recommend_batch(
+    request: BatchRecommendationRequest,
+    http_request: Request,
+    validation_service: "InputValidationService" = Depends(get_input_validation_service),
+    nlp_analyzer: AsyncNLPAnalyzer = Depends(get_nlp_analyzer),
+    recommender: Recommender = Depends(get_recommender)
+):
+    """
+    Recommends practices for many profiles at once. Items are analyzed in chunks
+    (spaCy nlp.pipe + one batched encode) and scored against the practice matrix in
+    one matrix multiply. Results are streamed back as NDJSON while they are produced.
+    The LLM validation is skipped; the local red-flag check still applies.
+    """
+    # Le service RAG n'est requis que pour les conseils : sans eux, la route ne dépend pas de Qdrant
+    rag_agent: "RAGAgentService" = get_rag_agent_service(http_request) if request.generate_advice else None
+    chunk_size = get_settings().BATCH_RECOMMENDATION_CHUNK_SIZE
+    items = request.items
+    logger.info(f"Received batch recommendation request: {len(items)} items, generate_advice={request.generate_advice}")
+
+    async def _stream():
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            results = [None] * len(chunk)
+            inputs, positions = [], []
+
+            # 1. Premier check d'urgence (local), puis préparation des entrées à analyser
+            for i, item in enumerate(chunk):
+                if item.text:
+                    if validation_service.check_for_red_flags(item.text):
+                        results[i] = {"session_id": item.session_id, "status": "emergency",
+                                      "message": "Vos symptômes semblent nécessiter une attention médicale immédiate. Veuillez consulter un professionnel de santé sans tarder."}
+                        continue
+                    inputs.append(item.text)
+                elif item.responses:
+                    inputs.append(item.responses)
+                else:
+                    results[i] = {"session_id": item.session_id, "status": "invalid",
+                                  "message": "Item must contain either 'text' or 'responses'."}
+                    continue
+                positions.append(i)
+
+            # 2. Analyse NLP du lot (dans l'exécuteur NLP) puis scoring matriciel
+            analyses = await nlp_analyzer.analyze_many(inputs) if inputs else []
+            recommendations = await recommender.recommend_many(analyses)
+
+            for i, analysis, recs in zip(positions, analyses, recommendations):
+                item = chunk[i]
+                if analysis.get("user_embedding") is None:
+                    API_ERRORS.labels(error_type='nlp_analysis').inc()
+                    results[i] = {"session_id": item.session_id, "status": "invalid", "message": "Could not process input."}
+                    continue
+                if not recs:
+                    RECOMMENDATION_REQUESTS.labels(input_type='batch', match_found='false').inc()
+                    results[i] = {"session_id": item.session_id, "status": "no_match", "recommendations": []}
+                    continue
+
+                RECOMMENDATION_REQUESTS.labels(input_type='batch', match_found='true').inc()
+                results[i] = {"session_id": item.session_id, "status": "ok", "recommendations": recs}
+
+                # 3. Conseils RAG optionnels (désactivés par défaut)
+                if request.generate_advice:
+                    symptoms = analysis["structured_analysis"].get("symptoms", [])
+                    user_needs = ", ".join(s['keyword'] for s in symptoms)
+                    results[i]["generated_advice"] = await rag_agent.generate_advice(
+                        user_needs=user_needs, practices=recs[:2], categories=sorted({s['category'] for s in symptoms})
+                    )
+
+            for result in results:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
@@ -16,9 +16,98 @@ class Settings(BaseSettings):
     QDRANT_API_KEY: str
     QDRANT_COLLECTION_NAME: str
     GEMINI_EMBEDDING_MODEL_NAME: str = "models/text-embedding-004" 
+    # Recherche dense RAG (client asynchrone) : connexions simultanées max, délai par appel, gRPC ou REST
+    QDRANT_POOL_SIZE: int = 16
+    QDRANT_QUERY_TIMEOUT_SECONDS: float = 5.0
+    QDRANT_PREFER_GRPC: bool = False
     
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Stockage des embeddings des pratiques : "binary" (float32 packé) ou "list" (ancien format)
+    EMBEDDING_STORAGE: str = "binary"
+    # Backend d'embedding des requêtes : "torch" (SentenceTransformer) ou "onnx" (ONNX Runtime int8, CPU).
+    # Activer "onnx" seulement après app/scripts/check_embedding_parity.py.
+    EMBEDDING_BACKEND: str = "torch"
+    ONNX_MODEL_DIR: str = str(Path(__file__).resolve().parent / "data" / "onnx_embedding")
+    ONNX_INTRA_OP_THREADS: int = 2
+
+    # Exécution de l'analyse NLP hors de la boucle d'événements : "thread", "process"
+    # ou "remote" (serveur de modèles local : python -m app.services.model_server)
+    NLP_EXECUTOR: str = "thread"
+    NLP_EXECUTOR_WORKERS: int = 2
+    # Budget de threads intra-op torch (par worker en mode "process", global en mode "thread")
+    NLP_TORCH_THREADS: int = 2
+    # Nombre maximal d'analyses en attente ou en cours avant de répondre 503
+    NLP_MAX_QUEUE_DEPTH: int = 32
+    # Serveur de modèles : socket Unix, emplacements de mémoire partagée par worker (lignes d'embedding par slot)
+    MODEL_SERVER_SOCKET: str = "/tmp/holistic-model-server.sock"
+    MODEL_SERVER_SHM_SLOTS: int = 16
+    MODEL_SERVER_SHM_SLOT_ROWS: int = 64
+    MODEL_SERVER_TIMEOUT_SECONDS: float = 30.0
+
+    # Micro-batching des embeddings entre requêtes concurrentes
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0
+
+    # Cache des analyses NLP (texte normalisé + version des modèles -> analyse + embedding)
+    NLP_CACHE_ENABLED: bool = True
+    NLP_CACHE_MAX_ENTRIES: int = 10000
+    NLP_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Analyse des QCM par agrégation des options précalculées (sans inférence)
+    QUESTIONNAIRE_FAST_PATH: bool = True
+
+    # Taille des lots traités par l'endpoint /recommendations/batch
+    BATCH_RECOMMENDATION_CHUNK_SIZE: int = 64
+
+    # Index ANN (IVF + int8) : utilisé seulement à partir de ANN_MIN_PRACTICES pratiques.
+    # ANN_NPROBE est le réglage rappel/latence (plus de clusters parcourus = meilleur rappel).
+    ANN_ENABLED: bool = True
+    ANN_MIN_PRACTICES: int = 2000
+    ANN_NPROBE: int = 8
+    ANN_CANDIDATES: int = 200
+    ANN_N_LISTS: Optional[int] = None
+    ANN_INDEX_DIR: str = str(Path(__file__).resolve().parent / "data" / "ann_index")
+
+    # Index lexical BM25 du corpus RAG (reconstruit si les ids ou payloads des points Qdrant ont changé)
+    SPARSE_INDEX_DIR: str = str(Path(__file__).resolve().parent / "data" / "sparse_index")
+
+    # Contextes RAG précalculés par (pratique, combinaison d'au plus CONTEXT_TABLE_MAX_CATEGORIES
+    # catégories de symptômes), voir app/scripts/build_context_table.py. Ignorés si la collection a changé.
+    CONTEXT_TABLE_ENABLED: bool = True
+    CONTEXT_TABLE_PATH: str = str(Path(__file__).resolve().parent / "data" / "context_table.json")
+    CONTEXT_TABLE_MAX_CATEGORIES: int = 2
+
+    # Instantané du catalogue écrit par le maître en mode prefork (gunicorn.conf.py), relu en mmap
+    PRACTICE_SNAPSHOT_DIR: str = str(Path(__file__).resolve().parent / "data" / "practice_snapshot")
+
+    # Durée (secondes) entre deux relectures des stats de feedback en mémoire
+    FEEDBACK_STATS_TTL_SECONDS: float = 30.0
     GEMINI_MODEL_NAME: str = "gemini-2.0-flash-lite"
+    # Pré-classifieur local de suffisance du contexte (app/scripts/train_sufficiency_classifier.py) :
+    # seules les entrées de la bande incertaine sont envoyées au LLM. Une part SUFFICIENCY_SHADOW_RATE
+    # des décisions locales est tout de même vérifiée par le LLM pour mesurer l'accord.
+    SUFFICIENCY_CLASSIFIER_ENABLED: bool = True
+    SUFFICIENCY_MODEL_PATH: str = str(Path(__file__).resolve().parent / "data" / "sufficiency_classifier.npz")
+    SUFFICIENCY_SHADOW_RATE: float = 0.05
+    # Journaliser les décisions du LLM (données d'entraînement du pré-classifieur), sur option :
+    # empreinte, embedding et caractéristiques du texte (pas le texte brut), supprimés après
+    # SUFFICIENCY_OUTCOMES_TTL_DAYS jours (index TTL)
+    SUFFICIENCY_LOG_OUTCOMES: bool = False
+    SUFFICIENCY_OUTCOMES_TTL_DAYS: float = 90.0
+    # Cache des réponses de l'agent de validation (texte normalisé + version du prompt).
+    # Partagé via Redis si REDIS_URL est défini, sinon en mémoire du processus.
+    VALIDATION_CACHE_ENABLED: bool = True
+    VALIDATION_CACHE_MAX_ENTRIES: int = 10000
+    VALIDATION_CACHE_TTL_SECONDS: float = 86400.0
+    REDIS_URL: Optional[str] = None
+    REDIS_TIMEOUT_SECONDS: float = 0.2
+    # Requêtes en texte libre : "speculative" (analyse et scoring du texte brut pendant la validation LLM)
+    # ou "sequential". Le résultat spéculatif est gardé si le texte corrigé reste assez similaire.
+    VALIDATION_PIPELINE: str = "speculative"
+    SPECULATION_MIN_SIMILARITY: float = 0.9
+    # Profil spaCy : "slim" (fr_core_news_lg sans parser ni NER), "small" (fr_core_news_sm) ou "full"
+    SPACY_PROFILE: str = "slim"
 
     # Security settings
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "a_very_secret_key_that_should_be_changed")
@@ -31,6 +120,8 @@ class Settings(BaseSettings):
 
     # Variable pour détecter si on est en mode test
     TESTING: bool = False
+    # Attendre le chargement de tous les composants avant de servir (sinon chargement en arrière-plan)
+    STARTUP_BLOCKING: bool = False
 
     class Config:
         # --- CHANGE HERE ---
@@ -1,15 +1,20 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-from app.api.routes import recommandations,questionnaire,feedback,auth
+from app.api.routes import recommandations,questionnaire,feedback,auth,health
 from app.utils.database import connect_to_mongo, close_mongo_connection
 from app.config import get_settings
 from fastapi.middleware.cors import CORSMiddleware 
 
 from app.logging_config import setup_logging 
 from prometheus_fastapi_instrumentator import Instrumentator
-from app.services.rag_agent_service import RAGAgentService
-from app.services.nlp_analyzer import NLPAnalyzer
-from app.services.input_validation_service import InputValidationService
+from app.services.model_client import RemoteNLPAnalyzer
+from app.services.nlp_executor import NLPQueueFullError, create_nlp_analyzer
+from app.services.recommender import Recommender
+from app.utils.readiness import ComponentNotReadyError, ComponentRegistry
+
+logger = logging.getLogger(__name__)
 
 
   
@@ -24,19 +29,69 @@ async def lifespan(app: FastAPI):
     settings = app.settings
 
 
-    # 1. J'ai instancié le service RAGAgentService ici pour qu'il soit disponible dans toute l'application
-    app.state.rag_service = RAGAgentService(settings=settings)
+    # Les composants lourds sont chargés en parallèle, en arrière-plan : l'application répond
+    # immédiatement (/health/live) et les routes renvoient 503 tant que leurs dépendances ne sont pas prêtes.
+    components = ComponentRegistry()
+    app.state.components = components
 
-    #2. Instanciation du NLPAnalyzer
-    app.state.nlp_analyzer = NLPAnalyzer()
+    # 1. J'ai instancié le service RAGAgentService ici pour qu'il soit disponible dans toute l'application
+    # (les modules lourds - langchain, agno, torch, spaCy - ne sont importés qu'au chargement du composant)
+    def load_rag_service():
+        from app.services.rag_agent_service import RAGAgentService
+        return RAGAgentService(settings=settings)
+
+    components.register("rag_service", load_rag_service)
+
+    #2. Instanciation du NLPAnalyzer, exécuté hors de la boucle d'événements (pool de threads ou de processus),
+    # ou dans le serveur de modèles local (NLP_EXECUTOR="remote") : ce processus ne charge alors aucun modèle
+    async def load_nlp_analyzer():
+        if settings.NLP_EXECUTOR == "remote":
+            return await RemoteNLPAnalyzer.connect(
+                settings.MODEL_SERVER_SOCKET,
+                slots=settings.MODEL_SERVER_SHM_SLOTS,
+                slot_rows=settings.MODEL_SERVER_SHM_SLOT_ROWS,
+                timeout=settings.MODEL_SERVER_TIMEOUT_SECONDS,
+            )
+        return await create_nlp_analyzer(settings)
+
+    components.register("nlp_analyzer", load_nlp_analyzer)
 
     #3. Initialiser le service de validation
-    app.state.validation_service = InputValidationService(settings=settings)
+    def load_validation_service():
+        from app.services.input_validation_service import InputValidationService
+        from app.services.sufficiency_classifier import load_sufficiency_classifier
+        return InputValidationService(settings=settings, sufficiency_classifier=load_sufficiency_classifier(settings))
+
+    components.register("validation_service", load_validation_service)
 
     # 4. Connect to MongoDB
     await connect_to_mongo()
+
+    # 5. Index des pratiques résident en mémoire, partagé par toutes les requêtes
+    async def load_recommender() -> Recommender:
+        recommender = Recommender()
+        try:
+            await recommender.load_index()
+        except Exception as e:
+            # L'index sera chargé à la première recommandation si MongoDB n'est pas encore prêt
+            logger.warning(f"Practice index not loaded at startup: {e}")
+        return recommender
+
+    components.register("recommender", load_recommender)
+
+    components.start()
+    if settings.TESTING or settings.STARTUP_BLOCKING:
+        # Tests et déploiements sans sonde de readiness : on attend que tout soit chargé
+        await components.wait()
     yield
     # On shutdown
+    await components.shutdown()
+    nlp_analyzer = components.get_if_ready("nlp_analyzer")
+    if nlp_analyzer is not None:
+        nlp_analyzer.shutdown()
+    rag_service = components.get_if_ready("rag_service")
+    if rag_service is not None:
+        await rag_service.aclose()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -74,11 +129,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(NLPQueueFullError)
+async def nlp_queue_full_handler(request: Request, exc: NLPQueueFullError):
+    """La file d'analyse NLP est saturée : réponse rapide, le client réessaie plus tard."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Le service d'analyse est momentanément saturé, veuillez réessayer."},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(ComponentNotReadyError)
+async def component_not_ready_handler(request: Request, exc: ComponentNotReadyError):
+    """Un composant requis par la route est encore en cours de chargement : 503 rapide."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Le service démarre ({exc.name} : {exc.state}), veuillez réessayer."},
+        headers={"Retry-After": "5"},
+    )
+
 # Include API routers
 app.include_router(feedback.router, prefix="/api/v1/feedback", tags=["Feedback"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(recommandations.router, prefix="/api/v1", tags=["Recommendations"])
 app.include_router(questionnaire.router, prefix="/api/v1/questionnaire", tags=["Questionnaire"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
 
 
 
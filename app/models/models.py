@@ -14,6 +14,15 @@ class QuestionnaireRequest(BaseModel):
     session_id: str = Field(..., description="A unique identifier for the user session.")
     responses: Dict[str, Any] = Field(..., description="User's answers from the questionnaire.")
 
+class BatchRecommendationItem(BaseModel):
+    session_id: str = Field(..., description="Identifier echoed back with this item's result.")
+    text: Optional[str] = Field(None, description="Free-text description of the symptoms.")
+    responses: Optional[Dict[str, Any]] = Field(None, description="Questionnaire answers, used when no text is given.")
+
+class BatchRecommendationRequest(BaseModel):
+    items: List[BatchRecommendationItem] = Field(..., min_length=1, description="Profiles to recommend for.")
+    generate_advice: bool = Field(False, description="Also generate the RAG advice for each item (slow).")
+
 # --- Data Models ---
 
 class Recommendation(BaseModel):
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Histogram, Gauge
 
 # --- Métriques de Recommandation ---
 
@@ -46,3 +46,153 @@ API_ERRORS = Counter(
     "Total number of critical API errors.",
     ["error_type"]
 )
+
+# --- Métriques de l'exécuteur NLP ---
+
+# 6. Histogram: Temps d'attente d'une analyse NLP dans la file de l'exécuteur.
+# Label:
+# - operation: 'analyze_free_text', 'analyze_questionnaire_responses', 'analyze_many'
+NLP_QUEUE_WAIT = Histogram(
+    "nlp_queue_wait_seconds",
+    "Time an NLP analysis waits in the executor queue before it starts.",
+    ["operation"]
+)
+
+# 7. Histogram: Temps de calcul d'une analyse NLP (spaCy + embedding).
+NLP_COMPUTE_TIME = Histogram(
+    "nlp_compute_seconds",
+    "Time spent computing an NLP analysis in the executor.",
+    ["operation"]
+)
+
+# 8. Gauge: Nombre d'analyses NLP en attente ou en cours.
+NLP_QUEUE_DEPTH = Gauge(
+    "nlp_queue_depth",
+    "Number of NLP analyses queued or running in the executor."
+)
+
+# 9. Counter: Analyses refusées car la file de l'exécuteur NLP est pleine.
+NLP_QUEUE_REJECTED = Counter(
+    "nlp_queue_rejected_total",
+    "Total number of NLP analyses rejected because the executor queue was full."
+)
+
+# --- Métriques du micro-batching des embeddings ---
+
+# 10. Histogram: Nombre de textes encodés par passage du modèle d'embedding.
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Number of texts encoded per embedding model call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+# 11. Histogram: Temps passé par un texte dans la fenêtre de batching avant l'encodage.
+EMBEDDING_BATCH_WAIT = Histogram(
+    "embedding_batch_wait_seconds",
+    "Time a text waits in the batching window before its batch is encoded.",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+)
+
+# --- Métriques du cache d'analyses NLP ---
+
+# 12. Counter: Consultations du cache d'analyses NLP.
+# Label:
+# - result: 'hit' ou 'miss'
+NLP_ANALYSIS_CACHE = Counter(
+    "nlp_analysis_cache_requests_total",
+    "Total number of NLP analysis cache lookups.",
+    ["result"]
+)
+
+# --- Métriques de démarrage ---
+
+# 13. Gauge: Durée de chargement de chaque composant au démarrage (jusqu'au succès ou à l'échec).
+# Labels:
+# - component: 'nlp_analyzer', 'rag_service', 'validation_service', 'recommender'
+# - state: 'ready' ou 'failed'
+COMPONENT_STARTUP_SECONDS = Gauge(
+    "component_startup_seconds",
+    "Time taken to load each application component at startup.",
+    ["component", "state"]
+)
+
+# --- Métriques de la validation des entrées ---
+
+# 14. Counter: Décisions de suffisance du contexte, par origine.
+# Label:
+# - source: 'local' (pré-classifieur, appel LLM évité), 'llm' (bande incertaine ou pas de classifieur),
+#   'cache' (réponse de l'agent déjà en cache), 'shadow' (décision locale contrôlée par le LLM)
+# Taux d'évitement : rate(...{source="local"}) / rate(validation_decisions_total)
+VALIDATION_DECISIONS = Counter(
+    "validation_decisions_total",
+    "Total number of context sufficiency decisions, by source.",
+    ["source"]
+)
+
+# 15. Counter: Accord entre le pré-classifieur et le LLM sur les décisions contrôlées (échantillon 'shadow').
+# Label:
+# - agreed: 'true' ou 'false'
+VALIDATION_AGREEMENT = Counter(
+    "validation_classifier_agreement_total",
+    "Total number of shadow-checked local sufficiency decisions, by agreement with the LLM.",
+    ["agreed"]
+)
+
+# 16. Histogram: Durée de l'étape validation + analyse NLP + scoring d'une requête en texte libre.
+# Label:
+# - mode: 'sequential' ou 'speculative'
+VALIDATION_PIPELINE_LATENCY = Histogram(
+    "validation_pipeline_latency_seconds",
+    "Latency of input validation, NLP analysis and practice scoring for a free-text request.",
+    ["mode"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+)
+
+# 17. Counter: Devenir des analyses spéculatives lancées pendant la validation.
+# Label:
+# - outcome: 'reused' (texte corrigé proche), 'redone' (texte réanalysé), 'abandoned' (urgence, contexte insuffisant)
+SPECULATION_OUTCOMES = Counter(
+    "validation_speculation_outcomes_total",
+    "Total number of speculative NLP analyses started during validation, by outcome.",
+    ["outcome"]
+)
+
+# 18. Counter: Consultations du cache des réponses de l'agent de validation.
+# Label:
+# - result: 'local_hit', 'redis_hit', 'miss' ou 'coalesced' (appel LLM déjà en cours pour le même texte)
+VALIDATION_CACHE = Counter(
+    "validation_cache_requests_total",
+    "Total number of validation result cache lookups.",
+    ["result"]
+)
+
+# --- Métriques de la recherche RAG ---
+
+# 19. Histogram: Durée de chaque étape de la recherche hybride (un lot de requêtes par appel).
+# Label:
+# - stage: 'embed', 'dense', 'sparse', 'fusion' ou 'total'
+RAG_RETRIEVAL_STAGE_SECONDS = Histogram(
+    "rag_retrieval_stage_seconds",
+    "Duration of each hybrid retrieval stage for one batch of queries.",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# 20. Counter: Requêtes RAG restreintes à une pratique (filtre de payload / postings BM25).
+# Labels:
+# - retriever: 'dense' ou 'sparse'
+# - result: 'filtered' (chunks de la pratique) ou 'fallback' (aucun chunk étiqueté : recherche non filtrée)
+RAG_PRACTICE_FILTER = Counter(
+    "rag_practice_filter_total",
+    "Total number of practice-scoped retrieval queries, by retriever and result.",
+    ["retriever", "result"]
+)
+
+# 21. Counter: Contextes de conseil servis par la table précalculée ou par une recherche en direct.
+# Label:
+# - result: 'hit' (combinaison précalculée) ou 'miss' (recherche en direct)
+RAG_CONTEXT_TABLE = Counter(
+    "rag_context_table_requests_total",
+    "Total number of per-practice advice contexts looked up in the precomputed context table.",
+    ["result"]
+)
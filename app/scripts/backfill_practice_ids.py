@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from motor.motor_asyncio import AsyncIOMotorClient
+from qdrant_client import QdrantClient
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import get_settings
+from services.retrieval import ensure_practice_payload_index
+from services.sparse_index import SparseIndex, scroll_documents
+from utils.aho_corasick import AhoCorasick
+from utils.text import fold, normalize_practice_id
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+# Occurrences minimales du nom d'une pratique dans un chunk pour l'y rattacher
+MIN_MENTIONS = 2
+
+
+async def load_practice_names():
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    names = [doc["practice"]["name"] async for doc in db[COLLECTION_NAME].find({}, {"practice.name": 1})]
+    client.close()
+    return names
+
+
+def infer_practice(matcher: AhoCorasick, document) -> str:
+    """Pratique d'un chunk : celle nommée dans le fichier source, sinon la plus citée dans le texte."""
+    file_name = fold(document["metadata"].get("file_name") or document["metadata"].get("url") or "")
+    in_file_name = {practice_id for _, _, practice_id in matcher.iter_matches(file_name)}
+    if len(in_file_name) == 1:
+        return in_file_name.pop()
+    mentions = Counter(practice_id for _, _, practice_id in matcher.iter_matches(fold(document["page_content"])))
+    ranked = mentions.most_common(2)
+    if ranked and ranked[0][1] >= MIN_MENTIONS and (len(ranked) == 1 or ranked[0][1] > ranked[1][1]):
+        return ranked[0][0]
+    return ""
+
+
+def main():
+    """
+    Tags the chunks already stored in Qdrant with `metadata.practice_id`, creates the payload index
+    and rebuilds the persisted BM25 index so that practice-scoped retrieval covers the existing corpus.
+    Chunks whose practice cannot be inferred stay untagged (retrieval falls back to an unfiltered search).
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Only report the inferred practices.")
+    args = parser.parse_args()
+
+    names = asyncio.run(load_practice_names())
+    matcher = AhoCorasick((fold(name), normalize_practice_id(name)) for name in names)
+    client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=60)
+    collection = settings.QDRANT_COLLECTION_NAME
+
+    points_by_practice = defaultdict(list)
+    untagged = 0
+    for document in scroll_documents(client, collection):
+        if document["metadata"].get("practice_id"):
+            continue
+        practice_id = infer_practice(matcher, document)
+        if practice_id:
+            points_by_practice[practice_id].append(document["id"])
+        else:
+            untagged += 1
+
+    for practice_id, point_ids in sorted(points_by_practice.items()):
+        print(f"{practice_id}: {len(point_ids)} chunks")
+    print(f"Chunks left untagged: {untagged}")
+    if args.dry_run:
+        return
+
+    ensure_practice_payload_index(client, collection)
+    for practice_id, point_ids in points_by_practice.items():
+        client.set_payload(collection_name=collection, payload={"practice_id": practice_id},
+                           points=point_ids, key="metadata")
+
+    # Le nombre de points n'a pas changé : l'index BM25 doit être reconstruit explicitement
+    index = SparseIndex.build(scroll_documents(client, collection), meta={"collection": collection})
+    index.save(settings.SPARSE_INDEX_DIR)
+    print(f"Sparse index rebuilt ({index.n_docs} documents, {len(index.practices)} practices).")
+
+
+if __name__ == "__main__":
+    main()
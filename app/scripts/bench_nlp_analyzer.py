@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.vocabulary import HOLISTIC_KEYWORDS, URGENCY_LEVELS, URGENCY_MARKERS, DEFAULT_URGENCY, VocabularyMatcher
+
+SAMPLE_TEXTS = [
+    "Je suis très stressé au travail et je dors mal depuis des semaines, la fatigue est insupportable.",
+    "J'ai des douleurs au dos occasionnelles, surtout le matin, et un peu d'anxiété.",
+    "Ma digestion est difficile après les repas et je me sens ballonné.",
+    "Je souhaite améliorer ma concentration et réduire mon stress, rien de grave.",
+    "Migraines intenses plusieurs fois par semaine, c'est très gênant pour mon travail.",
+]
+
+
+def legacy_match(text: str):
+    """Ancienne implémentation : un test de sous-chaîne par mot-clé et par marqueur."""
+    text_lower = text.lower()
+    symptoms = []
+    for category, keywords in HOLISTIC_KEYWORDS.items():
+        for keyword in keywords:
+            if keyword.replace('_', ' ') in text_lower:
+                symptoms.append({'category': category, 'keyword': keyword})
+    symptoms = [dict(t) for t in {tuple(d.items()) for d in symptoms}]
+    for level in ('high', 'medium', 'low'):
+        if any(marker in text_lower for marker in URGENCY_MARKERS[level]):
+            return symptoms, URGENCY_LEVELS[level]
+    return symptoms, DEFAULT_URGENCY
+
+
+def timed(fn, texts):
+    """Per-document latencies in milliseconds."""
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        fn(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    print(f"{label:<28} mean={statistics.mean(ordered):8.3f} ms  p50={statistics.median(ordered):8.3f} ms  p95={p95:8.3f} ms")
+
+
+def main(n_docs: int, profiles):
+    """
+    Benchmark of the NLPAnalyzer hot path: keyword/urgency matching (legacy substring scans
+    vs compiled automaton) and spaCy pipeline profiles (full vs slim vs small).
+    """
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(SAMPLE_TEXTS) for _ in range(rng.randint(1, 4))) for _ in range(n_docs)]
+
+    matcher = VocabularyMatcher()
+    mismatches = 0
+    for text in texts:
+        legacy_symptoms, legacy_urgency = legacy_match(text)
+        symptoms, urgency = matcher.match(text)
+        key = lambda s: (s['category'], s['keyword'])
+        if sorted(map(key, legacy_symptoms)) != sorted(map(key, symptoms)) or legacy_urgency != urgency:
+            mismatches += 1
+    print(f"{n_docs} documents, {mismatches} output mismatches between legacy and automaton.")
+    report("matching: legacy scans", timed(legacy_match, texts))
+    report("matching: automaton", timed(matcher.match, texts))
+
+    if not profiles:
+        return
+    from services.nlp_analyzer import load_spacy_pipeline
+    for profile in profiles:
+        nlp = load_spacy_pipeline(profile)
+        nlp(texts[0].lower())  # warm-up
+        report(f"spaCy: {profile} {nlp.pipe_names}", timed(lambda t: nlp(t.lower()), texts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the NLP analyzer matching and spaCy profiles.")
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--profiles", nargs="*", default=["full", "slim"],
+                        help="spaCy profiles to compare (empty to skip spaCy).")
+    args = parser.parse_args()
+    main(args.docs, args.profiles)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from fuzzywuzzy import fuzz
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.red_flags import RED_FLAGS, RedFlagDetector
+
+SYMPTOMS = ["douleur", "engourdissement", "saignement", "gonflement", "brûlure", "paralysie", "raideur", "perte"]
+LOCATIONS = ["nuque", "bras", "jambe", "visage", "ventre", "poitrine", "mâchoire", "épaule", "œil", "dos"]
+MODIFIERS = ["soudain", "brutal", "intense", "persistant", "inhabituel", "nocturne"]
+TEXTS = [
+    "Je suis très stressé au travail et je dors mal depuis des semaines, je me réveille fatigué.",
+    "J'ai des douleurs au dos occasionnelles, surtout le matin, et un peu d'anxiété le soir.",
+    "Ma digestion est difficile après les repas, je me sens ballonné et j'ai souvent des maux de tête.",
+]
+
+
+def vocabulary(size: int):
+    rng = random.Random(size)
+    flags = list(RED_FLAGS)
+    while len(flags) < size:
+        flags.append(f"{rng.choice(SYMPTOMS)} {rng.choice(LOCATIONS)} {rng.choice(MODIFIERS)}")
+        flags = list(dict.fromkeys(flags))
+    return flags
+
+
+def legacy_check(text, flags):
+    """Ancienne implémentation : sous-chaîne puis partial_ratio sur tout le texte, pour chaque expression."""
+    text_lower = text.lower()
+    for flag in flags:
+        if flag in text_lower or fuzz.partial_ratio(text_lower, flag) > 80:
+            return True
+    return False
+
+
+def latency_ms(fn, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        fn(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(latencies), sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+
+
+def main(sizes, n_texts: int):
+    """
+    Red-flag check latency (benign texts, the common and worst case: every flag is examined)
+    for growing vocabularies: legacy per-flag partial_ratio scan vs the compiled detector.
+    """
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(TEXTS) for _ in range(rng.randint(1, 4))) for _ in range(n_texts)]
+    print(f"{'flags':>6} {'legacy mean/p95 (ms)':>22} {'detector mean/p95 (ms)':>24}")
+    for size in sizes:
+        flags = vocabulary(size)
+        detector = RedFlagDetector(flags)
+        legacy = latency_ms(lambda text: legacy_check(text, flags), texts)
+        compiled = latency_ms(detector.detect, texts)
+        print(f"{len(flags):>6} {legacy[0]:>12.3f} / {legacy[1]:<8.3f} {compiled[0]:>13.3f} / {compiled[1]:<8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the red-flag detector against the legacy scan.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[18, 100, 300, 600])
+    parser.add_argument("--texts", type=int, default=200)
+    args = parser.parse_args()
+    main(args.sizes, args.texts)
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.validation_pipeline import PIPELINE_MODES, run_validation_pipeline
+
+TEXT = "je dors mal depuis des semaines et je suis tres stresse au travail"
+
+
+class SimulatedValidationService:
+    """Agent de validation simulé : latence LLM tirée autour de `llm_ms`, corrections occasionnelles."""
+    sufficiency_classifier = None
+
+    def __init__(self, llm_ms: float, rewrite_rate: float, rng: random.Random):
+        self.llm_ms = llm_ms
+        self.rewrite_rate = rewrite_rate
+        self.rng = rng
+
+    async def validate_and_process_input(self, text, nlp_analysis=None):
+        await asyncio.sleep(self.rng.gauss(self.llm_ms, self.llm_ms * 0.2) / 1000)
+        corrected = text
+        if self.rng.random() < self.rewrite_rate:
+            corrected = "Je souffre d'insomnie et d'un stress professionnel important depuis plusieurs semaines."
+        return {"status": "ok", "corrected_text": corrected, "source": "llm"}
+
+
+class SimulatedAnalyzer:
+    def __init__(self, nlp_ms: float):
+        self.nlp_ms = nlp_ms
+
+    async def analyze_free_text(self, text):
+        await asyncio.sleep(self.nlp_ms / 1000)
+        return {"structured_analysis": {"symptoms": []}, "user_embedding": [0.0]}
+
+
+class SimulatedRecommender:
+    def __init__(self, scoring_ms: float):
+        self.scoring_ms = scoring_ms
+
+    async def recommend(self, nlp_analysis):
+        await asyncio.sleep(self.scoring_ms / 1000)
+        return [{"practice_name": "simulated"}]
+
+
+async def measure(mode: str, requests: int, llm_ms: float, nlp_ms: float, scoring_ms: float, rewrite_rate: float):
+    rng = random.Random(0)
+    validation = SimulatedValidationService(llm_ms, rewrite_rate, rng)
+    analyzer, recommender = SimulatedAnalyzer(nlp_ms), SimulatedRecommender(scoring_ms)
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await run_validation_pipeline(TEXT, validation, analyzer, recommender, mode=mode)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+
+
+def main(requests: int, llm_ms: float, nlp_ms: float, scoring_ms: float, rewrite_rate: float):
+    """
+    Validation + analysis + scoring latency, sequential vs speculative, with simulated stage
+    latencies (pass the p50 values measured in production for each stage).
+    """
+    print(f"LLM {llm_ms} ms, NLP {nlp_ms} ms, scoring {scoring_ms} ms, rewritten texts {rewrite_rate:.0%}")
+    for mode in PIPELINE_MODES:
+        p50, p95 = asyncio.run(measure(mode, requests, llm_ms, nlp_ms, scoring_ms, rewrite_rate))
+        print(f"{mode:>12}: p50 {p50:7.1f} ms   p95 {p95:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sequential and speculative validation pipelines.")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--llm-ms", type=float, default=700.0)
+    parser.add_argument("--nlp-ms", type=float, default=60.0)
+    parser.add_argument("--scoring-ms", type=float, default=5.0)
+    parser.add_argument("--rewrite-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    main(args.requests, args.llm_ms, args.nlp_ms, args.scoring_ms, args.rewrite_rate)
@@ -0,0 +1,38 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import get_settings
+from app.services.practice_index import INDEX_PROJECTION, PracticeIndex
+from app.services.vocabulary import HOLISTIC_KEYWORDS
+from app.utils.prefork import build_ann_index_for
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+
+
+async def main():
+    """
+    Builds (or checks) the persisted ANN index of the practice catalog in ANN_INDEX_DIR.
+    Workers only read it: run this after every catalog change when serving without the prefork master.
+    """
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    practices = await db[COLLECTION_NAME].find({}, INDEX_PROJECTION).to_list(length=None)
+    client.close()
+
+    index = PracticeIndex(practices, model_version=settings.EMBEDDING_MODEL_NAME,
+                          symptom_vocabulary=HOLISTIC_KEYWORDS.keys())
+    if build_ann_index_for(settings, index):
+        print(f"ANN index up to date in {settings.ANN_INDEX_DIR} ({len(index)} practices).")
+    else:
+        print(f"ANN index not needed ({len(index)} practices, ANN_MIN_PRACTICES={settings.ANN_MIN_PRACTICES}).")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import get_settings
+from app.services.context_table import ContextTable, collection_version
+from app.services.rag_agent_service import RAGAgentService
+from app.services.vocabulary import HOLISTIC_KEYWORDS
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+
+
+async def main(max_categories: int):
+    """
+    Precomputes the top-k RAG chunks of every (practice, symptom category combination) and stores
+    them with the current Qdrant collection version (a hash of every point id and payload): the table
+is ignored as soon as the collection changes. Run it again after every ingestion or re-tagging.
+    """
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    practice_names = [doc["practice"]["name"] async for doc in db[COLLECTION_NAME].find({}, {"practice.name": 1})]
+    client.close()
+
+    rag_service = RAGAgentService(settings)
+    if rag_service.retriever is None:
+        print("Error: the RAG retriever could not be initialized (see logs).")
+        return
+    try:
+        version = collection_version(rag_service.qdrant_client, settings.QDRANT_COLLECTION_NAME)
+        print(f"Precomputing contexts for {len(practice_names)} practices (collection {version})...")
+        table = await ContextTable.build(rag_service.retriever, practice_names, HOLISTIC_KEYWORDS.keys(),
+                                         version, max_categories=max_categories)
+        table.save(settings.CONTEXT_TABLE_PATH)
+        print(f"Context table written to {settings.CONTEXT_TABLE_PATH} ({len(table)} combinations).")
+    finally:
+        await rag_service.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--max-categories", type=int, default=settings.CONTEXT_TABLE_MAX_CATEGORIES,
+                        help="Largest number of symptom categories in a precomputed combination.")
+    asyncio.run(main(parser.parse_args().max_categories))
@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+import numpy as np
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import get_settings
+from services.ann_index import IVFInt8Index, recall_at_k
+from utils.embedding_codec import decode_embedding
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+
+
+async def load_catalog_embeddings() -> np.ndarray:
+    """Loads and L2-normalises every practice embedding stored in MongoDB."""
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    cursor = db[COLLECTION_NAME].find({}, {"embedding": 1, "embedding_dim": 1})
+    vectors = [decode_embedding(p["embedding"], p.get("embedding_dim")) async for p in cursor if p.get("embedding") is not None]
+    client.close()
+    matrix = np.vstack(vectors).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def main(n_queries: int, k: int, noise: float):
+    """
+    Recall-vs-exact check for the ANN index: builds it over the current catalog and
+    reports recall@k and mean search latency for several nprobe values.
+    """
+    embeddings = asyncio.run(load_catalog_embeddings())
+    print(f"Catalog: {len(embeddings)} practices, dimension {embeddings.shape[1]}.")
+
+    index = IVFInt8Index.build(embeddings, n_lists=settings.ANN_N_LISTS)
+    rng = np.random.default_rng(0)
+    queries = embeddings[rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)]
+    queries = queries + noise * rng.normal(size=queries.shape)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    print(f"{'nprobe':>8} {'recall@' + str(k):>10} {'latency (ms)':>14}")
+    for nprobe in sorted({1, 2, 4, settings.ANN_NPROBE, 16, index.n_lists}):
+        if nprobe > index.n_lists:
+            continue
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, k, nprobe)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{nprobe:>8} {recall_at_k(embeddings, index, queries, k, nprobe):>10.3f} {latency_ms:>14.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ANN recall against exact search on the practice catalog.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=settings.ANN_CANDIDATES)
+    parser.add_argument("--noise", type=float, default=0.05, help="Gaussian noise added to catalog vectors to build queries.")
+    args = parser.parse_args()
+    main(args.queries, args.k, args.noise)
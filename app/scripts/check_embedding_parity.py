@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import get_settings
+from services.embedding_backends import OnnxEmbeddingBackend, TorchEmbeddingBackend, l2_normalize
+from utils.embedding_codec import decode_embedding
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+
+
+async def load_stored_embeddings():
+    """Descriptions and embeddings stored by seed_db.py (torch backend)."""
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    cursor = db[COLLECTION_NAME].find({}, {"description.full": 1, "embedding": 1, "embedding_dim": 1})
+    descriptions, vectors = [], []
+    async for practice in cursor:
+        if practice.get("embedding") is None:
+            continue
+        descriptions.append(practice.get("description", {}).get("full", ""))
+        vectors.append(decode_embedding(practice["embedding"], practice.get("embedding_dim")))
+    client.close()
+    return descriptions, l2_normalize(np.vstack(vectors).astype(np.float32))
+
+
+def timed_encode(backend, texts, batch_size):
+    start = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    return l2_normalize(vectors), (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def main(min_cosine: float, batch_size: int, compare_torch: bool):
+    """
+    Bounds the cosine drift between the ONNX int8 backend and the torch embeddings
+    stored in MongoDB. Exits with status 1 when the catalog must be re-seeded.
+    """
+    descriptions, stored = asyncio.run(load_stored_embeddings())
+    print(f"{len(descriptions)} stored practice embeddings.")
+
+    onnx_vectors, onnx_ms = timed_encode(OnnxEmbeddingBackend(settings.ONNX_MODEL_DIR, settings.ONNX_INTRA_OP_THREADS),
+                                         descriptions, batch_size)
+    cosines = np.sum(onnx_vectors * stored, axis=1)
+    print(f"onnx-int8 vs stored: mean cosine={cosines.mean():.5f}  min={cosines.min():.5f}  ({onnx_ms:.2f} ms/text)")
+
+    # Le classement compte plus que la valeur absolue : même meilleure pratique pour chaque description ?
+    same_top1 = np.mean(np.argmax(onnx_vectors @ stored.T, axis=1) == np.arange(len(stored)))
+    print(f"self-retrieval top-1 agreement: {same_top1:.3f}")
+
+    if compare_torch:
+        torch_vectors, torch_ms = timed_encode(TorchEmbeddingBackend(settings.EMBEDDING_MODEL_NAME), descriptions, batch_size)
+        print(f"torch vs stored: min cosine={np.sum(torch_vectors * stored, axis=1).min():.5f}  ({torch_ms:.2f} ms/text)")
+
+    if cosines.min() < min_cosine:
+        print(f"FAIL: drift above bound (min cosine < {min_cosine}). Re-seed the catalog with the ONNX backend before enabling it.")
+        sys.exit(1)
+    print("OK: stored embeddings can be kept with EMBEDDING_BACKEND=onnx.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check ONNX int8 embeddings against the stored torch embeddings.")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--compare-torch", action="store_true", help="Also time the torch backend.")
+    args = parser.parse_args()
+    main(args.min_cosine, args.batch_size, args.compare_torch)
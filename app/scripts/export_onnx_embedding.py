@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import get_settings
+from services.embedding_backends import ONNX_META_FILE, ONNX_MODEL_FILE
+
+settings = get_settings()
+
+
+def export(output_dir: Path, opset: int):
+    """
+    Exports the SentenceTransformer transformer to ONNX, then applies dynamic int8
+    quantization. Pooling and normalization are re-implemented in the ONNX backend.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device="cpu")
+    pooling = next((m for m in model if isinstance(m, Pooling)), None)
+    if pooling is None or not pooling.pooling_mode_mean_tokens:
+        raise SystemExit("Only mean-pooling sentence-transformers models are supported.")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fp32_path = output_dir / "model_fp32.onnx"
+    sample = tokenizer(["exemple de phrase"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    print(f"Exporting {settings.EMBEDDING_MODEL_NAME} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(sample[name] for name in input_names), str(fp32_path),
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=opset,
+        )
+
+    print("Applying dynamic int8 quantization...")
+    quantize_dynamic(str(fp32_path), str(output_dir / ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    fp32_path.unlink()
+
+    tokenizer.save_pretrained(str(output_dir))
+    meta = {
+        "source_model": settings.EMBEDDING_MODEL_NAME,
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(isinstance(m, Normalize) for m in model),
+    }
+    (output_dir / ONNX_META_FILE).write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    print(f"ONNX int8 model written to {output_dir}. Run check_embedding_parity.py before enabling it.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX with int8 dynamic quantization.")
+    parser.add_argument("--output", type=Path, default=Path(settings.ONNX_MODEL_DIR))
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.output, args.opset)
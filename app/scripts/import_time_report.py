@@ -0,0 +1,100 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Dépendances lourdes qui ne doivent être importées qu'au chargement des composants
+HEAVY_MODULES = ["torch", "spacy", "sentence_transformers", "transformers", "onnxruntime",
+                 "langchain", "langchain_core", "langchain_qdrant", "agno", "google.generativeai"]
+
+
+class ImportEntry(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportEntry]:
+    """Parses the stderr of ``python -X importtime``."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            entries.append(ImportEntry(name.strip(), int(self_us), int(cumulative_us),
+                                       (len(name) - len(name.lstrip()) - 1) // 2))
+        except ValueError:
+            continue
+    return entries
+
+
+def measure(module: str) -> List[ImportEntry]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_ROOT, env=dict(os.environ), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def total_ms(entries: List[ImportEntry]) -> float:
+    return sum(e.cumulative_us for e in entries if e.depth == 0) / 1000
+
+
+def self_time_by_package(entries: List[ImportEntry]) -> Dict[str, float]:
+    totals: Dict[str, float] = defaultdict(float)
+    for entry in entries:
+        totals[entry.module.split(".")[0]] += entry.self_us / 1000
+    return totals
+
+
+def forbidden_imports(entries: List[ImportEntry], forbidden: List[str]) -> List[str]:
+    modules = {e.module for e in entries}
+    return sorted(f for f in forbidden if any(m == f or m.startswith(f + ".") for m in modules))
+
+
+def main(module: str, repeat: int, budget_ms: float, top: int, forbidden: List[str]):
+    """
+    Reproducible import-time report: imports ``module`` in fresh interpreters, keeps the
+    median run, lists the slowest packages and fails (exit 1) when the total exceeds the
+    budget or when a heavy dependency is imported eagerly.
+    """
+    runs = sorted((measure(module) for _ in range(repeat)), key=total_ms)
+    entries = runs[len(runs) // 2]
+    total = total_ms(entries)
+
+    print(f"import {module}: median {total:.0f} ms over {repeat} runs "
+          f"(min {total_ms(runs[0]):.0f} ms, max {total_ms(runs[-1]):.0f} ms), {len(entries)} modules")
+    print(f"{'package':<32} {'self (ms)':>10}")
+    for package, ms in sorted(self_time_by_package(entries).items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32} {ms:>10.1f}")
+
+    failures = []
+    eager = forbidden_imports(entries, forbidden)
+    if eager:
+        failures.append(f"heavy dependencies imported at startup: {', '.join(eager)}")
+    if total > budget_ms:
+        failures.append(f"import time {total:.0f} ms exceeds the {budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"OK: within the {budget_ms:.0f} ms budget, no eager heavy import.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report for the API entry point, checked against a budget.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES)
+    args = parser.parse_args()
+    main(args.module, args.repeat, args.budget_ms, args.top, args.forbid)
@@ -0,0 +1,85 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def memory_kb(pid: int) -> dict:
+    """RSS, PSS (pages partagées réparties entre processus) et USS (pages privées) d'un processus, en kB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_ready(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"Server on port {port} not ready after {timeout}s")
+
+
+def measure(workers: int, port: int, preload: bool, timeout: float) -> dict:
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               PREFORK_PRELOAD="1" if preload else "0")
+    master = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"],
+                              cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, timeout)
+        time.sleep(2)  # tous les workers ont fini leur lifespan
+        worker_stats = [memory_kb(pid) for pid in children(master.pid)]
+        return {"master": memory_kb(master.pid), "workers": worker_stats}
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main(worker_counts, port: int, preload: bool, timeout: float):
+    """
+    Starts the prefork server (gunicorn.conf.py) with 1, 4 and 8 workers and reports the
+    memory of each worker. PSS is the relevant figure: shared copy-on-write pages are
+    split between the processes that map them. Linux only (/proc/<pid>/smaps_rollup).
+    """
+    print(f"preload={'on' if preload else 'off'}")
+    print(f"{'workers':>8} {'master RSS':>11} {'worker RSS':>11} {'worker PSS':>11} {'worker USS':>11} {'total PSS':>10}  (MB)")
+    for count in worker_counts:
+        stats = measure(count, port, preload, timeout)
+        per_worker = {key: sum(w[key] for w in stats["workers"]) / max(1, len(stats["workers"])) / 1024
+                      for key in ("rss", "pss", "uss")}
+        total_pss = (stats["master"]["pss"] + sum(w["pss"] for w in stats["workers"])) / 1024
+        print(f"{count:>8} {stats['master']['rss'] / 1024:>11.0f} {per_worker['rss']:>11.0f} "
+              f"{per_worker['pss']:>11.0f} {per_worker['uss']:>11.0f} {total_pss:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-worker memory of the prefork server.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-preload", action="store_true", help="Baseline: every worker loads its own models.")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+    main(args.workers, args.port, not args.no_preload, args.timeout)
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import get_settings
+from utils.embedding_codec import encode_embedding
+
+settings = get_settings()
+COLLECTION_NAME = "practices"
+BATCH_SIZE = 500
+
+
+async def migrate_embeddings(model_version: str, dry_run: bool = False):
+    """
+    One-shot migration: converts every practice embedding still stored as a list
+    of BSON doubles into the packed float32 binary format.
+    """
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+
+    # 1. Only documents still using the legacy array format
+    legacy_filter = {"embedding": {"$type": "array"}}
+    total = await db[COLLECTION_NAME].count_documents(legacy_filter)
+    print(f"{total} practices to migrate in '{COLLECTION_NAME}'.")
+    if total == 0 or dry_run:
+        client.close()
+        return
+
+    # 2. Convert and write back in bulk
+    migrated = 0
+    operations = []
+    cursor = db[COLLECTION_NAME].find(legacy_filter, {"embedding": 1})
+    async for practice in cursor:
+        fields = encode_embedding(practice["embedding"], model_version)
+        operations.append(UpdateOne({"_id": practice["_id"]}, {"$set": fields}))
+        if len(operations) >= BATCH_SIZE:
+            await db[COLLECTION_NAME].bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+
+    if operations:
+        await db[COLLECTION_NAME].bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    print(f"Migration complete: {migrated} embeddings converted to float32 binary.")
+    client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert practice embeddings to packed float32 binary.")
+    parser.add_argument("--model-version", default=settings.EMBEDDING_MODEL_NAME,
+                        help="Model tag stored with the converted embeddings.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the documents to migrate.")
+    args = parser.parse_args()
+    asyncio.run(migrate_embeddings(args.model_version, args.dry_run))
@@ -0,0 +1,31 @@
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import get_settings
+from services.feedback_stats import rebuild_feedback_stats
+
+settings = get_settings()
+
+
+async def main():
+    """
+    Recomputes the materialized per-practice feedback stats from the raw feedback collection.
+    Use it to repair the stats after a manual edit or a failed write, while no feedback is being
+    recorded: a concurrent write can be overwritten by the rebuilt document.
+    """
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+
+    print("Rebuilding feedback stats from raw feedback...")
+    count = await rebuild_feedback_stats(db)
+    print(f"Feedback stats rebuilt for {count} practices.")
+
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,6 +10,7 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from config import get_settings
+from utils.embedding_codec import encode_embedding
 
 settings = get_settings()
 DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'practices.json')
@@ -67,7 +68,10 @@ async def seed_database():
             del practice["search_vectors"]
         
         # Add new, correctly generated embedding
-        practice["embedding"] = embeddings[i].cpu().tolist()
+        if settings.EMBEDDING_STORAGE == "binary":
+            practice.update(encode_embedding(embeddings[i], settings.EMBEDDING_MODEL_NAME))
+        else:
+            practice["embedding"] = embeddings[i].cpu().tolist()
         processed_practices.append(practice)
         
     # 5. Insert into MongoDB
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import os
+import sys
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorClient
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+# Add the app directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Les services importent `app.*` : la racine du dépôt doit aussi être sur le chemin
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import get_settings
+from services.sufficiency_classifier import VALIDATION_OUTCOMES_COLLECTION, SufficiencyClassifier, choose_thresholds
+
+settings = get_settings()
+
+
+async def load_outcomes(limit: int):
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    db = client[settings.MONGO_DB_NAME]
+    # Les entrées du classifieur sont journalisées telles quelles (pas de texte brut à réanalyser)
+    cursor = db[VALIDATION_OUTCOMES_COLLECTION].find(
+        {"model_version": settings.EMBEDDING_MODEL_NAME},
+        {"embedding": 1, "features": 1, "context_sufficient": 1},
+    ).sort("created_at", -1)
+    outcomes = await cursor.to_list(length=limit)
+    client.close()
+    return outcomes
+
+
+def main(limit: int, target_precision: float, test_size: float, output: str):
+    """
+    Trains the local sufficiency pre-classifier from the logged LLM validation outcomes.
+    The uncertain band is chosen on a held-out split so that local decisions reach
+    `target_precision` agreement with the LLM; everything in between still goes to the LLM.
+    """
+    outcomes = asyncio.run(load_outcomes(limit))
+    print(f"Loaded {len(outcomes)} validation outcomes.")
+    labels = np.array([bool(doc["context_sufficient"]) for doc in outcomes])
+    if len(set(labels.tolist())) < 2:
+        print("Both sufficient and insufficient outcomes are needed to train. Aborting.")
+        return
+
+    embeddings = np.array([doc["embedding"] for doc in outcomes], dtype=np.float32)
+    features = np.array([doc["features"] for doc in outcomes], dtype=np.float32)
+
+    feature_mean = features.mean(axis=0)
+    feature_scale = features.std(axis=0)
+    feature_scale[feature_scale == 0] = 1.0
+    inputs = np.hstack([embeddings, (features - feature_mean) / feature_scale])
+
+    train_x, test_x, train_y, test_y = train_test_split(
+        inputs, labels, test_size=test_size, stratify=labels, random_state=0
+    )
+    model = LogisticRegression(C=1.0, max_iter=2000, class_weight="balanced")
+    model.fit(train_x, train_y)
+    probabilities = model.predict_proba(test_x)[:, 1]
+
+    low, high = choose_thresholds(probabilities, test_y, target_precision)
+    classifier = SufficiencyClassifier(model.coef_[0], model.intercept_[0], feature_mean, feature_scale,
+                                       low, high, model_version=settings.EMBEDDING_MODEL_NAME)
+
+    # Estimation sur le jeu de validation : part des appels LLM évités et accord avec le LLM
+    decisions = [classifier.decide(p) for p in probabilities]
+    local = np.array([d is not None for d in decisions])
+    agreement = np.mean([d == y for d, y in zip(decisions, test_y) if d is not None]) if local.any() else float("nan")
+    print(f"Uncertain band: {low:.3f} - {high:.3f}")
+    print(f"Held-out: {len(test_y)} texts, skip rate {local.mean():.1%}, agreement with the LLM {agreement:.1%}")
+
+    classifier.save(output)
+    print(f"Sufficiency classifier saved to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local context sufficiency pre-classifier.")
+    parser.add_argument("--limit", type=int, default=50000, help="Most recent outcomes to train on.")
+    parser.add_argument("--target-precision", type=float, default=0.97)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--output", default=settings.SUFFICIENCY_MODEL_PATH)
+    args = parser.parse_args()
+    main(args.limit, args.target_precision, args.test_size, args.output)
@@ -0,0 +1,46 @@
+import copy
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.monitoring.monitoring import NLP_ANALYSIS_CACHE
+from app.services.practice_index import to_float32_vector
+from app.utils.cache import TTLCache
+from app.utils.text import normalize_text
+
+
+class AnalysisCache:
+    """
+    Cache des résultats d'analyse NLP (analyse structurée + embedding), indexé par
+    le hash SHA-256 de la version des modèles et du texte normalisé.
+    L'embedding est stocké en octets float32 compacts.
+    """
+
+    def __init__(self, model_version: str, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.model_version = model_version
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_version}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache.get(self.key(text))
+        NLP_ANALYSIS_CACHE.labels(result="hit" if entry is not None else "miss").inc()
+        if entry is None:
+            return None
+        structured_analysis, embedding = entry
+        return {
+            # Copie : les appelants ne doivent pas pouvoir modifier l'entrée en cache
+            "structured_analysis": copy.deepcopy(structured_analysis),
+            "user_embedding": np.frombuffer(embedding, dtype=np.float32).copy() if embedding is not None else None,
+        }
+
+    def set(self, text: str, analysis: Dict[str, Any]) -> None:
+        user_embedding = analysis.get("user_embedding")
+        embedding = to_float32_vector(user_embedding).tobytes() if user_embedding is not None else None
+        self._cache.set(self.key(text), (copy.deepcopy(analysis["structured_analysis"]), embedding))
@@ -0,0 +1,182 @@
+"""
+Index approximatif (ANN) pour les grands catalogues de pratiques.
+
+IVF (inverted file) : les embeddings normalisés sont répartis en `n_lists` clusters
+(k-means sphérique) et stockés quantifiés en int8. Une recherche ne parcourt que les
+`nprobe` clusters les plus proches de la requête : `nprobe` est le réglage rappel/latence.
+L'index est persisté sur disque en fichiers .npy, relus en mmap au démarrage. Il est écrit
+en un seul endroit (le maître en mode prefork, voir app/utils/prefork.py, ou
+app/scripts/build_ann_index.py) ; les workers ne font que le relire.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+_ARRAYS = ("centroids", "codes", "scales", "order", "offsets")
+
+
+def catalog_fingerprint(embeddings: np.ndarray, ids: Iterable[str]) -> str:
+    """Empreinte du catalogue : l'index persisté n'est réutilisé que si elle est identique."""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+    digest.update("\x00".join(ids).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _spherical_kmeans(vectors: np.ndarray, n_lists: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), size=n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for list_id in range(n_lists):
+            members = vectors[assignments == list_id]
+            if len(members):
+                centroids[list_id] = members.mean(axis=0)
+            else:  # cluster vide : on le ré-initialise sur un point au hasard
+                centroids[list_id] = vectors[rng.integers(len(vectors))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids /= norms
+    return centroids.astype(np.float32)
+
+
+class IVFInt8Index:
+    """IVF index over L2-normalised vectors with int8 scalar-quantised storage."""
+
+    def __init__(self, centroids: np.ndarray, codes: np.ndarray, scales: np.ndarray,
+                 order: np.ndarray, offsets: np.ndarray, fingerprint: str = ""):
+        self.centroids = centroids
+        self.codes = codes
+        self.scales = scales
+        self.order = order
+        self.offsets = offsets
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, n_lists: Optional[int] = None, n_iter: int = 10,
+              seed: int = 0, fingerprint: str = "") -> "IVFInt8Index":
+        """Builds the index from an (n x d) matrix of L2-normalised float32 vectors."""
+        vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Cannot build an ANN index over an empty catalog.")
+        n_lists = min(n, n_lists or max(1, int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        centroids = _spherical_kmeans(vectors, n_lists, n_iter, rng)
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+
+        # Quantification scalaire symétrique par dimension
+        scales = np.abs(vectors).max(axis=0) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+
+        # Listes inversées au format CSR : order[offsets[l]:offsets[l+1]] = lignes du cluster l
+        order = np.argsort(assignments, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=n_lists), out=offsets[1:])
+
+        return cls(centroids, codes[order], scales.astype(np.float32), order, offsets, fingerprint)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = 8) -> np.ndarray:
+        """Returns up to ``k`` candidate row ids (catalog order), approximate best first."""
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        nprobe = max(1, min(nprobe, self.n_lists))
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        positions = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        if positions.size == 0:
+            return np.empty(0, dtype=np.int64)
+        # Produit scalaire avec les vecteurs déquantifiés : (codes * scales) . q = codes . (scales * q)
+        approx_scores = self.codes[positions].astype(np.float32) @ (self.scales * query)
+
+        k = min(k, positions.size)
+        best = np.argpartition(-approx_scores, k - 1)[:k]
+        best = best[np.argsort(-approx_scores[best], kind="stable")]
+        return self.order[positions[best]]
+
+    def save(self, directory: Path) -> None:
+        """
+        Writes the index into a staging directory, then swaps it in: processes that have the
+        previous version memory-mapped keep reading its (unlinked) files unchanged.
+        """
+        directory = Path(directory)
+        staging = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for name in _ARRAYS:
+            np.save(staging / f"{name}.npy", np.asarray(getattr(self, name)))
+        meta = {"format_version": INDEX_FORMAT_VERSION, "fingerprint": self.fingerprint,
+                "n_lists": self.n_lists, "size": len(self)}
+        (staging / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if directory.exists():
+            os.replace(directory, old)
+        os.replace(staging, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path) -> "IVFInt8Index":
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported ANN index format: {meta.get('format_version')}")
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        return cls(fingerprint=meta["fingerprint"], **arrays)
+
+
+def load_or_build_ann_index(embeddings: np.ndarray, ids: Iterable[str], directory: Optional[Path],
+                            n_lists: Optional[int] = None, persist: bool = True) -> IVFInt8Index:
+    """
+    Reloads the persisted index when it matches the catalog, otherwise rebuilds it.
+    The rebuilt index is only saved when ``persist`` is set, i.e. by the single writer
+    (prefork master or offline script), never by the serving workers.
+    """
+    fingerprint = catalog_fingerprint(embeddings, ids)
+    if directory is not None and (Path(directory) / "meta.json").exists():
+        try:
+            index = IVFInt8Index.load(directory)
+            if index.fingerprint == fingerprint:
+                logger.info(f"ANN index reloaded from {directory} ({len(index)} vectors, {index.n_lists} lists).")
+                return index
+            logger.info("Persisted ANN index is stale, rebuilding.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not reload the ANN index from {directory}: {e}. Rebuilding.")
+
+    index = IVFInt8Index.build(embeddings, n_lists=n_lists, fingerprint=fingerprint)
+    logger.info(f"ANN index built: {len(index)} vectors, {index.n_lists} lists.")
+    if directory is not None and persist:
+        try:
+            index.save(directory)
+        except OSError as e:
+            logger.warning(f"Could not persist the ANN index to {directory}: {e}")
+    return index
+
+
+def recall_at_k(embeddings: np.ndarray, index: IVFInt8Index, queries: np.ndarray, k: int, nprobe: int) -> float:
+    """Mean fraction of the exact top-k (cosine) also returned by the ANN top-k."""
+    queries = np.asarray(queries, dtype=np.float32)
+    exact_scores = queries @ np.asarray(embeddings, dtype=np.float32).T
+    hits = 0
+    for query, scores in zip(queries, exact_scores):
+        exact = np.argpartition(-scores, k - 1)[:k]
+        hits += len(np.intersect1d(exact, index.search(query, k, nprobe)))
+    return hits / (k * len(queries))
@@ -0,0 +1,122 @@
+"""
+Table précalculée des contextes RAG par (pratique, combinaison de catégories de symptômes).
+
+Le catalogue des pratiques est petit et les besoins utilisateur viennent du vocabulaire fixe
+HOLISTIC_KEYWORDS : les documents retrouvés pour un même couple (pratique, catégories) sont
+presque toujours identiques. Un job hors ligne (app/scripts/build_context_table.py) calcule
+les top-k chunks de chaque combinaison et les enregistre avec la version de la collection
+Qdrant (collection_version : empreinte des ids et payloads de tous les points, toute
+ingestion, suppression ou réécriture de payload la change) ; les requêtes lisent la table en mémoire et ne font une
+recherche en direct que pour les combinaisons absentes. Une table dont la version ne
+correspond plus à la collection est ignorée.
+"""
+import json
+import logging
+import os
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.retrieval import RetrievedDocument
+from app.services.sparse_index import collection_version
+from app.utils.text import normalize_practice_id
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TABLE_FORMAT_VERSION = 1
+# Taille des lots de requêtes envoyés au retriever pendant le précalcul
+BUILD_BATCH_SIZE = 32
+
+
+def context_key(practice_id: str, categories: Iterable[str]) -> str:
+    return f"{practice_id}|{'+'.join(sorted(set(categories)))}"
+
+
+def category_combinations(categories: Iterable[str], max_size: int) -> List[Tuple[str, ...]]:
+    """Toutes les combinaisons (triées) de 1 à `max_size` catégories."""
+    categories = sorted(set(categories))
+    return [combo for size in range(1, max_size + 1) for combo in combinations(categories, size)]
+
+
+def advice_query(practice_name: str, user_needs: str) -> str:
+    """Requête de recherche d'un conseil (partagée par la recherche en direct et le précalcul)."""
+    return f"Informations détaillées sur la pratique {practice_name} pour traiter {user_needs}"
+
+
+class ContextTable:
+    """In-memory table: context key -> top-k retrieved documents, tagged with the collection version."""
+
+    def __init__(self, entries: Dict[str, List[RetrievedDocument]], version: str, max_categories: int):
+        self.entries = entries
+        self.version = version
+        self.max_categories = max_categories
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, practice_name: str, categories: Sequence[str]) -> Optional[List[RetrievedDocument]]:
+        """Documents précalculés, ou None si la combinaison n'a pas été précalculée."""
+        if not categories or len(set(categories)) > self.max_categories:
+            return None
+        return self.entries.get(context_key(normalize_practice_id(practice_name), categories))
+
+    @classmethod
+    async def build(cls, retriever, practice_names: Iterable[str], categories: Iterable[str],
+                    version: str, max_categories: int = 2) -> "ContextTable":
+        """Précalcule le contexte de chaque (pratique, combinaison) par lots de requêtes."""
+        jobs = [(practice_name, combo) for practice_name in sorted(set(practice_names))
+                for combo in category_combinations(categories, max_categories)]
+        entries: Dict[str, List[RetrievedDocument]] = {}
+        for start in range(0, len(jobs), BUILD_BATCH_SIZE):
+            batch = jobs[start:start + BUILD_BATCH_SIZE]
+            results = await retriever.retrieve_many(
+                [advice_query(practice_name, ", ".join(combo)) for practice_name, combo in batch],
+                [normalize_practice_id(practice_name) for practice_name, _ in batch],
+            )
+            for (practice_name, combo), docs in zip(batch, results):
+                entries[context_key(normalize_practice_id(practice_name), combo)] = [
+                    RetrievedDocument(d.page_content, dict(d.metadata)) for d in docs
+                ]
+        return cls(entries, version, max_categories)
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format_version": CONTEXT_TABLE_FORMAT_VERSION,
+            "version": self.version,
+            "max_categories": self.max_categories,
+            "entries": {key: [[d.page_content, d.metadata] for d in docs] for key, docs in self.entries.items()},
+        }
+        # Écriture atomique : les workers ne lisent jamais une table à moitié écrite
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "ContextTable":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if data.get("format_version") != CONTEXT_TABLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported context table format: {data.get('format_version')}")
+        entries = {key: [RetrievedDocument(content, metadata) for content, metadata in docs]
+                   for key, docs in data["entries"].items()}
+        return cls(entries, data["version"], data["max_categories"])
+
+
+def load_context_table(path: Path, qdrant_client, collection_name: str) -> Optional[ContextTable]:
+    """Relit la table si elle existe et correspond à l'état actuel de la collection, sinon None."""
+    path = Path(path)
+    if not path.exists():
+        logger.info(f"No precomputed context table at {path}: live retrieval only.")
+        return None
+    try:
+        table = ContextTable.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not load the context table from {path}: {e}. Live retrieval only.")
+        return None
+    current = collection_version(qdrant_client, collection_name)
+    if table.version != current:
+        logger.warning(f"Context table is stale (built for {table.version}, collection is {current}). Live retrieval only.")
+        return None
+    logger.info(f"Context table loaded from {path} ({len(table)} combinations).")
+    return table
@@ -0,0 +1,86 @@
+"""
+Backends d'embedding interchangeables, choisis par EMBEDDING_BACKEND :
+- "torch" : SentenceTransformer PyTorch (comportement historique) ;
+- "onnx"  : modèle exporté en ONNX, quantifié en int8 dynamique, exécuté par ONNX Runtime sur CPU
+            (voir app/scripts/export_onnx_embedding.py et check_embedding_parity.py).
+Les deux retournent une matrice NumPy float32 (une ligne par texte).
+"""
+import json
+import logging
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fichiers produits par l'export ONNX
+ONNX_MODEL_FILE = "model_int8.onnx"
+ONNX_META_FILE = "embedding_meta.json"
+
+
+def mean_pool(hidden_states: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Moyenne des états cachés sur les tokens réels (pooling 'mean' de sentence-transformers)."""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (hidden_states * mask).sum(axis=1)
+    return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class TorchEmbeddingBackend:
+    """SentenceTransformer PyTorch."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.model_version = model_name
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True).astype(np.float32, copy=False)
+
+
+class OnnxEmbeddingBackend:
+    """Modèle ONNX int8 exécuté par ONNX Runtime, avec un nombre de threads intra-op borné."""
+
+    def __init__(self, model_dir: str, intra_op_threads: int = 2):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = Path(model_dir)
+        meta = json.loads((model_dir / ONNX_META_FILE).read_text(encoding="utf-8"))
+        self.max_seq_length = meta["max_seq_length"]
+        self.normalize = meta["normalize"]
+        self.model_version = f"{meta['source_model']}:onnx-int8"
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_dir / ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+        logger.info(f"ONNX embedding backend loaded from {model_dir} ({intra_op_threads} intra-op threads).")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            inputs = {name: value.astype(np.int64) for name, value in tokens.items() if name in self.input_names}
+            hidden_states = self.session.run(None, inputs)[0]
+            batches.append(mean_pool(hidden_states, tokens["attention_mask"]))
+        vectors = np.vstack(batches).astype(np.float32) if batches else np.empty((0, 0), dtype=np.float32)
+        return l2_normalize(vectors) if self.normalize and len(vectors) else vectors
+
+
+def load_embedding_backend(settings):
+    """Instancie le backend d'embedding configuré."""
+    if settings.EMBEDDING_BACKEND == "torch":
+        return TorchEmbeddingBackend(settings.EMBEDDING_MODEL_NAME)
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return OnnxEmbeddingBackend(settings.ONNX_MODEL_DIR, intra_op_threads=settings.ONNX_INTRA_OP_THREADS)
+    raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
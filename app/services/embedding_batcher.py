@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.monitoring.monitoring import EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching dynamique des embeddings entre requêtes concurrentes.
+
+    Les textes en attente sont regroupés pendant au plus `max_wait_ms` millisecondes
+    (ou jusqu'à `max_batch_size` textes), encodés en un seul appel, puis chaque
+    appelant reçoit sa ligne de la matrice résultat.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Awaitable[np.ndarray]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Références fortes sur les lots en cours (la boucle ne garde que des références faibles)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        now = time.monotonic()
+        for _, _, enqueued in batch:
+            EMBEDDING_BATCH_WAIT.observe(now - enqueued)
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+        try:
+            vectors = await self.encode([text for text, _, _ in batch])
+            for row, (_, future, _) in enumerate(batch):
+                if not future.done():  # l'appelant a pu être annulé entre-temps
+                    future.set_result(vectors[row])
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(batch)} texts failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Lot annulé ou interrompu : aucun appelant ne doit attendre indéfiniment
+            for _, future, _ in batch:
+                if not future.done():
+                    future.cancel()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+# Collection des feedbacks bruts (écrite par la route /feedback)
+FEEDBACK_COLLECTION = "feedbacks_v1"
+# Statistiques matérialisées par pratique : {_id: practice_name, count, sum, sum_sq, updated_at}
+FEEDBACK_STATS_COLLECTION = "feedback_stats"
+
+
+async def record_feedback(db, practice_name: str, rating: int) -> None:
+    """
+    Met à jour atomiquement ($inc) les statistiques de la pratique notée, en une seule écriture
+    sur son propre document : pas de document global partagé par toutes les écritures.
+    """
+    await db[FEEDBACK_STATS_COLLECTION].update_one(
+        {"_id": practice_name},
+        {"$inc": {"count": 1, "sum": rating, "sum_sq": rating * rating},
+         "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+def _to_stat(doc: Dict[str, Any]) -> Dict[str, Any]:
+    count = doc.get("count", 0)
+    total = doc.get("sum", 0)
+    return {
+        "count": count,
+        "sum": total,
+        "sum_sq": doc.get("sum_sq", 0),
+        "avg_rating": total / count if count else 0.0,
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+async def load_feedback_stats(db) -> Dict[str, Dict[str, Any]]:
+    """Lit toutes les statistiques matérialisées, indexées par nom de pratique."""
+    cursor = db[FEEDBACK_STATS_COLLECTION].find({})
+    return {doc["_id"]: _to_stat(doc) async for doc in cursor}
+
+
+async def rebuild_feedback_stats(db) -> int:
+    """
+    Recalcule les statistiques depuis les feedbacks bruts (réparation).
+    Retourne le nombre de pratiques reconstruites.
+
+    Chaque document est remplacé sur place (upsert) puis les pratiques sans feedback sont
+    supprimées : la collection n'est jamais vide pendant la reconstruction. Le résultat n'est
+    exact que si aucun feedback n'est enregistré pendant l'exécution (un $inc concurrent
+    peut être écrasé par le remplacement) : lancer la réparation hors trafic.
+    """
+    pipeline = [
+        {"$match": {"practice_name": {"$ne": None}}},
+        {
+            "$group": {
+                "_id": "$practice_name",
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$rating"},
+                "sum_sq": {"$sum": {"$multiply": ["$rating", "$rating"]}},
+                "updated_at": {"$max": "$created_at"},
+            }
+        },
+    ]
+    cursor = db[FEEDBACK_COLLECTION].aggregate(pipeline)
+    rebuilt = await cursor.to_list(length=None)
+
+    stats = db[FEEDBACK_STATS_COLLECTION]
+    if rebuilt:
+        await stats.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in rebuilt], ordered=False)
+    await stats.delete_many({"_id": {"$nin": [doc["_id"] for doc in rebuilt]}})
+    logger.info(f"Feedback stats rebuilt for {len(rebuilt)} practices.")
+    return len(rebuilt)
+
+
+class FeedbackStatsCache:
+    """
+    Copie en mémoire des statistiques de feedback, relue au plus une fois par intervalle
+    `ttl_seconds` : un nouveau feedback est pris en compte après au plus `ttl_seconds`.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def get(self, db) -> Dict[str, Dict[str, Any]]:
+        if self._is_fresh():
+            return self.stats
+        async with self._lock:
+            if self._is_fresh():
+                return self.stats
+            self.stats = await load_feedback_stats(db)
+            self._loaded_at = time.monotonic()
+            logger.debug(f"Loaded feedback stats for {len(self.stats)} practices")
+        return self.stats
+
+    def invalidate(self) -> None:
+        """Force une relecture des statistiques à la prochaine lecture."""
+        self._loaded_at = None
@@ -1,28 +1,25 @@
 import logging
 import json
-from typing import Dict, List
+import random
+from typing import Any, Dict, List, Optional
 from agno.agent import Agent
 from agno.models.google import Gemini
 from app.config import Settings
-from fuzzywuzzy import fuzz
+from app.monitoring.monitoring import VALIDATION_AGREEMENT, VALIDATION_DECISIONS
+from app.services.red_flags import RED_FLAGS, RedFlagDetector, RedFlagMatch
+from app.services.sufficiency_classifier import SufficiencyClassifier
+from app.services.validation_cache import build_validation_cache
 
 
 logger = logging.getLogger(__name__)
 
-# Liste des mots-clés d'urgence. À enrichir en consultation avec des professionnels.
-RED_FLAGS = [
-    "douleur thoracique", "douleur poitrine", "pression poitrine", "serrement poitrine",
-    "difficulté à respirer", "souffle court", "étouffement",
-    "perte de conscience", "évanouissement",
-    "confusion soudaine", "difficulté à parler",
-    "engourdissement visage", "engourdissement bras", "engourdissement jambe",
-    "saignement incontrôlable", "hémorragie",
-    "pensées suicidaires", "faire du mal"
-]
-
 class InputValidationService:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, sufficiency_classifier: Optional[SufficiencyClassifier] = None):
         self.settings = settings
+        # Pré-classifieur local (optionnel) : évite l'appel LLM pour les cas clairement tranchés
+        self.sufficiency_classifier = sufficiency_classifier
+        # Vocabulaire d'urgence compilé une fois (automate exact + index de trigrammes)
+        self.red_flag_detector = RedFlagDetector(RED_FLAGS)
         self.context_analysis_agent = Agent(
             name="Analyseur de Contexte Utilisateur",
             model=Gemini(id=self.settings.GEMINI_MODEL_NAME, temperature=0.0),
@@ -30,6 +27,8 @@ class InputValidationService:
             show_tool_calls=False,
             markdown=True,
         )
+        # Réponses de l'agent en cache : un texte déjà validé ne repasse pas par le LLM
+        self.validation_cache = build_validation_cache(settings, self._get_agent_prompt())
         logger.info("🤖 Agent d'analyse de contexte initialisé.")
 
     def _get_agent_prompt(self) -> str:
@@ -63,22 +62,40 @@ class InputValidationService:
         }
         """
 
+    def detect_red_flag(self, text: str) -> Optional[RedFlagMatch]:
+        """Signal d'urgence trouvé dans le texte (expression, position, score), ou None."""
+        match = self.red_flag_detector.detect(text)
+        if match is not None:
+            logger.warning(f"🚩 Red Flag détecté : '{match.flag}' (score {match.score}) en position {match.start}-{match.end} du texte de l'utilisateur.")
+        return match
+
     def check_for_red_flags(self, text: str) -> bool:
         """Vérifie la présence de mots-clés d'urgence dans le texte."""
-        text_lower = text.lower()
-        for flag in RED_FLAGS:
-            if flag in text_lower:
-                logger.warning(f"🚩 Red Flag détecté : '{flag}' dans le texte de l'utilisateur.")
-                return True
-            if fuzz.partial_ratio(text_lower, flag) > 80: 
-                logger.warning(f"🚩 Red Flag détecté : '{flag}' dans le texte de l'utilisateur.")
-                return True
-        return False
-
-
-    async def validate_and_process_input(self, text: str) -> Dict:
+        return self.detect_red_flag(text) is not None
+
+
+    def _local_decision(self, text: str, nlp_analysis: Optional[Dict[str, Any]]) -> Optional[Dict]:
+        """Décision du pré-classifieur hors de la bande incertaine, au format de la réponse de l'agent ; None sinon."""
+        if self.sufficiency_classifier is None or not nlp_analysis:
+            return None
+        probability = self.sufficiency_classifier.predict_proba(text, nlp_analysis)
+        sufficient = self.sufficiency_classifier.decide(probability)
+        if sufficient is None:
+            return None
+        return {
+            "status": "ok" if sufficient else "insufficient",
+            "corrected_text": text,
+            "context_sufficient": sufficient,
+            "confidence_score": probability,
+            "clarifying_question": None if sufficient else "J'ai besoin de plus de contexte. Pourriez-vous m'en dire un peu plus sur ce que vous ressentez ?",
+            "reasoning": "Décision du pré-classifieur local.",
+            "source": "local",
+        }
+
+    async def validate_and_process_input(self, text: str, nlp_analysis: Optional[Dict[str, Any]] = None) -> Dict:
         """
-        Orchestre la validation complète : vérification d'urgence puis analyse par l'agent.
+        Orchestre la validation complète : vérification d'urgence, pré-classifieur local
+        (si `nlp_analysis` du texte est fournie), puis analyse par l'agent.
         """
         # 1. Vérification des cas d'urgence
         if self.check_for_red_flags(text):
@@ -87,7 +104,34 @@ class InputValidationService:
                 "message": "Vos symptômes semblent nécessiter une attention médicale immédiate. Veuillez consulter un professionnel de santé sans tarder."
             }
 
-        # 2. Analyse par l'agent IA
+        # 2. Cas clairement suffisants ou insuffisants : décision locale, sans appel LLM
+        local_result = self._local_decision(text, nlp_analysis)
+        if local_result is not None and random.random() >= self.settings.SUFFICIENCY_SHADOW_RATE:
+            VALIDATION_DECISIONS.labels(source="local").inc()
+            return local_result
+
+        # 3. Bande incertaine (ou échantillon de contrôle) : analyse par l'agent IA
+        analysis_result = await self._cached_agent_analysis(text)
+        if analysis_result.get("source") in ("llm", "cache"):
+            VALIDATION_DECISIONS.labels(source=analysis_result["source"] if local_result is None else "shadow").inc()
+            if local_result is not None:
+                agreed = local_result["status"] == analysis_result["status"]
+                VALIDATION_AGREEMENT.labels(agreed=str(agreed).lower()).inc()
+        return analysis_result
+
+    async def _cached_agent_analysis(self, text: str) -> Dict:
+        if self.validation_cache is None:
+            return await self._analyze_with_agent(text)
+        # Seules les vraies réponses de l'agent sont mises en cache (pas le fallback)
+        result, computed = await self.validation_cache.get_or_compute(
+            text, lambda: self._analyze_with_agent(text), cacheable=lambda r: r.get("source") == "llm"
+        )
+        if not computed and result.get("source") != "fallback":
+            # Réponse du cache ou de l'appel en cours d'une requête identique : pas d'appel LLM pour celle-ci
+            result["source"] = "cache"
+        return result
+
+    async def _analyze_with_agent(self, text: str) -> Dict:
         try:
             response = await self.context_analysis_agent.arun(text)
             content = response.content
@@ -103,6 +147,7 @@ class InputValidationService:
                 analysis_result["status"] = "insufficient"
             else:
                 analysis_result["status"] = "ok"
+            analysis_result["source"] = "llm"
             
             return analysis_result
 
@@ -112,5 +157,6 @@ class InputValidationService:
             return {
                 "status": "ok",
                 "corrected_text": text,
-                "reasoning": "Fallback: L'analyse de l'agent a échoué, on procède avec le texte original."
+                "reasoning": "Fallback: L'analyse de l'agent a échoué, on procède avec le texte original.",
+                "source": "fallback"
             }
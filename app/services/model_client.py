@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import logging
+import os
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from app.services.nlp_executor import NLPQueueFullError
+from app.utils.ipc import read_message, write_message
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerError(Exception):
+    """Le serveur de modèles est injoignable ou a échoué."""
+
+
+class RemoteNLPAnalyzer:
+    """
+    Client du serveur de modèles (model_server.py), avec la même interface qu'AsyncNLPAnalyzer.
+    Une seule connexion multiplexée par worker ; les embeddings sont reçus dans des
+    emplacements (slots) d'un segment de mémoire partagée créé et détruit par ce client.
+    Le slot d'une requête expirée reste réservé jusqu'à sa réponse tardive (le serveur peut
+    encore y écrire) ; si la connexion est perdue entre-temps, le segment est remplacé.
+    """
+
+    def __init__(self, socket_path: str, slots: int = 16, slot_rows: int = 64, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.slots = slots
+        self.slot_rows = slot_rows
+        self.timeout = timeout
+        self.dimension: Optional[int] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._connect_lock = asyncio.Lock()
+        self._shm: Optional[SharedMemory] = None
+        self._free_slots: Optional[asyncio.Queue] = None
+        # Slots des requêtes expirées, rendus à l'arrivée de leur réponse tardive (id de requête -> slot)
+        self._late_slots: Dict[int, int] = {}
+        self._replace_shm = False
+
+    @classmethod
+    async def connect(cls, socket_path: str, **kwargs) -> "RemoteNLPAnalyzer":
+        client = cls(socket_path, **kwargs)
+        await client._ensure_connected()
+        return client
+
+    @property
+    def _slot_bytes(self) -> int:
+        return self.slot_rows * self.dimension * 4
+
+    async def _ensure_connected(self) -> None:
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError as e:
+                raise ModelServerError(f"Model server unreachable at {self.socket_path}: {e}") from e
+            self._reader_task = asyncio.create_task(self._read_responses())
+            hello = await self._request("hello", [])
+            if self._shm is None:
+                self.dimension = hello["dimension"]
+                self._shm = SharedMemory(create=True, size=self.slots * self._slot_bytes)
+                self._free_slots = asyncio.Queue()
+                for slot in range(self.slots):
+                    self._free_slots.put_nowait(slot)
+            elif self._replace_shm:
+                self._swap_shared_memory()
+            logger.info(f"Connected to model server {self.socket_path} (pid {hello['pid']}).")
+
+    def _swap_shared_memory(self) -> None:
+        """
+        Nouveau segment pour les slots de requêtes expirées dont la réponse ne viendra plus.
+        L'ancien segment est seulement détaché de son nom : les lectures en cours restent valides.
+        """
+        self._shm.unlink()
+        self._shm = SharedMemory(create=True, size=self.slots * self._slot_bytes)
+        self._replace_shm = False
+        logger.warning("Model server shared memory replaced after a lost connection.")
+
+    async def _read_responses(self) -> None:
+        error: Exception = ModelServerError("Connection to the model server closed.")
+        try:
+            while True:
+                response = await read_message(self._reader)
+                late_slot = self._late_slots.pop(response.get("id"), None)
+                if late_slot is not None:
+                    # Réponse tardive : le serveur a fini d'écrire dans ce slot
+                    self._free_slots.put_nowait(late_slot)
+                future = self._pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Connexion perdue ou message illisible : la connexion est réinitialisée
+            error = ModelServerError(f"Connection to the model server lost: {e}")
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self._late_slots:
+                # Ces réponses ne viendront plus : les slots sont rendus, sur un nouveau segment
+                for late_slot in self._late_slots.values():
+                    self._free_slots.put_nowait(late_slot)
+                self._late_slots.clear()
+                self._replace_shm = True
+
+    async def _request(self, method: str, args: List[Any], shm: Optional[Dict[str, Any]] = None,
+                       slot: Optional[int] = None) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        write_message(self._writer, {"id": request_id, "method": method, "args": args, "shm": shm})
+        await self._writer.drain()
+        try:
+            response = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            if slot is not None:
+                # Le serveur peut encore écrire dans ce slot : réservé jusqu'à la réponse tardive
+                self._late_slots[request_id] = slot
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+        error = response.get("error")
+        if error is not None:
+            if error["type"] == "queue_full":
+                raise NLPQueueFullError(error["message"])
+            raise ModelServerError(error["message"])
+        return response["result"]
+
+    def _decode(self, result: Dict[str, Any], matrix: Optional[np.ndarray]) -> Dict[str, Any]:
+        embedding = result["user_embedding"]
+        if embedding is None:
+            vector = None
+        elif "shm_row" in embedding:
+            vector = matrix[embedding["shm_row"]].copy()
+        else:
+            vector = np.asarray(embedding["inline"], dtype=np.float32)
+        return {"structured_analysis": result["structured_analysis"], "user_embedding": vector}
+
+    async def _call(self, method: str, args: List[Any], many: bool = False) -> Any:
+        await self._ensure_connected()
+        try:
+            slot = await asyncio.wait_for(self._free_slots.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ModelServerError(f"No free shared-memory slot for {method} within {self.timeout}s")
+        release = True
+        # Le segment peut être remplacé pendant l'attente : la réponse est lue dans celui de la requête
+        segment = self._shm
+        try:
+            offset = slot * self._slot_bytes
+            shm = {"name": segment.name, "pid": os.getpid(), "offset": offset, "rows": self.slot_rows}
+            result = await self._request(method, args, shm, slot)
+            matrix = np.ndarray((self.slot_rows, self.dimension), dtype=np.float32, buffer=segment.buf, offset=offset)
+            if many:
+                return [self._decode(r, matrix) for r in result]
+            return self._decode(result, matrix)
+        except asyncio.TimeoutError:
+            # Slot rendu par _read_responses à l'arrivée de la réponse tardive
+            release = False
+            raise ModelServerError(f"Model server did not answer {method} within {self.timeout}s")
+        finally:
+            if release:
+                self._free_slots.put_nowait(slot)
+
+    async def analyze_free_text(self, text: str) -> Dict[str, Any]:
+        return await self._call("analyze_free_text", [text])
+
+    async def analyze_questionnaire_responses(self, responses: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._call("analyze_questionnaire_responses", [responses])
+
+    async def analyze_many(self, inputs: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return await self._call("analyze_many", [inputs], many=True)
+
+    def shutdown(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
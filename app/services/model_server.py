@@ -0,0 +1,137 @@
+"""
+Serveur de modèles local (sidecar) : un processus unique charge spaCy et le modèle
+d'embedding, et sert les workers de l'API sur une socket Unix.
+
+    python -m app.services.model_server
+
+Toutes les requêtes des workers connectés passent par le même AsyncNLPAnalyzer : les
+embeddings sont donc micro-batchés entre workers. Les vecteurs sont écrits directement
+dans le segment de mémoire partagée fourni par le client (voir model_client.py).
+"""
+import asyncio
+import logging
+import os
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.nlp_executor import AsyncNLPAnalyzer, NLPQueueFullError, create_nlp_analyzer
+from app.services.practice_index import to_float32_vector
+from app.utils.ipc import attach_shared_memory, read_message, write_message
+
+logger = logging.getLogger(__name__)
+
+_METHODS = ("analyze_free_text", "analyze_questionnaire_responses", "analyze_many")
+
+
+class ModelServer:
+    def __init__(self, nlp_analyzer: AsyncNLPAnalyzer, socket_path: str, dimension: int):
+        self.nlp_analyzer = nlp_analyzer
+        self.socket_path = socket_path
+        self.dimension = dimension
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        logger.info(f"Model server listening on {self.socket_path} (embedding dimension {self.dimension}).")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        # Segments de mémoire partagée des clients de cette connexion, attachés à la demande
+        segments: Dict[str, SharedMemory] = {}
+        tasks = set()
+        try:
+            while True:
+                request = await read_message(reader)
+                task = asyncio.create_task(self._serve(request, writer, write_lock, segments))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for segment in segments.values():
+                segment.close()
+            writer.close()
+
+    async def _serve(self, request: Dict[str, Any], writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                     segments: Dict[str, SharedMemory]) -> None:
+        response: Dict[str, Any] = {"id": request.get("id")}
+        try:
+            response["result"] = await self._dispatch(request, segments)
+        except NLPQueueFullError as e:
+            response["error"] = {"type": "queue_full", "message": str(e)}
+        except Exception as e:
+            logger.error(f"Model server request {request.get('method')} failed: {e}")
+            response["error"] = {"type": "internal", "message": str(e)}
+        async with write_lock:
+            write_message(writer, response)
+            await writer.drain()
+
+    async def _dispatch(self, request: Dict[str, Any], segments: Dict[str, SharedMemory]) -> Any:
+        method = request.get("method")
+        if method == "hello":
+            return {"dimension": self.dimension, "pid": os.getpid()}
+        if method not in _METHODS:
+            raise ValueError(f"Unknown method: {method}")
+
+        result = await getattr(self.nlp_analyzer, method)(*request.get("args", []))
+        results = result if method == "analyze_many" else [result]
+        encoded = self._encode_embeddings(results, request.get("shm"), segments)
+        return encoded if method == "analyze_many" else encoded[0]
+
+    def _encode_embeddings(self, results: List[Dict[str, Any]], shm: Optional[Dict[str, Any]],
+                           segments: Dict[str, SharedMemory]) -> List[Dict[str, Any]]:
+        """Écrit les embeddings dans la zone mémoire du client (ou en ligne si elle est trop petite)."""
+        rows = [to_float32_vector(r["user_embedding"]) if r.get("user_embedding") is not None else None for r in results]
+        count = sum(row is not None for row in rows)
+        matrix = None
+        if shm is not None and count <= shm["rows"]:
+            segment = segments.get(shm["name"])
+            if segment is None:
+                segment = segments[shm["name"]] = attach_shared_memory(shm["name"], shm["pid"])
+            matrix = np.ndarray((shm["rows"], self.dimension), dtype=np.float32, buffer=segment.buf, offset=shm["offset"])
+
+        encoded, position = [], 0
+        for result, row in zip(results, rows):
+            if row is None:
+                embedding = None
+            elif matrix is not None:
+                matrix[position] = row
+                embedding = {"shm_row": position}
+                position += 1
+            else:
+                embedding = {"inline": row.tolist()}
+            encoded.append({"structured_analysis": result["structured_analysis"], "user_embedding": embedding})
+        return encoded
+
+
+async def serve(socket_path: str) -> None:
+    from app.config import get_settings
+    settings = get_settings()
+    nlp_analyzer = await create_nlp_analyzer(settings, mode="thread")
+    dimension = len(to_float32_vector((await nlp_analyzer.analyze_free_text("dimension"))["user_embedding"]))
+    server = ModelServer(nlp_analyzer, socket_path, dimension)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        nlp_analyzer.shutdown()
+
+
+if __name__ == "__main__":
+    from app.config import get_settings
+    from app.logging_config import setup_logging
+    setup_logging()
+    asyncio.run(serve(get_settings().MODEL_SERVER_SOCKET))
@@ -1,21 +1,37 @@
 import spacy
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+import numpy as np
+from typing import List, Dict, Any, Tuple, Union
 from functools import lru_cache
-import torch
 from app.config import get_settings
+from app.services.embedding_backends import load_embedding_backend
+from app.services.vocabulary import HOLISTIC_KEYWORDS, VocabularyMatcher, responses_to_text
+
+# Profils spaCy : (modèle, composants exclus). Seuls tok2vec, morphologizer, attribute_ruler
+# et lemmatizer sont utiles (POS, lemmes, mots vides) : parser et NER sont exclus par défaut.
+SPACY_PROFILES = {
+    "full": ("fr_core_news_lg", []),
+    "slim": ("fr_core_news_lg", ["parser", "ner"]),
+    "small": ("fr_core_news_sm", ["parser", "ner"]),
+}
+
+
+def load_spacy_pipeline(profile: str):
+    """Charge le pipeline spaCy du profil demandé, sans les composants inutiles."""
+    model_name, exclude = SPACY_PROFILES[profile]
+    return spacy.load(model_name, exclude=exclude)
+
 
 @lru_cache(maxsize=1)
 def get_nlp_resources():
     """Charge et met en cache les modèles NLP pour éviter de les recharger à chaque requête."""
     settings = get_settings()
-    print("Chargement des ressources NLP (spaCy et SentenceTransformer)...")
-    # Utilisation du modèle Spacy 
-    nlp = spacy.load("fr_core_news_lg")
-    # Utilisation du modèle d'embedding spécifié dans le notebook
-    embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+    print(f"Chargement des ressources NLP (spaCy et backend d'embedding {settings.EMBEDDING_BACKEND})...")
+    # Utilisation du modèle Spacy, limité aux composants nécessaires
+    nlp = load_spacy_pipeline(settings.SPACY_PROFILE)
+    # Modèle d'embedding spécifié dans le notebook, via le backend configuré (torch ou ONNX int8)
+    embedding_backend = load_embedding_backend(settings)
     print("Ressources NLP chargées.")
-    return nlp, embedding_model
+    return nlp, embedding_backend
 
 class NLPAnalyzer:
     """
@@ -23,30 +39,16 @@ class NLPAnalyzer:
     d'un questionnaire.
     """
     def __init__(self):
-        self.nlp, self.embedding_model = get_nlp_resources()
-        # Mots-clés enrichis basés sur le notebook
-        self.holistic_keywords = {
-    'stress': ['stress', 'anxiété', 'angoisse', 'nervosité', 'tension', 'éprouver du stress', 'irritabilité', 'pression', 'tension nerveuse', 'stress_anxiety'],
-    'douleur': ['douleur', 'mal', 'souffrance', 'inflammation', 'douleur physique', 'back_pain_specific', 'cervicalgie', 'lombalgie', 'mal de dos', 'tensions musculaires', 'douleur persistante', 'physical_pain'],
-    'fatigue': ['fatigue', 'épuisement', 'burnout', 'surmenage', 'manque d’énergie', 'épuisement mental', 'fatigue chronique', 'épuisement physique'],
-    'sommeil': ['insomnie', 'sommeil', 'dormir', 'cauchemar', 'troubles du sommeil', 'sommeil agité', 'dérèglement du sommeil', 'sleep_issues', 'fatigue liée au sommeil', 'trouble du sommeil'],
-    'digestion': ['digestion', 'ventre', 'intestin', 'estomac', 'troubles digestifs', 'ballonnements', 'indigestion', 'digestive', 'problèmes digestifs', 'mal de ventre', 'acidité gastrique']
-}
+        self.nlp, self.embedding_backend = get_nlp_resources()
+        # Mots-clés enrichis basés sur le notebook (voir app/services/vocabulary.py)
+        self.holistic_keywords = HOLISTIC_KEYWORDS
+        # Vocabulaires symptômes + urgence compilés en un seul automate
+        self.vocabulary_matcher = VocabularyMatcher(self.holistic_keywords)
 
 
     def _dict_to_text(self, data: Dict[str, Any]) -> str:
         """Convertit un dictionnaire de réponses de QCM en une phrase lisible."""
-        parts = []
-        for key, values in data.items():
-            # Remplace les clés techniques par des termes compréhensibles
-            key_fr = key.replace('_', ' ').replace('main concern', 'préoccupation principale').replace('pain location', 'localisation de la douleur')
-            if isinstance(values, list):
-                value_fr = ", ".join(str(v).replace('_', ' ') for v in values)
-                parts.append(f"{key_fr} est {value_fr}")
-            else:
-                parts.append(f"{key_fr} est {str(values).replace('_', ' ')}")
-        # Joindre toutes les parties en une seule phrase descriptive
-        return ". ".join(parts) + "."
+        return responses_to_text(data)
 
     def _extract_keywords(self, doc) -> List[str]:
         """Extrait les mots-clés pertinents (Noms, Adjectifs, Verbes)."""
@@ -57,60 +59,43 @@ class NLPAnalyzer:
                 keywords.append(token.lemma_.lower())  # Assurez-vous de convertir en minuscules
         return list(set(keywords))  # Supprimer les doublons
 
-    
-    def _identify_symptoms(self, doc) -> List[Dict[str, Any]]:
-        """Identifie les catégories de symptômes basées sur les mots-clés."""
-        symptoms = []
-        text_lower = doc.text.lower()  # Convertir le texte en minuscules pour rendre la comparaison insensible à la casse
-        
-        for category, keywords in self.holistic_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in text_lower:  # Assurez-vous que la recherche est insensible à la casse
-                    symptoms.append({'category': category, 'keyword': keyword})
-        
-        # Supprimer les doublons
-        return [dict(t) for t in {tuple(d.items()) for d in symptoms}]
-
-
-    def _identify_symptoms(self, doc) -> List[Dict[str, Any]]:
-        """Identifie les catégories de symptômes basées sur les mots-clés."""
-        symptoms = []
-        text_lower = doc.text.lower()
-        for category, keywords in self.holistic_keywords.items():
-            for keyword in keywords:
-                if keyword.replace('_', ' ') in text_lower: # Gérer les espaces dans les mots-clés
-                    symptoms.append({'category': category, 'keyword': keyword})
-        return [dict(t) for t in {tuple(d.items()) for d in symptoms}] # Supprimer les doublons
-
-    def _assess_urgency(self, doc) -> float:
-        """Évalue un niveau d'urgence simple basé sur des marqueurs."""
-        urgency_markers = {
-    'high': ['urgent', 'insupportable', 'sévère', 'aigu', 'extrême', 'intolérable', 'critique', 'insoutenable', 'très intense', 'très grave'],
-    'medium': ['gênant', 'difficile', 'intense', 'modéré', 'inconfortable', 'problématique', 'notable', 'significatif', 'perturbant'],
-    'low': ['léger', 'occasionnel', 'faible', 'discret', 'supportable', 'modéré', 'bénin', 'peu dérangeant', 'passager']
-}
 
-        text_lower = doc.text.lower()
-        if any(marker in text_lower for marker in urgency_markers['high']): return 0.9
-        if any(marker in text_lower for marker in urgency_markers['medium']): return 0.6
-        if any(marker in text_lower for marker in urgency_markers['low']): return 0.3
-        return 0.3 # Niveau par défaut
+    def _identify_symptoms_and_urgency(self, doc) -> Tuple[List[Dict[str, Any]], float]:
+        """Catégories de symptômes et niveau d'urgence, en une seule passe de l'automate compilé."""
+        return self.vocabulary_matcher.match(doc.text)
 
-    def _generate_embedding(self, text: str) -> torch.Tensor:
+    def _generate_embedding(self, text: str) -> np.ndarray:
         """Génère l'embedding vectoriel pour un texte donné."""
-        return self.embedding_model.encode(text, convert_to_tensor=True)
+        return self.embedding_backend.encode([text])[0]
+
+    def _empty_analysis(self) -> Dict[str, Any]:
+        return {"structured_analysis": {"keywords": [], "symptoms": [], "urgency_level": 0.0}, "user_embedding": None}
+
+    def _structured_analysis(self, doc) -> Dict[str, Any]:
+        symptoms, urgency_level = self._identify_symptoms_and_urgency(doc)
+        return {
+            'keywords': self._extract_keywords(doc),
+            'symptoms': symptoms,
+            'urgency_level': urgency_level
+        }
+
+    def encode_batch(self, texts: List[str]):
+        """Encode un lot de textes en un seul passage du modèle (matrice NumPy float32)."""
+        return self.embedding_backend.encode(texts, batch_size=len(texts))
+
+    def analyze_structure(self, text: str) -> Dict[str, Any]:
+        """Analyse structurée seule (spaCy + mots-clés), sans calcul d'embedding."""
+        if not text or not text.strip():
+            return self._empty_analysis()["structured_analysis"]
+        return self._structured_analysis(self.nlp(text.lower()))
 
     def _analyze(self, text: str) -> Dict[str, Any]:
         """Méthode d'analyse interne, utilisée par les deux points d'entrée publics."""
         if not text or not text.strip():
-             return {"structured_analysis": {"keywords": [], "symptoms": [], "urgency_level": 0.0}, "user_embedding": None}
+             return self._empty_analysis()
 
         doc = self.nlp(text.lower())
-        analysis = {
-            'keywords': self._extract_keywords(doc),
-            'symptoms': self._identify_symptoms(doc),
-            'urgency_level': self._assess_urgency(doc)
-        }
+        analysis = self._structured_analysis(doc)
         user_embedding = self._generate_embedding(text)
         return {"structured_analysis": analysis, "user_embedding": user_embedding}
         
@@ -129,4 +114,25 @@ class NLPAnalyzer:
         print(f"Texte généré à partir du QCM : {text_from_responses}") # Pour le débogage
         
         # 2. Analyser le texte généré
-        return self._analyze(text_from_responses)
\ No newline at end of file
+        return self._analyze(text_from_responses)
+
+    def analyze_many(self, inputs: List[Union[str, Dict[str, Any]]], batch_size: int = 64) -> List[Dict[str, Any]]:
+        """
+        Analyse un lot de textes libres et/ou de réponses de QCM en une seule passe :
+        spaCy via nlp.pipe et un seul appel à encode() pour tout le lot.
+        Les embeddings sont retournés sous forme de vecteurs NumPy float32.
+        """
+        texts = [self._dict_to_text(item) if isinstance(item, dict) else (item or "") for item in inputs]
+        results = [self._empty_analysis() for _ in texts]
+
+        valid = [i for i, text in enumerate(texts) if text.strip()]
+        if not valid:
+            return results
+
+        valid_texts = [texts[i] for i in valid]
+        docs = self.nlp.pipe((text.lower() for text in valid_texts), batch_size=batch_size)
+        embeddings = self.embedding_backend.encode(valid_texts, batch_size=batch_size)
+
+        for i, doc, embedding in zip(valid, docs, embeddings):
+            results[i] = {"structured_analysis": self._structured_analysis(doc), "user_embedding": embedding}
+        return results
\ No newline at end of file
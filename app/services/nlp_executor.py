@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+
+from app.monitoring.monitoring import NLP_COMPUTE_TIME, NLP_QUEUE_DEPTH, NLP_QUEUE_REJECTED, NLP_QUEUE_WAIT
+from app.services.analysis_cache import AnalysisCache
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.questionnaire_model import QuestionnaireModel, load_questions
+from app.services.vocabulary import responses_to_text
+
+logger = logging.getLogger(__name__)
+
+# Analyseur préchargé dans chaque worker du pool de processus
+_PROCESS_ANALYZER = None
+
+
+class NLPQueueFullError(Exception):
+    """Levée quand trop d'analyses NLP sont déjà en attente : le client doit réessayer plus tard."""
+
+
+def _set_torch_threads(torch_threads: int) -> None:
+    if torch_threads > 0:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+
+def _init_process_worker(torch_threads: int) -> None:
+    """Initialiseur des workers du pool de processus : charge les modèles une seule fois."""
+    global _PROCESS_ANALYZER
+    _set_torch_threads(torch_threads)
+    from app.services.nlp_analyzer import NLPAnalyzer
+    _PROCESS_ANALYZER = NLPAnalyzer()
+
+
+def _worker_pid() -> int:
+    """Tâche vide du préchauffage : un worker ne l'exécute qu'après son initialiseur (modèles chargés)."""
+    if _PROCESS_ANALYZER is None:
+        raise RuntimeError("NLP worker process has no loaded analyzer.")
+    return os.getpid()
+
+
+def _timed_call(analyzer, method: str, args: tuple):
+    """Exécute `analyzer.method(*args)` et retourne (résultat, début, fin) sur l'horloge monotone."""
+    analyzer = analyzer if analyzer is not None else _PROCESS_ANALYZER
+    started = time.monotonic()
+    result = getattr(analyzer, method)(*args)
+    return result, started, time.monotonic()
+
+
+async def create_nlp_analyzer(settings, mode: Optional[str] = None) -> "AsyncNLPAnalyzer":
+    """Construit l'analyseur local configuré (modèles, cache, micro-batching, questionnaire compilé)."""
+    mode = mode or settings.NLP_EXECUTOR
+    analyzer = None
+    if mode == "thread":
+        from app.services.nlp_analyzer import NLPAnalyzer
+        analyzer = await asyncio.to_thread(NLPAnalyzer)
+    nlp_analyzer = AsyncNLPAnalyzer(
+        analyzer=analyzer,
+        mode=mode,
+        max_workers=settings.NLP_EXECUTOR_WORKERS,
+        # Le backend ONNX a son propre budget de threads (ONNX_INTRA_OP_THREADS)
+        torch_threads=settings.NLP_TORCH_THREADS if settings.EMBEDDING_BACKEND == "torch" else 0,
+        max_queue_depth=settings.NLP_MAX_QUEUE_DEPTH,
+        batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS if settings.EMBEDDING_BATCH_ENABLED else None,
+        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        cache=AnalysisCache(
+            model_version=f"{settings.EMBEDDING_MODEL_NAME}:{settings.EMBEDDING_BACKEND}:{settings.SPACY_PROFILE}",
+            max_entries=settings.NLP_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.NLP_CACHE_TTL_SECONDS,
+        ) if settings.NLP_CACHE_ENABLED else None,
+    )
+    if mode == "process":
+        # Le composant n'est prêt qu'une fois les modèles chargés dans chaque worker
+        await nlp_analyzer.warm_up()
+
+    # Modèle compilé du questionnaire : options précalculées une fois au démarrage
+    if settings.QUESTIONNAIRE_FAST_PATH:
+        try:
+            nlp_analyzer.questionnaire_model = await QuestionnaireModel.compile(
+                load_questions(), nlp_analyzer.analyze_many
+            )
+        except Exception as e:
+            # Sans modèle compilé, les réponses au QCM passent par l'analyse complète
+            logger.warning(f"Questionnaire model not compiled: {e}")
+    return nlp_analyzer
+
+
+class AsyncNLPAnalyzer:
+    """
+    Façade asynchrone de NLPAnalyzer : l'analyse (spaCy + transformer) s'exécute dans un
+    pool de threads ou de processus pour ne pas bloquer la boucle d'événements.
+    La file est bornée : au-delà de `max_queue_depth` analyses en cours, NLPQueueFullError.
+    Une analyse compte jusqu'à la fin réelle de son calcul, même si l'appelant a été annulé.
+    Avec `batch_window_ms`, les embeddings des requêtes concurrentes sont micro-batchés.
+    Avec `cache` (AnalysisCache), les textes déjà analysés ne repassent pas par les modèles.
+    Si `questionnaire_model` est compilé, les réponses au QCM sont analysées sans inférence.
+    """
+
+    def __init__(self, analyzer=None, mode: str = "thread", max_workers: int = 2,
+                 torch_threads: int = 0, max_queue_depth: int = 32,
+                 batch_window_ms: Optional[float] = None, max_batch_size: int = 32,
+                 cache: Optional[AnalysisCache] = None):
+        self.mode = mode
+        self.cache = cache
+        self.questionnaire_model: Optional[QuestionnaireModel] = None
+        self.max_queue_depth = max_queue_depth
+        self.max_workers = max_workers
+        self._pending = 0
+        # Le compteur est décrémenté depuis le thread qui termine le calcul
+        self._pending_lock = threading.Lock()
+
+        self._executor: Executor
+        if mode == "process":
+            # En mode processus, les modèles ne sont chargés que dans les workers
+            self.analyzer = None
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(torch_threads,),
+            )
+        elif mode == "thread":
+            if analyzer is None:
+                raise ValueError("Thread mode requires a loaded NLPAnalyzer.")
+            self.analyzer = analyzer
+            _set_torch_threads(torch_threads)
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nlp")
+        else:
+            raise ValueError(f"Unknown NLP executor mode: {mode}")
+        self.batcher = None
+        if batch_window_ms is not None:
+            self.batcher = EmbeddingBatcher(self._encode_batch, max_batch_size=max_batch_size, max_wait_ms=batch_window_ms)
+        logger.info(f"NLP executor started: mode={mode}, workers={max_workers}, max queue depth={max_queue_depth}")
+
+    def _release(self, _future=None) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+            NLP_QUEUE_DEPTH.set(self._pending)
+
+    async def _submit(self, method: str, *args) -> Any:
+        with self._pending_lock:
+            if self._pending >= self.max_queue_depth:
+                NLP_QUEUE_REJECTED.inc()
+                raise NLPQueueFullError(f"NLP queue is full ({self._pending} pending analyses).")
+            self._pending += 1
+            NLP_QUEUE_DEPTH.set(self._pending)
+
+        submitted = time.monotonic()
+        try:
+            future = self._executor.submit(_timed_call, self.analyzer, method, args)
+        except Exception:
+            self._release()
+            raise
+        # Libéré à la fin du calcul, pas à l'annulation de l'appelant : un calcul déjà lancé
+        # continue dans le thread ou le processus (seul un calcul encore en file est annulé)
+        future.add_done_callback(self._release)
+        result, started, finished = await asyncio.wrap_future(future)
+
+        NLP_QUEUE_WAIT.labels(operation=method).observe(max(0.0, started - submitted))
+        NLP_COMPUTE_TIME.labels(operation=method).observe(finished - started)
+        return result
+
+    async def warm_up(self, max_rounds: int = 10) -> None:
+        """Mode processus : attend que chaque worker ait chargé ses modèles (une tâche vide par worker)."""
+        if self.mode != "process":
+            return
+        loop = asyncio.get_running_loop()
+        pids = set()
+        for _ in range(max_rounds):
+            pids.update(await asyncio.gather(*(loop.run_in_executor(self._executor, _worker_pid)
+                                               for _ in range(self.max_workers))))
+            if len(pids) >= self.max_workers:
+                break
+        logger.info(f"NLP worker processes warmed up: {len(pids)}/{self.max_workers}.")
+
+    async def _encode_batch(self, texts: List[str]):
+        return await self._submit("encode_batch", texts)
+
+    async def _analyze_batched(self, text: str) -> Dict[str, Any]:
+        """Analyse structurée dans l'exécuteur et embedding via le micro-batcher, en parallèle."""
+        if not text or not text.strip():
+            return {"structured_analysis": await self._submit("analyze_structure", text), "user_embedding": None}
+        structured_analysis, user_embedding = await asyncio.gather(
+            self._submit("analyze_structure", text),
+            self.batcher.embed(text),
+        )
+        return {"structured_analysis": structured_analysis, "user_embedding": user_embedding}
+
+    async def _analyze_text(self, text: str) -> Dict[str, Any]:
+        if self.batcher is not None:
+            return await self._analyze_batched(text)
+        return await self._submit("analyze_free_text", text)
+
+    async def analyze_free_text(self, text: str) -> Dict[str, Any]:
+        if self.cache is None:
+            return await self._analyze_text(text)
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        result = await self._analyze_text(text)
+        self.cache.set(text, result)
+        return result
+
+    async def analyze_questionnaire_responses(self, responses: Dict[str, Any]) -> Dict[str, Any]:
+        if self.questionnaire_model is not None:
+            rows, residual = self.questionnaire_model.split(responses)
+            residual_analysis = None
+            if residual:
+                # Seules les réponses hors options (texte libre) passent par les modèles
+                residual_analysis = await self.analyze_free_text(responses_to_text(residual))
+            return self.questionnaire_model.aggregate(rows, residual_analysis, residual_weight=len(residual))
+        if self.batcher is None and self.cache is None:
+            return await self._submit("analyze_questionnaire_responses", responses)
+        # Le texte généré est déterministe : mêmes réponses -> même entrée de cache
+        return await self.analyze_free_text(responses_to_text(responses))
+
+    async def analyze_many(self, inputs: List[Union[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if self.cache is None:
+            return await self._submit("analyze_many", inputs)
+        texts = [responses_to_text(item) if isinstance(item, dict) else (item or "") for item in inputs]
+        results: List[Optional[Dict[str, Any]]] = [self.cache.get(text) for text in texts]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            computed = await self._submit("analyze_many", [texts[i] for i in misses])
+            for i, result in zip(misses, computed):
+                self.cache.set(texts[i], result)
+                results[i] = result
+        return results
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+from app.services.ann_index import IVFInt8Index
+from app.utils.embedding_codec import (
+    EMBEDDING_DIM_FIELD,
+    EMBEDDING_FIELD,
+    EMBEDDING_MODEL_FIELD,
+    decode_embedding,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seuls champs lus depuis MongoDB pour construire l'index
+INDEX_PROJECTION = {
+    "practice.name": 1,
+    "indications.primary.condition": 1,
+    "indications.secondary": 1,
+    "keywords.symptoms": 1,
+    EMBEDDING_FIELD: 1,
+    EMBEDDING_DIM_FIELD: 1,
+    EMBEDDING_MODEL_FIELD: 1,
+}
+
+# Seuil de similarité fuzzy entre un symptôme utilisateur et un mot-clé de pratique
+FUZZY_MATCH_THRESHOLD = 80
+# Nombre maximal de symptômes hors vocabulaire mémorisés
+MAX_MEMOIZED_SYMPTOMS = 1024
+# Instantané sur disque (matrice relue en mmap, partagée entre workers)
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_EMBEDDINGS_FILE = "embeddings.npy"
+SNAPSHOT_META_FILE = "practices.json"
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalise a keyword (or an indication) for exact matching."""
+    return keyword.strip().lower()
+
+
+def to_float32_vector(embedding: Any) -> np.ndarray:
+    """Converts a torch tensor, a list or an array into a flat float32 NumPy vector."""
+    if hasattr(embedding, "detach"):  # torch.Tensor, sans importer torch ici
+        embedding = embedding.detach().cpu().numpy()
+    return np.asarray(embedding, dtype=np.float32).reshape(-1)
+
+
+class PracticeIndex:
+    """
+    Read-only view of the practice catalog, built once and shared by every request.
+
+    Row ``i`` of ``embeddings`` is the L2-normalised embedding of ``practices[i]``,
+    so a cosine similarity against the whole catalog is a single matrix-vector product.
+
+    Keyword matching is precomputed as well: an inverted index from normalised
+    indication/condition strings to rows, and a fuzzy match table from each known
+    symptom category to the rows whose keywords it matches.
+    """
+
+    def __init__(
+        self,
+        practices: List[Dict[str, Any]],
+        model_version: Optional[str] = None,
+        symptom_vocabulary: Iterable[str] = (),
+    ):
+        self.practices: List[Dict[str, Any]] = []
+        vectors = []
+        stale = 0
+
+        for practice in practices:
+            embedding = practice.get(EMBEDDING_FIELD)
+            if embedding is None:
+                logger.warning(f"Practice {practice.get('_id')} has no embedding, skipped from the index.")
+                continue
+
+            indications = practice.get("indications", {})
+            self.practices.append({
+                "_id": str(practice["_id"]),
+                "practice_name": practice["practice"]["name"],
+                # Valeurs manquantes (condition absente...) écartées : elles ne correspondent à rien
+                # et empêcheraient le tri à l'écriture de l'instantané
+                "primary_indications": {p.get("condition") for p in indications.get("primary", [])} - {None},
+                "secondary_indications": set(indications.get("secondary", [])) - {None},
+                "keywords": set(practice.get("keywords", {}).get("symptoms", [])) - {None},
+            })
+            vectors.append(decode_embedding(embedding, practice.get(EMBEDDING_DIM_FIELD)))
+            stored_model = practice.get(EMBEDDING_MODEL_FIELD)
+            if model_version and stored_model and stored_model != model_version:
+                stale += 1
+
+        if stale:
+            logger.warning(f"{stale} practice embeddings were produced by another model than '{model_version}'.")
+
+        if vectors:
+            matrix = np.vstack(vectors).astype(np.float32, copy=False)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.embeddings = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        else:
+            self.embeddings = np.zeros((0, 0), dtype=np.float32)
+
+        # Index ANN optionnel (grands catalogues), attaché par le Recommender au chargement
+        self.ann: Optional[IVFInt8Index] = None
+
+        # Index inversé : indication/condition normalisée -> lignes
+        self.condition_index = self._build_condition_index(self.practices)
+
+        # Table de correspondance fuzzy, calculée une fois pour le vocabulaire connu
+        self.symptom_matches: Dict[str, FrozenSet[int]] = {}
+        for symptom in symptom_vocabulary:
+            symptom = normalize_keyword(symptom)
+            self.symptom_matches[symptom] = self._compute_fuzzy_matches(symptom)
+
+    @staticmethod
+    def _build_condition_index(practices: List[Dict[str, Any]]) -> Dict[str, Set[int]]:
+        condition_index: Dict[str, Set[int]] = {}
+        for row, practice in enumerate(practices):
+            for condition in practice["primary_indications"] | practice["secondary_indications"]:
+                if condition:
+                    condition_index.setdefault(normalize_keyword(condition), set()).add(row)
+        return condition_index
+
+    def save(self, directory: Path) -> None:
+        """
+        Writes the index as a snapshot: the embedding matrix as .npy (reloaded with mmap)
+        and the metadata plus the fuzzy match table as JSON. The directory is replaced atomically.
+        """
+        directory = Path(directory)
+        staging = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        np.save(staging / SNAPSHOT_EMBEDDINGS_FILE, self.embeddings)
+        meta = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "practices": [
+                {key: sorted(value) if isinstance(value, set) else value for key, value in practice.items()}
+                for practice in self.practices
+            ],
+            "symptom_matches": {symptom: sorted(rows) for symptom, rows in self.symptom_matches.items()},
+        }
+        (staging / SNAPSHOT_META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+
+    @classmethod
+    def load(cls, directory: Path) -> "PracticeIndex":
+        """Reloads a snapshot written by ``save``; the embedding matrix is memory-mapped read-only."""
+        directory = Path(directory)
+        meta = json.loads((directory / SNAPSHOT_META_FILE).read_text(encoding="utf-8"))
+        if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported practice index snapshot: {meta.get('format_version')}")
+        index = cls([])
+        index.practices = [
+            {key: set(value) if isinstance(value, list) else value for key, value in practice.items()}
+            for practice in meta["practices"]
+        ]
+        index.embeddings = np.load(directory / SNAPSHOT_EMBEDDINGS_FILE, mmap_mode="r")
+        index.condition_index = cls._build_condition_index(index.practices)
+        index.symptom_matches = {symptom: frozenset(rows) for symptom, rows in meta["symptom_matches"].items()}
+        return index
+
+    def __len__(self) -> int:
+        return len(self.practices)
+
+    @property
+    def dimension(self) -> int:
+        return self.embeddings.shape[1]
+
+    @staticmethod
+    def _normalized_query(user_embedding: Any) -> np.ndarray:
+        query = to_float32_vector(user_embedding)
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def similarities(self, user_embedding: Any, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity between one user embedding and every practice (or only ``rows``)."""
+        query = self._normalized_query(user_embedding)
+        if rows is not None:
+            return self.embeddings[rows] @ query
+        return self.embeddings @ query
+
+    def ann_candidates(self, user_embedding: Any, k: int, nprobe: int) -> np.ndarray:
+        """Approximate top-k rows from the ANN index (requires ``ann`` to be set)."""
+        return self.ann.search(self._normalized_query(user_embedding), k, nprobe)
+
+    def similarities_many(self, user_embeddings: List[Any]) -> np.ndarray:
+        """Cosine similarities of many user embeddings at once: a single (users x practices) matrix product."""
+        queries = np.vstack([to_float32_vector(e) for e in user_embeddings])
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (queries / norms) @ self.embeddings.T
+
+    def _compute_fuzzy_matches(self, symptom: str) -> FrozenSet[int]:
+        return frozenset(
+            row for row, practice in enumerate(self.practices)
+            if any(fuzz.partial_ratio(symptom, keyword) > FUZZY_MATCH_THRESHOLD for keyword in practice["keywords"])
+        )
+
+    def fuzzy_matches(self, symptom: str) -> FrozenSet[int]:
+        """Rows whose keywords fuzzy-match the symptom; unseen symptoms are computed once then memoised."""
+        symptom = normalize_keyword(symptom)
+        rows = self.symptom_matches.get(symptom)
+        if rows is None:
+            rows = self._compute_fuzzy_matches(symptom)
+            if len(self.symptom_matches) < MAX_MEMOIZED_SYMPTOMS:
+                self.symptom_matches[symptom] = rows
+        return rows
+
+    def keyword_match_counts(self, symptoms: Iterable[str]) -> np.ndarray:
+        """
+        Number of matched symptoms per practice: one point for an exact indication
+        match, one point for a fuzzy keyword match.
+        """
+        counts = np.zeros(len(self.practices), dtype=np.float32)
+        for symptom in {normalize_keyword(s) for s in symptoms}:
+            exact_rows = self.condition_index.get(symptom)
+            if exact_rows:
+                counts[list(exact_rows)] += 1
+            fuzzy_rows = self.fuzzy_matches(symptom)
+            if fuzzy_rows:
+                counts[list(fuzzy_rows)] += 1
+        return counts
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Returns the row indices of the ``k`` highest scores, best first."""
+        if k <= 0 or scores.size == 0:
+            return np.empty(0, dtype=np.int64)
+        if k < scores.size:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.size)
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
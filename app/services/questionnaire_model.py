@@ -0,0 +1,124 @@
+"""
+Modèle compilé du questionnaire : chaque couple (question, option) de questions.yaml est
+analysé une seule fois au démarrage (embedding + catégories de symptômes + urgence).
+Une réponse au questionnaire est ensuite analysée par agrégation de ces résultats
+précalculés, sans inférence ; seules les réponses inconnues (texte libre) passent par les modèles.
+"""
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import yaml
+
+from app.services.practice_index import to_float32_vector
+from app.services.vocabulary import DEFAULT_URGENCY, responses_to_text
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_PATH = Path(__file__).resolve().parent.parent / "data" / "questions.yaml"
+
+
+def load_questions(path: Path = QUESTIONS_PATH) -> Dict[str, Any]:
+    """Charge les définitions de questions depuis questions.yaml."""
+    with open(path, "r", encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get("questions", {})
+
+
+def _option_values(question: Dict[str, Any]) -> Iterator[str]:
+    """Toutes les valeurs de réponse énumérées d'une question."""
+    values = [option["value"] for option in question.get("options") or [] if isinstance(option, dict) and "value" in option]
+    yield from (str(value) for value in values)
+    # Carte du corps : les zones sont les clés des conditions de suivi
+    yield from (str(zone) for zone in (question.get("follow_up_conditions") or {}))
+    # Échelle : toutes les valeurs entières entre le minimum et le maximum
+    numeric = [value for value in values if isinstance(value, int)]
+    if question.get("type") == "scale" and numeric:
+        yield from (str(value) for value in range(min(numeric), max(numeric) + 1))
+
+
+def _answer_values(answer: Any) -> List[str]:
+    values = answer if isinstance(answer, list) else [answer]
+    return [str(value) for value in values if value is not None and str(value).strip()]
+
+
+class QuestionnaireModel:
+    """Table précalculée (question, option) -> (embedding, mots-clés, symptômes, urgence)."""
+
+    def __init__(self, keys: List[Tuple[str, str]], embeddings: np.ndarray, analyses: List[Dict[str, Any]]):
+        self.rows = {key: row for row, key in enumerate(keys)}
+        self.embeddings = embeddings
+        self.analyses = analyses
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @staticmethod
+    def option_texts(questions: Dict[str, Any]) -> Dict[Tuple[str, str], str]:
+        """Texte de chaque couple (question, option), tel que produit par responses_to_text."""
+        texts = {}
+        for question_id, question in questions.items():
+            if not isinstance(question, dict):
+                continue
+            for value in _option_values(question):
+                texts[(question_id, value)] = responses_to_text({question_id: value})
+        return texts
+
+    @classmethod
+    async def compile(cls, questions: Dict[str, Any],
+                      analyze_many: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]) -> "QuestionnaireModel":
+        """Analyse toutes les options en un seul lot (spaCy + embeddings)."""
+        texts = cls.option_texts(questions)
+        keys = list(texts)
+        results = await analyze_many([texts[key] for key in keys])
+
+        kept = [(key, result) for key, result in zip(keys, results) if result.get("user_embedding") is not None]
+        embeddings = np.vstack([to_float32_vector(result["user_embedding"]) for _, result in kept]) if kept else np.empty((0, 0), dtype=np.float32)
+        model = cls([key for key, _ in kept], embeddings, [result["structured_analysis"] for _, result in kept])
+        logger.info(f"Questionnaire model compiled: {len(model)} (question, option) pairs.")
+        return model
+
+    def split(self, responses: Dict[str, Any]) -> Tuple[List[int], Dict[str, Any]]:
+        """Sépare les réponses en lignes précalculées et réponses à analyser par les modèles."""
+        rows, residual = [], {}
+        for question_id, answer in responses.items():
+            unknown = []
+            for value in _answer_values(answer):
+                row = self.rows.get((question_id, value))
+                if row is None:
+                    unknown.append(value)
+                else:
+                    rows.append(row)
+            if unknown:
+                residual[question_id] = unknown if isinstance(answer, list) else unknown[0]
+        return rows, residual
+
+    def aggregate(self, rows: List[int], residual_analysis: Optional[Dict[str, Any]] = None,
+                  residual_weight: int = 1) -> Dict[str, Any]:
+        """
+        Combine les analyses précalculées (et éventuellement celle des réponses libres) :
+        moyenne des embeddings, union des mots-clés et symptômes, urgence maximale.
+        """
+        analyses = [self.analyses[row] for row in rows]
+        vectors = [self.embeddings[row] for row in rows]
+        weights = [1.0] * len(rows)
+        if residual_analysis is not None and residual_analysis.get("user_embedding") is not None:
+            analyses.append(residual_analysis["structured_analysis"])
+            vectors.append(to_float32_vector(residual_analysis["user_embedding"]))
+            weights.append(float(residual_weight))
+
+        if not vectors:
+            return {"structured_analysis": {"keywords": [], "symptoms": [], "urgency_level": 0.0}, "user_embedding": None}
+
+        keywords, symptoms = set(), {}
+        for analysis in analyses:
+            keywords.update(analysis["keywords"])
+            for symptom in analysis["symptoms"]:
+                symptoms.setdefault((symptom["category"], symptom["keyword"]), symptom)
+        structured_analysis = {
+            "keywords": sorted(keywords),
+            "symptoms": list(symptoms.values()),
+            "urgency_level": max([DEFAULT_URGENCY] + [analysis["urgency_level"] for analysis in analyses]),
+        }
+        user_embedding = np.average(np.vstack(vectors), axis=0, weights=weights).astype(np.float32)
+        return {"structured_analysis": structured_analysis, "user_embedding": user_embedding}
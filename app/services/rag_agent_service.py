@@ -1,18 +1,20 @@
 import logging
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 import google.generativeai as genai
 from qdrant_client import QdrantClient
 from langchain_core.embeddings import Embeddings
-from langchain_qdrant import QdrantVectorStore
 from agno.agent import Agent
 from agno.models.google import Gemini
-from langchain_core.documents import Document
-from langchain.retrievers import EnsembleRetriever,BM25Retriever
-#from langchain_community.retrievers import BM25Retriever
 
 from app.config import Settings
+from app.monitoring.monitoring import RAG_CONTEXT_TABLE
+from app.services.context_table import advice_query, load_context_table
+from app.services.retrieval import HybridRetriever, build_async_qdrant_client
+from app.services.sparse_index import load_or_build_sparse_index
+from app.utils.prefork import get_preloaded
+from app.utils.text import normalize_practice_id
 
 logger = logging.getLogger(__name__)
 
@@ -36,14 +38,24 @@ class GeminiEmbedder(Embeddings):
             logger.error(f"Error embedding query with Gemini: {e}")
             return []
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embedding de plusieurs requêtes en un seul appel embed_content."""
+        try:
+            return genai.embed_content(model=self.model, content=texts, task_type="retrieval_query")['embedding']
+        except Exception as e:
+            logger.error(f"Error embedding queries with Gemini: {e}")
+            return [[] for _ in texts]
+
 class RAGAgentService:
     def __init__(self, settings: Settings):
         """
-        Initialise le service RAG avec une connexion à Qdrant, un Ensemble Retriever, et l'agent Agno.
+        Initialise le service RAG avec une connexion à Qdrant, un retriever hybride (dense + BM25), et l'agent Agno.
         """
         self.settings = settings
         self.qdrant_client = None
-        self.ensemble_retriever = None
+        self.async_qdrant_client = None
+        self.retriever = None
+        self.context_table = None
 
         # --- 1. Initialiser le client Qdrant ---
         try:
@@ -64,47 +76,54 @@ class RAGAgentService:
             self.qdrant_client.get_collection(collection_name=self.settings.QDRANT_COLLECTION_NAME)
             logger.info("Collection trouvée.")
 
-            vector_store = QdrantVectorStore(
-                client=self.qdrant_client,
-                collection_name=self.settings.QDRANT_COLLECTION_NAME,
-                embedding=GeminiEmbedder(
-                    model_name=self.settings.GEMINI_EMBEDDING_MODEL_NAME, 
-                    api_key=self.settings.GOOGLE_API_KEY
-                )
+            embedder = GeminiEmbedder(
+                model_name=self.settings.GEMINI_EMBEDDING_MODEL_NAME, 
+                api_key=self.settings.GOOGLE_API_KEY
             )
-            dense_retriever = vector_store.as_retriever(search_kwargs={"k": 5})
             logger.info(f"📚 Dense retriever connecté à la collection : {self.settings.QDRANT_COLLECTION_NAME}")
         except Exception as e:
             logger.error(f"🔴 La collection '{self.settings.QDRANT_COLLECTION_NAME}' est introuvable ou la connexion a échoué : {e}.")
             return
 
-        # --- 3. Initialiser le BM25 Retriever (Sparse Retriever) ---
+        # --- 3. Charger l'index lexical BM25 (Sparse Retriever), persisté sur disque et relu en mmap ---
         try:
-            logger.info("Chargement des documents pour le retriever BM25...")
-            all_docs = []
-            # Utilise scroll pour récupérer efficacement tous les documents
-            response, _ = self.qdrant_client.scroll(
-                collection_name=self.settings.QDRANT_COLLECTION_NAME,
-                with_payload=True, with_vectors=False, limit=25000
-            )
-            for record in response:
-                all_docs.append(Document(page_content=record.payload.get('page_content', ''), metadata=record.payload.get('metadata', {})))
+            # En mode prefork, l'index a été vérifié (ou reconstruit) une fois par le processus maître
+            sparse_index = get_preloaded("sparse_index")
+            if sparse_index is None:
+                sparse_index = load_or_build_sparse_index(
+                    self.qdrant_client, self.settings.QDRANT_COLLECTION_NAME, self.settings.SPARSE_INDEX_DIR
+                )
 
-            if not all_docs:
+            if not len(sparse_index):
                 logger.warning("Aucun document trouvé dans Qdrant pour construire l'index BM25. Seule la recherche dense sera utilisée.")
-                self.ensemble_retriever = dense_retriever
-            else:
-                bm25_retriever = BM25Retriever.from_documents(all_docs, k=5)
-                
-                # --- 4. Créer l'Ensemble Retriever ---
-                self.ensemble_retriever = EnsembleRetriever(
-                    retrievers=[dense_retriever, bm25_retriever],
-                    weights=[0.5, 0.5]  # Poids 50% dense, 50% sparse.
-                )
-                logger.info("✅ Retriever d'Ensemble initialisé.")
+                sparse_index = None
         except Exception as e:
-            logger.error(f"🔴 Échec de l'initialisation du Retriever d'Ensemble : {e}. Retour à la recherche dense seule.")
-            self.ensemble_retriever = dense_retriever
+            logger.error(f"🔴 Échec du chargement de l'index BM25 : {e}. Retour à la recherche dense seule.")
+            sparse_index = None
+
+        # --- 4. Créer le retriever hybride : toutes les requêtes d'un conseil en un seul lot ---
+        # La recherche dense utilise un client asynchrone partagé (pool de connexions borné) ;
+        # le client synchrone ne sert qu'au démarrage (vérification, index BM25)
+        self.async_qdrant_client = build_async_qdrant_client(self.settings)
+        self.retriever = HybridRetriever(
+            qdrant_client=self.async_qdrant_client,
+            collection_name=self.settings.QDRANT_COLLECTION_NAME,
+            embed_queries=embedder.embed_queries,
+            sparse_index=sparse_index,
+            k=5,
+            weights=(0.5, 0.5),  # Poids 50% dense, 50% sparse.
+            timeout=self.settings.QDRANT_QUERY_TIMEOUT_SECONDS,
+        )
+        logger.info("✅ Retriever hybride initialisé.")
+
+        # --- 4 bis. Contextes précalculés par (pratique, catégories), ignorés si la collection a changé ---
+        if self.settings.CONTEXT_TABLE_ENABLED:
+            try:
+                self.context_table = get_preloaded("context_table") or load_context_table(
+                    self.settings.CONTEXT_TABLE_PATH, self.qdrant_client, self.settings.QDRANT_COLLECTION_NAME
+                )
+            except Exception as e:
+                logger.error(f"🔴 Échec du chargement de la table des contextes : {e}. Recherche en direct uniquement.")
 
         # --- 5. Initialiser l'agent Agno ---
         self.agent = Agent(
@@ -116,6 +135,13 @@ class RAGAgentService:
         )
         logger.info("🤖 Agent Agno initialisé.")
 
+    async def aclose(self) -> None:
+        """Ferme les connexions Qdrant (arrêt de l'application)."""
+        if self.async_qdrant_client is not None:
+            await self.async_qdrant_client.close()
+        if self.qdrant_client is not None:
+            self.qdrant_client.close()
+
     def _get_prompt_template(self) -> str:
         """
         Retourne le template de prompt pour l'agent, basé sur votre PDF.
@@ -187,44 +213,55 @@ Ton rôle est d'analyser les besoins d'une personne et de recommander **deux pra
 """
 
 
-    async def generate_advice(self, user_needs: str, practices: List[Dict]) -> str:
+    async def _retrieve_contexts(self, user_needs: str, practices: List[Dict],
+                                 categories: Optional[List[str]]) -> List[List[Any]]:
         """
-        Génère une double recommandation en interrogeant Qdrant pour chaque pratique.
+        Documents de chaque pratique : table précalculée si la combinaison (pratique, catégories)
+        y figure, sinon recherche en direct (un seul lot pour toutes les pratiques manquantes).
         """
-        if not self.ensemble_retriever or not practices or len(practices) < 2:
+        docs_per_practice: List[Optional[List[Any]]] = [
+            self.context_table.get(p['practice_name'], categories) if self.context_table and categories else None
+            for p in practices
+        ]
+        misses = [i for i, docs in enumerate(docs_per_practice) if docs is None]
+        RAG_CONTEXT_TABLE.labels(result="hit").inc(len(practices) - len(misses))
+        RAG_CONTEXT_TABLE.labels(result="miss").inc(len(misses))
+        if misses:
+            # Chaque requête est restreinte aux chunks de sa pratique (filtre de payload + postings BM25)
+            queries = [advice_query(practices[i]['practice_name'], user_needs) for i in misses]
+            practice_ids = [normalize_practice_id(practices[i]['practice_name']) for i in misses]
+            for i, docs in zip(misses, await self.retriever.retrieve_many(queries, practice_ids)):
+                docs_per_practice[i] = docs
+        return docs_per_practice
+
+    async def generate_advice(self, user_needs: str, practices: List[Dict], categories: Optional[List[str]] = None) -> str:
+        """
+        Génère une double recommandation ; la recherche des deux pratiques est faite en un seul lot.
+        `categories` (catégories de symptômes des besoins) permet de servir le contexte précalculé.
+        """
+        if not self.retriever or not practices or len(practices) < 2:
             return "Erreur : Le service de recherche n'est pas disponible ou le nombre de pratiques est insuffisant."
 
         practice1 = practices[0]
         practice2 = practices[1]
-        
-        # --- Récupération pour la pratique 1 ---
-        query1 = f"Informations détaillées sur la pratique {practice1['practice_name']} pour traiter {user_needs}"
-        docs1 = await asyncio.to_thread(self.ensemble_retriever.invoke, query1)
-        context1 = "\n\n".join([d.page_content for d in docs1])
-        sources1_list = [d.metadata.get('file_name', f"Document sur {practice1['practice_name']}") for d in docs1]
-        sources1_str = "\n".join([f"- {s}" for s in sources1_list[:3]])
-
-        # --- Récupération pour la pratique 2 ---
-        query2 = f"Informations détaillées sur la pratique {practice2['practice_name']} pour traiter {user_needs}"
-        docs2 = await asyncio.to_thread(self.ensemble_retriever.invoke, query2)
-        context2 = "\n\n".join([d.page_content for d in docs2])
-        sources2_list = [d.metadata.get('file_name', f"Document sur {practice2['practice_name']}") for d in docs2]
-        sources2_str = "\n".join([f"- {s}" for s in sources2_list[:3]])
+
+        # --- Récupération pour les deux pratiques : table précalculée ou un seul lot (embedding, Qdrant, BM25) ---
+        docs_per_practice = await self._retrieve_contexts(user_needs, [practice1, practice2], categories)
+
+        sections = []
+        for practice, docs in zip((practice1, practice2), docs_per_practice):
+            context = "\n\n".join([d.page_content for d in docs])
+            sources_list = [d.metadata.get('file_name', f"Document sur {practice['practice_name']}") for d in docs]
+            sources_str = "\n".join([f"- {s}" for s in sources_list[:3]])
+            sections.append(f"""
+        CONTEXTE POUR {practice['practice_name']}:
+        {context}
+        SOURCES POUR {practice['practice_name']}:
+        {sources_str}
+        """)
 
         # --- Construction du contexte combiné pour le prompt ---
-        combined_context = f"""
-        CONTEXTE POUR {practice1['practice_name']}:
-        {context1}
-        SOURCES POUR {practice1['practice_name']}:
-        {sources1_str}
-
-        ---
-
-        CONTEXTE POUR {practice2['practice_name']}:
-        {context2}
-        SOURCES POUR {practice2['practice_name']}:
-        {sources2_str}
-        """
+        combined_context = "\n        ---\n".join(sections)
 
         # --- Construction du prompt final ---
         final_prompt = self.agent.instructions.format(
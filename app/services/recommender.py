@@ -1,8 +1,14 @@
-import torch
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import Dict, List, Any
+import asyncio
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Any, Optional
 from app.utils.database import get_database
-from fuzzywuzzy import fuzz
+from app.services.practice_index import PracticeIndex, INDEX_PROJECTION
+from app.services.ann_index import load_or_build_ann_index
+from app.services.feedback_stats import FeedbackStatsCache
+from app.services.vocabulary import HOLISTIC_KEYWORDS
+from app.config import get_settings
+from app.utils.prefork import get_preloaded
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,70 +20,127 @@ class Recommender:
     def __init__(self, top_n: int = 3):
         self.top_n = top_n
         self.db = None
+        # Index résident : construit une fois, partagé par toutes les requêtes via app.state
+        self.index: Optional[PracticeIndex] = None
+        self._index_lock = asyncio.Lock()
+        self.feedback_stats = FeedbackStatsCache(ttl_seconds=get_settings().FEEDBACK_STATS_TTL_SECONDS)
 
-    async def _get_all_practices(self) -> List[Dict]:
+    async def _get_all_practices(self, projection: Optional[Dict] = None) -> List[Dict]:
         """Fetches all practice documents from MongoDB."""
-        if not self.db:
+        if self.db is None:
             self.db = await get_database()
-        cursor = self.db.practices.find({})
+        cursor = self.db.practices.find({}, projection)
         return await cursor.to_list(length=None)
     
 
     async def _get_feedback_stats(self):
         """
-        Calcule les stats de feedback par pratique :
-        - moyenne des notes
-        - nombre total de feedbacks
-        - confiance (plus de feedbacks = plus de poids)
+        Stats de feedback par pratique (moyenne des notes, nombre de feedbacks),
+        lues depuis la copie en mémoire des statistiques matérialisées.
         """
+        if self.db is None:
+            self.db = await get_database()
+        return await self.feedback_stats.get(self.db)
+
+
+    async def load_index(self) -> PracticeIndex:
+        """(Re)builds the resident practice index from MongoDB."""
+        settings = get_settings()
+        snapshot_dir = get_preloaded("practice_snapshot_dir")
+        if snapshot_dir is not None and self.index is None:
+            # Mode prefork : instantané écrit par le maître, matrice partagée en mmap entre workers
+            index = await asyncio.to_thread(PracticeIndex.load, snapshot_dir)
+        else:
+            practices = await self._get_all_practices(projection=INDEX_PROJECTION)
+            index = PracticeIndex(
+                practices,
+                model_version=settings.EMBEDDING_MODEL_NAME,
+                symptom_vocabulary=HOLISTIC_KEYWORDS.keys(),
+            )
+        if settings.ANN_ENABLED and len(index) >= settings.ANN_MIN_PRACTICES:
+            # Lecture seule : l'index persisté n'est écrit que par le maître prefork ou
+            # app/scripts/build_ann_index.py ; s'il est absent ou périmé, il est reconstruit en mémoire
+            index.ann = await asyncio.to_thread(
+                load_or_build_ann_index,
+                index.embeddings,
+                [p["_id"] for p in index.practices],
+                Path(settings.ANN_INDEX_DIR),
+                settings.ANN_N_LISTS,
+                persist=False,
+            )
+        self.index = index
+        logger.info(f"Practice index loaded: {len(index)} practices (ANN: {index.ann is not None}).")
+        return self.index
+
+    async def _get_index(self) -> PracticeIndex:
+        """Returns the resident index, loading it on first use."""
+        if self.index is None:
+            async with self._index_lock:
+                if self.index is None:
+                    await self.load_index()
+        return self.index
+
+    def _feedback_weights(self, index: PracticeIndex, feedback_stats: Dict[str, Dict]) -> np.ndarray:
+        """Per-practice multiplicative weight derived from user feedback."""
+        feedback_weights = np.ones(len(index), dtype=np.float32)
+        for row, practice in enumerate(index.practices):
+            # --- 5. Feedback Adjustment ---  ajouter un weight du feedback
+            practice_name = practice["practice_name"]
+            if practice_name in feedback_stats:
+                stat = feedback_stats[practice_name]
+                avg_rating = stat["avg_rating"]
+                count = stat["count"]
+
+                # Lissage : plus de feedbacks = plus de confiance
+                # Ex: 5 feedbacks de 4/5 → poids 1.2, 1 feedback de 1/5 → impact faible
+                confidence = min(count / 50, 1.0)  # max 20 feedbacks = poids max
+                rating_factor = (avg_rating - 3) / 2  # 1→-1, 3→0, 5→+1
+                feedback_weights[row] = 1 + (rating_factor * confidence)
+        return feedback_weights
 
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$practice_name",
-                    "avg_rating": {"$avg": "$rating"},
-                    "count": {"$sum": 1},
-                    "total_rating": {"$sum": "$rating"}
-                }
-            },
-            {
-                "$project": {
-                    "avg_rating": 1,
-                    "count": 1,
-                    "normalized_rating": {
-                        "$divide": [
-                            {"$subtract": ["$total_rating", "$count"]},  # normalise 1-5 → 0-4
-                            {"$multiply": ["$count", 4]}                # max possible = 4 * count
-                        ]
-                    }
-                }
-            }
-        ]
-
-        cursor = self.db.feedbacksv1.aggregate(pipeline)
-        result = await cursor.to_list(length=None)
-
-        # Convertir en dictionnaire par nom de pratique
-        stats = {item["_id"]: item for item in result}
-        logger.info(f"Loaded feedback stats for {len(stats)} practices")
-        return stats
-
-
-#### ici j'ajoute un 2e lot d'analyse nlp ####
-    def _normalize_keyword(self, keyword: str) -> str:
-        """Normalise the keyword by lowercasing it."""
-        return keyword.lower()
-
-    def _fuzzy_match(self, keyword: str, practice_keywords: List[str]) -> bool:
+    def _rank(self, index: PracticeIndex, nlp_analysis: Dict[str, Any], feedback_weights: np.ndarray,
+              embedding_scores: Optional[np.ndarray] = None) -> List[Dict]:
         """
-        Uses fuzzy matching to check if a user's keyword matches a practice's keyword
-        even with variations.
+        Combines the scores of one user against the catalog and returns the top N practices.
+        Without precomputed `embedding_scores`, the ANN index selects the candidates
+        (plus every keyword-matched practice) and only those are re-scored exactly.
         """
-        for practice_keyword in practice_keywords:
-            if fuzz.partial_ratio(keyword, practice_keyword) > 80:  # fuzzy match threshold
-                return True
-        return False
-#### fin du 2e lot d'analyse nlp ####
+        structured_analysis = nlp_analysis.get("structured_analysis", {})
+        user_symptoms = {s['category'] for s in structured_analysis.get('symptoms', [])}
+
+        # 2. Keyword Matching : indications exactes + table fuzzy précalculée (simples lookups)
+        matched_counts = index.keyword_match_counts(user_symptoms)
+
+        rows = None
+        if embedding_scores is None:
+            settings = get_settings()
+            user_embedding = nlp_analysis["user_embedding"]
+            ann_rows = index.ann_candidates(user_embedding, settings.ANN_CANDIDATES, settings.ANN_NPROBE)
+            rows = np.union1d(ann_rows, np.flatnonzero(matched_counts))
+            embedding_scores = index.similarities(user_embedding, rows)
+            matched_counts = matched_counts[rows]
+            feedback_weights = feedback_weights[rows]
+
+        # 3. Combinaison des scores et ajustement par le niveau d'urgence
+        # Le score final est une moyenne pondérée, ajustée par l'urgence pour prioriser les cas graves
+        final_scores = (embedding_scores * 0.5) + (matched_counts * 0.5)
+        final_scores *= (1 + structured_analysis['urgency_level'])
+        final_scores *= feedback_weights
+
+        scored_practices = []
+        for position in index.top_k(final_scores, self.top_n):
+            if final_scores[position] <= 0:
+                break
+            practice = index.practices[rows[position] if rows is not None else position]
+            logger.debug(f"Practice: {practice['practice_name']}, Embedding Score: {embedding_scores[position]}, Matched Symptoms Count: {matched_counts[position]}")
+            scored_practices.append({
+                "practice_name": practice["practice_name"],
+                "relevance_score": float(final_scores[position]),
+                "matched_symptoms": list(user_symptoms),
+                "feedback_weight": float(feedback_weights[position]),
+                "_id": practice["_id"] # Ensure ID is a string
+            })
+        return scored_practices
 
     async def recommend(self, nlp_analysis: Dict[str, Any]) -> List[Dict]:
         """
@@ -89,87 +152,48 @@ class Recommender:
             return []
 
         structured_analysis = nlp_analysis.get("structured_analysis", {})
-        user_symptoms = {s['category'] for s in structured_analysis.get('symptoms', [])}
-        #urgency_level = structured_analysis.get('urgency_level', {}) # Get urgency from analysis
+        logger.info(f"structured analysis {structured_analysis}")
 
-        logger.info(f"structured analysis {structured_analysis} , User Symptoms: {user_symptoms}")
-
-        
-        all_practices = await self._get_all_practices()
+        index = await self._get_index()
+        if not len(index):
+            return []
         feedback_stats = await self._get_feedback_stats() #get the collecytion of feedbacks
-        scored_practices = []
-
-        for practice in all_practices:
-
-            practice_name = practice["practice"]["name"]
-            # 1. Semantic Similarity Score (Embeddings)
-            practice_embedding = torch.tensor(practice["embedding"])
-            embedding_score = cosine_similarity(
-                user_embedding.cpu().reshape(1, -1), 
-                practice_embedding.reshape(1, -1)
-            )[0][0]
-            
-            # 2. Keyword Matching
-            practice_indications = practice.get("indications", {})
-            # Correctly extract condition strings
-            primary_indications = {p.get('condition') for p in practice_indications.get("primary", [])}
-            secondary_indications = set(practice_indications.get("secondary", []))
-            practice_keywords = set(practice.get("keywords", {}).get("symptoms", []))
-
-            #logging.info(f"primary indications: {primary_indications}, secondary indications: {secondary_indications}") 
 
-            # Normalize user symptoms for keyword matching
-            normalized_user_symptoms = {self._normalize_keyword(symptom) for symptom in user_symptoms}
-
-            matched_symptoms_count = 0
-
-            matched_symptoms_count += len(normalized_user_symptoms.intersection(primary_indications.union(secondary_indications)))
-            
-            # Check for fuzzy matches between user symptoms and practice keywords
-            for user_symptom in normalized_user_symptoms:
-                if self._fuzzy_match(user_symptom, practice_keywords):
-                    matched_symptoms_count += 1
-          
-            # 3. Combinaison des scores et ajustement par le niveau d'urgence
-            # Le score final est une moyenne pondérée, ajustée par l'urgence pour prioriser les cas graves
-
-            logging.info(f"Practice: {practice['practice']['name']}, Embedding Score: {embedding_score}, Matched Symptoms Count: {matched_symptoms_count}")
-            final_score = (embedding_score * 0.5) + (matched_symptoms_count * 0.5)
-            final_score *= (1 + nlp_analysis["structured_analysis"]['urgency_level'])
-
-
-            # --- 5. Feedback Adjustment ---  ajouter un weight du feedback
-
-            feedback_weight = 1.0  # par défaut
-            if practice_name in feedback_stats:
-                stat = feedback_stats[practice_name]
-                avg_rating = stat["avg_rating"]
-                count = stat["count"]
-
-                # Lissage : plus de feedbacks = plus de confiance
-                # Ex: 5 feedbacks de 4/5 → poids 1.2, 1 feedback de 1/5 → impact faible
-                confidence = min(count / 50, 1.0)  # max 20 feedbacks = poids max
-                rating_factor = (avg_rating - 3) / 2  # 1→-1, 3→0, 5→+1
-                feedback_weight = 1 + (rating_factor * confidence)
-
-            final_score = final_score * feedback_weight
-
-
-
-            if final_score > 0:
-                scored_practices.append({
-                "practice_name": practice["practice"]["name"],
-                "relevance_score": float(final_score),
-                "matched_symptoms": list(user_symptoms),
-                "feedback_weight": feedback_weight,
-                "_id": str(practice["_id"]) # Ensure ID is a string
-            })
-
-        scored_practices.sort(key=lambda x: x["relevance_score"], reverse=True)
+        # 1. Semantic Similarity Score (Embeddings) : un seul produit matrice-vecteur pour tout le catalogue,
+        #    ou recherche ANN puis re-scoring exact des candidats pour les grands catalogues
+        embedding_scores = index.similarities(user_embedding) if index.ann is None else None
+        scored_practices = self._rank(index, nlp_analysis, self._feedback_weights(index, feedback_stats), embedding_scores)
 
         logger.info(f"Top 3 scores: {[p['relevance_score'] for p in scored_practices[:3]]}")
 
-        return scored_practices[:self.top_n]
+        return scored_practices
+
+    async def recommend_many(self, nlp_analyses: List[Dict[str, Any]]) -> List[List[Dict]]:
+        """
+        Batch version of `recommend`: every user is scored against the catalog
+        with a single (users x practices) matrix multiply.
+        Analyses without an embedding get an empty list.
+        """
+        results: List[List[Dict]] = [[] for _ in nlp_analyses]
+        valid = [i for i, analysis in enumerate(nlp_analyses) if analysis.get("user_embedding") is not None]
+        if not valid:
+            return results
+
+        index = await self._get_index()
+        if not len(index):
+            return results
+        feedback_weights = self._feedback_weights(index, await self._get_feedback_stats())
+
+        if index.ann is not None:
+            for i in valid:
+                results[i] = self._rank(index, nlp_analyses[i], feedback_weights)
+        else:
+            embedding_scores = index.similarities_many([nlp_analyses[i]["user_embedding"] for i in valid])
+            for row, i in enumerate(valid):
+                results[i] = self._rank(index, nlp_analyses[i], feedback_weights, embedding_scores[row])
+
+        logger.info(f"Batch recommendations computed for {len(valid)}/{len(nlp_analyses)} analyses.")
+        return results
 
             
 
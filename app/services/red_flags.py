@@ -0,0 +1,177 @@
+"""
+Détection des signaux d'urgence (red flags) dans le texte utilisateur.
+
+Le vocabulaire est compilé une fois :
+- correspondances exactes : un automate d'Aho-Corasick sur le texte replié (minuscules, sans accents) ;
+- correspondances approchées (fautes de frappe, accents manquants) : le texte est découpé en
+  fenêtres de tokens de la taille des expressions (±1), un index de trigrammes de caractères
+  sélectionne (calcul vectorisé sur toutes les fenêtres) les quelques expressions candidates,
+  vérifiées ensuite par distance d'édition ;
+- correspondances partielles (texte court ou fragment d'expression : "suicidaire", "thoracique") :
+  comme l'ancien contrôle, fuzz.partial_ratio entre le texte et l'expression, mais seulement pour
+  les expressions qui partagent assez de trigrammes avec le texte.
+Les expressions faites de mots courants (EXACT_ONLY_FLAGS) ne sont retenues que sur une
+occurrence exacte en mots entiers : "j'ai du mal à respirer" ne doit pas donner "faire du mal".
+Le coût dépend de la longueur du texte et du nombre de candidats, pas de la taille du vocabulaire.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.text import fold
+
+# Liste des mots-clés d'urgence. À enrichir en consultation avec des professionnels.
+RED_FLAGS = [
+    "douleur thoracique", "douleur poitrine", "pression poitrine", "serrement poitrine",
+    "difficulté à respirer", "souffle court", "étouffement",
+    "perte de conscience", "évanouissement",
+    "confusion soudaine", "difficulté à parler",
+    "engourdissement visage", "engourdissement bras", "engourdissement jambe",
+    "saignement incontrôlable", "hémorragie",
+    "pensées suicidaires", "faire du mal"
+]
+# Expressions détectées uniquement sur une occurrence exacte en mots entiers (pas d'approximation)
+EXACT_ONLY_FLAGS = frozenset({"faire du mal"})
+
+# Similarité minimale (fuzz.ratio, 0-100) d'une correspondance approchée
+FUZZY_THRESHOLD = 80
+# Part minimale des trigrammes d'une expression présents dans la fenêtre pour la vérifier
+MIN_TRIGRAM_OVERLAP = 0.4
+# Longueur minimale (caractères repliés) d'un texte ou fragment comparé par partial_ratio
+MIN_PARTIAL_LENGTH = 4
+
+_TOKEN = re.compile(r"\w+")
+
+
+class RedFlagMatch(NamedTuple):
+    flag: str
+    start: int
+    end: int
+    score: int
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _is_whole_words(text: str, start: int, end: int) -> bool:
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+def _partial_span(folded_text: str, folded_flag: str):
+    """Position du fragment du texte le plus proche de l'expression (alignement de partial_ratio)."""
+    if len(folded_text) <= len(folded_flag):
+        return 0, len(folded_text)
+    best_start, best_score = 0, -1
+    for flag_pos, text_pos, _ in SequenceMatcher(None, folded_flag, folded_text, autojunk=False).get_matching_blocks():
+        start = max(0, text_pos - flag_pos)
+        score = fuzz.ratio(folded_flag, folded_text[start:start + len(folded_flag)])
+        if score > best_score:
+            best_start, best_score = start, score
+    return best_start, min(len(folded_text), best_start + len(folded_flag))
+
+
+class RedFlagDetector:
+    def __init__(self, flags: Iterable[str] = RED_FLAGS, threshold: int = FUZZY_THRESHOLD,
+                 exact_only: Iterable[str] = EXACT_ONLY_FLAGS):
+        self.flags = list(dict.fromkeys(flags))
+        self.threshold = threshold
+        self._folded = [" ".join(_TOKEN.findall(fold(flag))) for flag in self.flags]
+        self._automaton = AhoCorasick((folded, i) for i, folded in enumerate(self._folded))
+        exact_only = set(exact_only)
+        self._exact_only = np.asarray([flag in exact_only for flag in self.flags], dtype=bool)
+
+        # Index inversé trigramme (pris dans chaque mot) -> expressions
+        self._trigram_index: Dict[str, List[int]] = defaultdict(list)
+        trigram_counts = []
+        for i, folded in enumerate(self._folded):
+            trigrams = set().union(*(_trigrams(token) for token in folded.split()))
+            trigram_counts.append(len(trigrams))
+            if self._exact_only[i]:
+                continue
+            for trigram in trigrams:
+                self._trigram_index[trigram].append(i)
+        self._trigram_counts = np.asarray(trigram_counts, dtype=np.float32)
+        self._min_shared = MIN_TRIGRAM_OVERLAP * np.asarray(trigram_counts, dtype=np.float32)
+        self._flag_sizes = np.asarray([len(folded.split()) for folded in self._folded], dtype=np.int32)
+        self._window_sizes = sorted({int(size) + delta for size in self._flag_sizes for delta in (-1, 0, 1) if size + delta > 0})
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def _exact(self, folded_text: str) -> Optional[RedFlagMatch]:
+        for start, end, flag_id in self._automaton.iter_matches(folded_text):
+            if self._exact_only[flag_id] and not _is_whole_words(folded_text, start, end):
+                continue
+            return RedFlagMatch(self.flags[flag_id], start, end, 100)
+        return None
+
+    def _shared_trigrams(self, tokens: List[str]) -> np.ndarray:
+        """Sommes cumulées (tokens + 1) x expressions du nombre de trigrammes partagés par mot."""
+        counts = np.zeros((len(tokens) + 1, len(self.flags)), dtype=np.float32)
+        for row, token in enumerate(tokens, start=1):
+            for trigram in _trigrams(token):
+                for flag_id in self._trigram_index.get(trigram, ()):
+                    counts[row, flag_id] += 1
+        return np.cumsum(counts, axis=0)
+
+    def _approximate(self, folded_text: str) -> Optional[RedFlagMatch]:
+        matches = list(_TOKEN.finditer(folded_text))
+        if not matches or not self.flags:
+            return None
+        tokens = [m.group() for m in matches]
+        cumulative = self._shared_trigrams(tokens)
+
+        best: Optional[RedFlagMatch] = None
+        for size in self._window_sizes:
+            if size > len(tokens):
+                break
+            # Trigrammes partagés par chaque fenêtre de `size` mots, pour toutes les expressions à la fois
+            shared = cumulative[size:] - cumulative[:-size]
+            eligible = (np.abs(self._flag_sizes - size) <= 1) & (shared >= self._min_shared)
+            for first, flag_id in zip(*np.nonzero(eligible)):
+                window_text = " ".join(tokens[first:first + size])
+                score = fuzz.ratio(window_text, self._folded[flag_id])
+                if score > self.threshold and (best is None or score > best.score):
+                    best = RedFlagMatch(self.flags[flag_id], matches[first].start(), matches[first + size - 1].end(), score)
+        return best
+
+    def _partial(self, folded_text: str) -> Optional[RedFlagMatch]:
+        """Meilleure correspondance fuzz.partial_ratio parmi les expressions candidates (trigrammes)."""
+        text = " ".join(_TOKEN.findall(folded_text))
+        if len(text) < MIN_PARTIAL_LENGTH or not self.flags:
+            return None
+        text_trigrams = set().union(*(_trigrams(token) for token in text.split()))
+        shared = np.zeros(len(self.flags), dtype=np.float32)
+        for trigram in text_trigrams:
+            for flag_id in self._trigram_index.get(trigram, ()):
+                shared[flag_id] += 1
+        # Seuil relatif au plus court des deux : un texte court n'a qu'une partie des trigrammes de l'expression
+        candidates = np.flatnonzero(shared >= MIN_TRIGRAM_OVERLAP * np.minimum(self._trigram_counts, len(text_trigrams)))
+
+        best_id, best_score = None, self.threshold
+        for flag_id in candidates[np.argsort(-shared[candidates], kind="stable")]:
+            score = fuzz.partial_ratio(text, self._folded[flag_id])
+            if score > best_score:
+                best_id, best_score = flag_id, score
+        if best_id is None:
+            return None
+        start, end = _partial_span(folded_text, self._folded[best_id])
+        return RedFlagMatch(self.flags[best_id], start, end, best_score)
+
+    def detect(self, text: str) -> Optional[RedFlagMatch]:
+        """
+        Premier signal d'urgence trouvé (exact, sinon la meilleure correspondance approchée, sinon
+        partielle), avec sa position [start, end) dans le texte (normalisé NFC). None si aucun.
+        """
+        if not text:
+            return None
+        folded_text = fold(unicodedata.normalize("NFC", text))
+        return self._exact(folded_text) or self._approximate(folded_text) or self._partial(folded_text)
@@ -0,0 +1,210 @@
+"""
+Recherche hybride (dense + BM25) pour plusieurs requêtes à la fois.
+
+Pour N requêtes : un seul appel d'embedding (lot), une seule requête Qdrant
+(query_batch_points), le scoring BM25 de toutes les requêtes dans un même passage
+(index lexical persistant, voir sparse_index.py),
+puis la fusion par rang réciproque pondérée (même formule que l'EnsembleRetriever
+de langchain). L'embedding et la recherche dense (réseau) s'exécutent en même temps
+que le BM25 (CPU). La durée de chaque étape est exportée dans RAG_RETRIEVAL_STAGE_SECONDS.
+
+La recherche dense passe par AsyncQdrantClient (pool de connexions borné, partagé par
+les requêtes) : l'attente réseau n'occupe plus de thread. Chaque appel a son propre délai,
+et seuls les champs utiles du payload (`payload_fields`) sont renvoyés.
+
+Quand la pratique de chaque requête est connue (`practice_ids`), la recherche dense est
+filtrée sur `metadata.practice_id` (index de payload Qdrant) et le BM25 ne parcourt que les
+postings des documents de la pratique. Une pratique sans aucun chunk étiqueté (corpus pas
+encore ré-étiqueté) retombe sur la recherche non filtrée.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.monitoring.monitoring import RAG_PRACTICE_FILTER, RAG_RETRIEVAL_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Constante de lissage de la fusion RRF (valeur par défaut de langchain)
+RRF_C = 60
+# Champs du payload nécessaires à la génération du conseil (texte et source)
+PAYLOAD_FIELDS = ("page_content", "metadata.file_name")
+# Champ du payload portant l'identifiant normalisé de la pratique (voir normalize_practice_id)
+PRACTICE_ID_FIELD = "metadata.practice_id"
+
+
+class RetrievedDocument(NamedTuple):
+    page_content: str
+    metadata: Dict[str, Any]
+
+
+def payload_to_document(payload: Optional[Dict[str, Any]]) -> RetrievedDocument:
+    """Point Qdrant écrit par langchain_qdrant -> document (clés page_content / metadata)."""
+    payload = payload or {}
+    return RetrievedDocument(payload.get("page_content", ""), payload.get("metadata") or {})
+
+
+def weighted_rrf(result_lists: Sequence[Sequence[Any]], weights: Sequence[float], c: int = RRF_C) -> List[Any]:
+    """Fusion par rang réciproque pondérée ; les doublons (même page_content) sont fusionnés."""
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Any] = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, document in enumerate(results, start=1):
+            key = document.page_content
+            scores[key] = scores.get(key, 0.0) + weight / (rank + c)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def ensure_practice_payload_index(client, collection_name: str) -> None:
+    """Crée (si besoin) l'index de payload keyword sur l'identifiant de pratique (client Qdrant synchrone)."""
+    from qdrant_client import models
+
+    client.create_payload_index(collection_name=collection_name, field_name=PRACTICE_ID_FIELD,
+                                field_schema=models.PayloadSchemaType.KEYWORD)
+
+
+def _practice_filter(practice_id: Optional[str]):
+    from qdrant_client import models
+
+    if not practice_id:
+        return None
+    return models.Filter(must=[models.FieldCondition(key=PRACTICE_ID_FIELD, match=models.MatchValue(value=practice_id))])
+
+
+class _StageTimer:
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        RAG_RETRIEVAL_STAGE_SECONDS.labels(stage=self.stage).observe(time.perf_counter() - self.started)
+        return False
+
+
+class HybridRetriever:
+    """
+    Dense (Qdrant) + sparse (BM25) retrieval for a batch of queries.
+    `qdrant_client` is an AsyncQdrantClient; each dense call is bounded by `timeout` seconds.
+    `embed_queries` maps a list of queries to a list of vectors (empty vector = failure).
+    `sparse_index` is a SparseIndex (anything with `search_many(queries, k, practice_ids)`), or None for dense only.
+    """
+
+    def __init__(self, qdrant_client, collection_name: str, embed_queries: Callable[[List[str]], List[List[float]]],
+                 sparse_index=None, k: int = 5, weights: Sequence[float] = (0.5, 0.5), vector_name: Optional[str] = None,
+                 timeout: float = 5.0, payload_fields: Sequence[str] = PAYLOAD_FIELDS):
+        self.qdrant_client = qdrant_client
+        self.timeout = timeout
+        self.payload_fields = list(payload_fields)
+        self.collection_name = collection_name
+        self.embed_queries = embed_queries
+        self.sparse_index = sparse_index
+        self.k = k
+        self.weights = tuple(weights)
+        self.vector_name = vector_name
+
+    async def _query_batch(self, vectors: List[List[float]], practice_ids: List[Optional[str]]) -> List[List[RetrievedDocument]]:
+        from qdrant_client import models
+
+        payload = models.PayloadSelectorInclude(include=self.payload_fields)
+        requests = [models.QueryRequest(query=list(vector), using=self.vector_name, limit=self.k, with_payload=payload,
+                                        filter=_practice_filter(practice_id))
+                    for vector, practice_id in zip(vectors, practice_ids)]
+        # Délai côté serveur (secondes entières) et côté client (annulation de l'attente)
+        responses = await asyncio.wait_for(
+            self.qdrant_client.query_batch_points(collection_name=self.collection_name, requests=requests,
+                                                  timeout=max(1, math.ceil(self.timeout))),
+            timeout=self.timeout,
+        )
+        return [[payload_to_document(point.payload) for point in response.points] for response in responses]
+
+    async def _dense_search(self, vectors: List[List[float]],
+                            practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[RetrievedDocument]]:
+        # Une seule requête réseau pour toutes les recherches ; les vecteurs vides (échec d'embedding) sont ignorés
+        practice_ids = list(practice_ids or [None] * len(vectors))
+        valid = [i for i, vector in enumerate(vectors) if len(vector)]
+        results: List[List[RetrievedDocument]] = [[] for _ in vectors]
+        if not valid:
+            return results
+        for i, docs in zip(valid, await self._query_batch([vectors[i] for i in valid], [practice_ids[i] for i in valid])):
+            results[i] = docs
+
+        # Sans filtre de score, un résultat filtré vide signifie qu'aucun chunk n'est étiqueté pour la pratique
+        filtered = [i for i in valid if practice_ids[i]]
+        fallback = [i for i in filtered if not results[i]]
+        if fallback:
+            logger.info(f"No chunk tagged for practices {[practice_ids[i] for i in fallback]}: unfiltered dense search.")
+            for i, docs in zip(fallback, await self._query_batch([vectors[i] for i in fallback], [None] * len(fallback))):
+                results[i] = docs
+        RAG_PRACTICE_FILTER.labels(retriever="dense", result="filtered").inc(len(filtered) - len(fallback))
+        RAG_PRACTICE_FILTER.labels(retriever="dense", result="fallback").inc(len(fallback))
+        return results
+
+    def _sparse_search(self, queries: List[str], practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[Any]]:
+        if self.sparse_index is None:
+            return [[] for _ in queries]
+        if not practice_ids:
+            return self.sparse_index.search_many(queries, self.k)
+        # Les pratiques absentes de l'index (aucun document étiqueté) sont cherchées sans filtre
+        known = [practice_id if practice_id and self.sparse_index.has_practice(practice_id) else None
+                 for practice_id in practice_ids]
+        filtered = sum(1 for practice_id in known if practice_id)
+        RAG_PRACTICE_FILTER.labels(retriever="sparse", result="filtered").inc(filtered)
+        RAG_PRACTICE_FILTER.labels(retriever="sparse", result="fallback").inc(sum(1 for p in practice_ids if p) - filtered)
+        return self.sparse_index.search_many(queries, self.k, known)
+
+    async def _embed_and_search(self, queries: List[str],
+                                practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[RetrievedDocument]]:
+        with _StageTimer("embed"):
+            vectors = await asyncio.to_thread(self.embed_queries, queries)
+        if not vectors or len(vectors) != len(queries):
+            logger.warning("Query embedding failed: dense retrieval skipped for this batch.")
+            return [[] for _ in queries]
+        try:
+            with _StageTimer("dense"):
+                return await self._dense_search(vectors, practice_ids)
+        except asyncio.TimeoutError:
+            logger.error(f"Batched dense retrieval timed out after {self.timeout}s. Using BM25 results only.")
+            return [[] for _ in queries]
+        except Exception as e:
+            logger.error(f"Batched dense retrieval failed: {e}. Using BM25 results only.")
+            return [[] for _ in queries]
+
+    async def _timed_sparse(self, queries: List[str], practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[Any]]:
+        with _StageTimer("sparse"):
+            return await asyncio.to_thread(self._sparse_search, queries, practice_ids)
+
+    async def retrieve_many(self, queries: List[str],
+                            practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[Any]]:
+        """
+        Documents fusionnés (au plus 2k) pour chaque requête, dans l'ordre des requêtes.
+        `practice_ids[i]` (optionnel) restreint la requête i aux chunks de cette pratique.
+        """
+        if not queries:
+            return []
+        if practice_ids is not None and len(practice_ids) != len(queries):
+            raise ValueError("practice_ids must have one entry per query.")
+        with _StageTimer("total"):
+            dense, sparse = await asyncio.gather(self._embed_and_search(queries, practice_ids),
+                                                 self._timed_sparse(queries, practice_ids))
+            with _StageTimer("fusion"):
+                return [weighted_rrf([dense_docs, sparse_docs], self.weights)
+                        for dense_docs, sparse_docs in zip(dense, sparse)]
+
+
+def build_async_qdrant_client(settings):
+    """Client Qdrant asynchrone du processus, avec un pool de connexions borné (REST ou gRPC)."""
+    from qdrant_client import AsyncQdrantClient
+
+    return AsyncQdrantClient(
+        url=settings.QDRANT_URL,
+        api_key=settings.QDRANT_API_KEY,
+        prefer_grpc=settings.QDRANT_PREFER_GRPC,
+        pool_size=settings.QDRANT_POOL_SIZE,
+        timeout=max(1, math.ceil(settings.QDRANT_QUERY_TIMEOUT_SECONDS)),
+    )
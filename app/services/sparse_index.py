@@ -0,0 +1,341 @@
+"""
+Index lexical (BM25) persistant du corpus RAG.
+
+Le corpus est lu dans Qdrant par pages (scroll paginé), puis indexé sous forme de
+listes inversées compactes : vocabulaire trié, postings au format CSR (terme -> documents,
+fréquences) et longueurs des documents. Les tableaux sont écrits en .npy et relus en mmap :
+le chargement est quasi instantané et les pages sont partagées entre workers via le cache
+du système. Le scoring est vectorisé (NumPy) pour toutes les requêtes d'un lot.
+Les nouveaux documents ingérés sont ajoutés sans relire ni re-tokeniser le corpus.
+Chaque document porte le code de sa pratique (metadata.practice_id) : une recherche peut
+être restreinte aux postings des documents d'une pratique.
+L'index enregistre la version de la collection (empreinte des ids et payloads, voir
+collection_version) : toute ingestion, suppression ou réécriture de payload le rend périmé.
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import shutil
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.retrieval import RetrievedDocument
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 2
+_ARRAYS = ("terms", "indptr", "doc_ids", "tfs", "doc_lengths", "doc_offsets", "practices", "doc_practices")
+_TOKEN = re.compile(r"\w+")
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+# Les tokens plus longs sont tronqués (vocabulaire stocké en chaînes de largeur fixe)
+MAX_TOKEN_LENGTH = 32
+
+# Paramètres BM25 (valeurs de rank_bm25 / langchain)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minuscules et sans accents (documents et requêtes)."""
+    folded = _COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text or "")).lower()
+    return [token[:MAX_TOKEN_LENGTH] for token in _TOKEN.findall(folded)]
+
+
+def scroll_documents(qdrant_client, collection_name: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Tous les points de la collection, page par page (sans les vecteurs)."""
+    offset = None
+    while True:
+        records, offset = qdrant_client.scroll(
+            collection_name=collection_name, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=False,
+        )
+        for record in records:
+            payload = record.payload or {}
+            yield {"id": str(record.id), "page_content": payload.get("page_content", ""),
+                   "metadata": payload.get("metadata") or {}}
+        if offset is None:
+            break
+
+
+def collection_version(qdrant_client, collection_name: str, batch_size: int = 1000) -> str:
+    """
+    Version de la collection : nom et empreinte (SHA-1) des ids et payloads de tous les points,
+    lus par un scroll paginé sans les vecteurs (client Qdrant synchrone).
+    """
+    digest = hashlib.sha1()
+    for document in scroll_documents(qdrant_client, collection_name, batch_size):
+        digest.update(json.dumps(document, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return f"{collection_name}:{digest.hexdigest()}"
+
+
+class SparseIndex:
+    """BM25 inverted index: sorted vocabulary + term-major CSR postings + document store."""
+
+    def __init__(self, terms: np.ndarray, indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lengths: np.ndarray, doc_offsets: np.ndarray, practices: np.ndarray, doc_practices: np.ndarray,
+                 documents: np.ndarray, meta: Optional[Dict] = None):
+        self.terms = terms
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lengths = doc_lengths
+        self.doc_offsets = doc_offsets
+        # Pratiques (ids triés) et code de la pratique de chaque document (-1 : non étiqueté)
+        self.practices = practices
+        self.doc_practices = doc_practices
+        # Documents (JSON UTF-8 concaténés) : documents[doc_offsets[i]:doc_offsets[i+1]]
+        self.documents = documents
+        self.meta = meta or {}
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    # --- Construction ---
+
+    @classmethod
+    def _from_postings(cls, vocabulary: np.ndarray, term_ids: np.ndarray, posting_docs: np.ndarray,
+                       posting_tfs: np.ndarray, doc_lengths: np.ndarray, doc_practice_ids: List[str],
+                       encoded_docs: List[bytes], meta: Optional[Dict] = None) -> "SparseIndex":
+        """`term_ids` indexe `vocabulary` (non trié) ; le vocabulaire est trié et les postings regroupés par terme."""
+        terms, remap = np.unique(np.asarray(vocabulary, dtype=f"<U{MAX_TOKEN_LENGTH}"), return_inverse=True)
+        term_ids = remap.reshape(-1)[term_ids] if len(term_ids) else np.asarray(term_ids, dtype=np.int64)
+        order = np.lexsort((posting_docs, term_ids))
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=indptr[1:])
+        doc_offsets = np.zeros(len(encoded_docs) + 1, dtype=np.int64)
+        np.cumsum([len(doc) for doc in encoded_docs], out=doc_offsets[1:])
+        documents = np.frombuffer(b"".join(encoded_docs), dtype=np.uint8)
+        practices = np.unique(np.array([p for p in doc_practice_ids if p], dtype=f"<U{MAX_TOKEN_LENGTH * 2}"))
+        doc_practices = np.array([int(np.searchsorted(practices, p)) if p else -1 for p in doc_practice_ids], dtype=np.int32)
+        return cls(terms, indptr, posting_docs[order].astype(np.int32), posting_tfs[order].astype(np.float32),
+                   np.asarray(doc_lengths, dtype=np.float32), doc_offsets, practices, doc_practices, documents, meta)
+
+    @staticmethod
+    def _tokenize_documents(documents: Iterable[Dict[str, Any]], first_doc_id: int, vocabulary: Dict[str, int]):
+        """Postings des documents ; les nouveaux termes sont ajoutés à `vocabulary` (terme -> id)."""
+        posting_terms, posting_docs, posting_tfs, doc_lengths, practice_ids, encoded_docs = [], [], [], [], [], []
+        for doc_id, document in enumerate(documents, start=first_doc_id):
+            tokens = tokenize(document.get("page_content", ""))
+            counts = Counter(tokens)
+            posting_terms.extend(vocabulary.setdefault(term, len(vocabulary)) for term in counts)
+            posting_docs.extend([doc_id] * len(counts))
+            posting_tfs.extend(counts.values())
+            doc_lengths.append(len(tokens))
+            practice_ids.append((document.get("metadata") or {}).get("practice_id") or "")
+            encoded_docs.append(json.dumps(document, ensure_ascii=False).encode("utf-8"))
+        return (np.array(posting_terms, dtype=np.int64), np.array(posting_docs, dtype=np.int64),
+                np.array(posting_tfs, dtype=np.float32), doc_lengths, practice_ids, encoded_docs)
+
+    @classmethod
+    def build(cls, documents: Iterable[Dict[str, Any]], meta: Optional[Dict] = None) -> "SparseIndex":
+        """Documents : dicts {id, page_content, metadata}."""
+        vocabulary: Dict[str, int] = {}
+        term_ids, docs, tfs, doc_lengths, practice_ids, encoded = cls._tokenize_documents(documents, 0, vocabulary)
+        return cls._from_postings(np.array(list(vocabulary)), term_ids, docs, tfs, doc_lengths, practice_ids, encoded, meta)
+
+    def document_ids(self) -> List[str]:
+        return [self._document(i).get("id") for i in range(self.n_docs)]
+
+    def add(self, documents: Iterable[Dict[str, Any]]) -> "SparseIndex":
+        """
+        Nouvel index contenant aussi `documents` (les ids déjà indexés sont ignorés).
+        Seuls les nouveaux documents sont tokenisés ; les postings existants sont fusionnés.
+        """
+        known = set(self.document_ids())
+        new_documents = [doc for doc in documents if doc.get("id") is None or str(doc["id"]) not in known]
+        if not new_documents:
+            return self
+        # Le vocabulaire existant garde ses ids ; les nouveaux termes sont numérotés à la suite
+        vocabulary = {str(term): term_id for term_id, term in enumerate(self.terms)}
+        term_ids, docs, tfs, doc_lengths, practice_ids, encoded = self._tokenize_documents(new_documents, self.n_docs, vocabulary)
+        old_practice_ids = [str(self.practices[code]) if code >= 0 else "" for code in self.doc_practices]
+        old_term_ids = np.repeat(np.arange(len(self.terms)), np.diff(self.indptr))
+        old_encoded = [bytes(self.documents[self.doc_offsets[i]:self.doc_offsets[i + 1]]) for i in range(self.n_docs)]
+        return self._from_postings(
+            np.array(list(vocabulary)),
+            np.concatenate([old_term_ids, term_ids]),
+            np.concatenate([np.asarray(self.doc_ids, dtype=np.int64), docs]),
+            np.concatenate([np.asarray(self.tfs), tfs]),
+            np.concatenate([np.asarray(self.doc_lengths), np.asarray(doc_lengths, dtype=np.float32)]),
+            old_practice_ids + practice_ids,
+            old_encoded + encoded,
+            self.meta,
+        )
+
+    # --- Recherche ---
+
+    def _term_id(self, token: str) -> Optional[int]:
+        position = int(np.searchsorted(self.terms, token))
+        if position < len(self.terms) and self.terms[position] == token:
+            return position
+        return None
+
+    def _document(self, doc_id: int) -> Dict[str, Any]:
+        raw = bytes(self.documents[self.doc_offsets[doc_id]:self.doc_offsets[doc_id + 1]])
+        return json.loads(raw.decode("utf-8"))
+
+    def has_practice(self, practice_id: str) -> bool:
+        """Vrai si au moins un document de l'index est étiqueté avec cette pratique."""
+        code = self._practice_code(practice_id)
+        return code is not None and code >= 0
+
+    def _practice_code(self, practice_id: Optional[str]) -> Optional[int]:
+        """Code de la pratique ; None sans filtre, -2 si la pratique n'a aucun document."""
+        if not practice_id:
+            return None
+        position = int(np.searchsorted(self.practices, practice_id))
+        if position < len(self.practices) and self.practices[position] == practice_id:
+            return position
+        return -2
+
+    def scores(self, queries: Sequence[str], practice_ids: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+        """
+        Scores BM25 (requêtes x documents), calculés en un passage pour tout le lot.
+        Avec `practice_ids`, seules les postings des documents de la pratique de chaque requête comptent.
+        """
+        n_docs = self.n_docs
+        practice_ids = practice_ids or [None] * len(queries)
+        starts, ends, query_rows, query_codes = [], [], [], []
+        for row, (query, practice_id) in enumerate(zip(queries, practice_ids)):
+            code = self._practice_code(practice_id)
+            for token in tokenize(query):
+                term_id = self._term_id(token)
+                if term_id is not None:
+                    starts.append(self.indptr[term_id])
+                    ends.append(self.indptr[term_id + 1])
+                    query_rows.append(row)
+                    query_codes.append(-3 if code is None else code)
+        if not starts or not n_docs:
+            return np.zeros((len(queries), n_docs), dtype=np.float32)
+
+        starts, ends = np.asarray(starts), np.asarray(ends)
+        lengths = ends - starts
+        df = lengths.astype(np.float64)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        # Positions de toutes les postings concernées, sans boucle Python par posting
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        docs = np.asarray(self.doc_ids[positions], dtype=np.int64)
+        rows = np.repeat(np.asarray(query_rows, dtype=np.int64), lengths)
+        idf = np.repeat(idf, lengths)
+
+        # Restriction aux documents de la pratique demandée (-3 : requête sans filtre)
+        codes = np.repeat(np.asarray(query_codes, dtype=np.int64), lengths)
+        keep = (codes == -3) | (np.asarray(self.doc_practices[docs]) == codes)
+        positions, docs, rows, idf = positions[keep], docs[keep], rows[keep], idf[keep]
+
+        tf = np.asarray(self.tfs[positions], dtype=np.float64)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(self.doc_lengths[docs]) / self.avg_doc_length)
+        contributions = idf * tf * (BM25_K1 + 1) / (tf + norm)
+        flat = np.bincount(rows * n_docs + docs, weights=contributions, minlength=len(queries) * n_docs)
+        return flat.reshape(len(queries), n_docs).astype(np.float32)
+
+    def search_many(self, queries: Sequence[str], k: int,
+                    practice_ids: Optional[Sequence[Optional[str]]] = None) -> List[List[RetrievedDocument]]:
+        """Top-k documents (score > 0) pour chaque requête, éventuellement restreints à une pratique."""
+        scores = self.scores(queries, practice_ids)
+        results = []
+        for row in scores:
+            candidates = np.flatnonzero(row > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-row[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([self._retrieved(int(doc_id)) for doc_id in candidates])
+        return results
+
+    def _retrieved(self, doc_id: int) -> RetrievedDocument:
+        document = self._document(doc_id)
+        return RetrievedDocument(document.get("page_content", ""), document.get("metadata") or {})
+
+    # --- Persistance ---
+
+    def save(self, directory: Path) -> None:
+        """Écriture atomique : les workers qui lisent l'ancienne version (mmap) ne sont pas affectés."""
+        directory = Path(directory)
+        tmp = directory.with_name(directory.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name in _ARRAYS:
+            np.save(tmp / f"{name}.npy", np.asarray(getattr(self, name)))
+        (tmp / "documents.bin").write_bytes(np.asarray(self.documents).tobytes())
+        meta = {**self.meta, "format_version": INDEX_FORMAT_VERSION, "n_docs": self.n_docs, "n_terms": len(self.terms)}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if directory.exists():
+            directory.rename(old)
+        tmp.rename(directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path) -> "SparseIndex":
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported sparse index format: {meta.get('format_version')}")
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        documents_path = directory / "documents.bin"
+        if documents_path.stat().st_size:
+            documents = np.memmap(documents_path, dtype=np.uint8, mode="r")
+        else:  # np.memmap refuse les fichiers vides
+            documents = np.zeros(0, dtype=np.uint8)
+        return cls(documents=documents, meta=meta, **arrays)
+
+
+def load_or_build_sparse_index(qdrant_client, collection_name: str, directory: Path,
+                               batch_size: int = 1000) -> SparseIndex:
+    """
+    Relit l'index persisté s'il a été construit sur l'état actuel de la collection (même
+    version : ids et payloads identiques) ; sinon le reconstruit à partir d'un scroll paginé
+    de Qdrant et l'enregistre.
+    """
+    directory = Path(directory)
+    version = collection_version(qdrant_client, collection_name, batch_size)
+    if (directory / "meta.json").exists():
+        try:
+            index = SparseIndex.load(directory)
+            if index.meta.get("version") == version:
+                logger.info(f"Sparse index loaded from {directory} ({index.n_docs} documents, {len(index.terms)} terms).")
+                return index
+            logger.info(f"Sparse index is stale (built for {index.meta.get('version')}, collection is {version}), rebuilding.")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load the sparse index from {directory}: {e}. Rebuilding.")
+
+    index = SparseIndex.build(scroll_documents(qdrant_client, collection_name, batch_size),
+                              meta={"collection": collection_name, "version": version})
+    logger.info(f"Sparse index built: {index.n_docs} documents, {len(index.terms)} terms.")
+    index.save(directory)
+    return SparseIndex.load(directory)
+
+
+def update_sparse_index(directory: Path, documents: Iterable[Dict[str, Any]], collection_name: str,
+                        previous_version: Optional[str] = None, version: Optional[str] = None) -> int:
+    """
+    Ajoute des documents fraîchement ingérés à l'index persisté. Retourne le nombre de documents indexés.
+    L'index prend la version `version` (collection après ingestion) seulement s'il était à jour
+    avant l'ingestion (`previous_version`) ; sinon il reste périmé et sera reconstruit au chargement.
+    """
+    directory = Path(directory)
+    if (directory / "meta.json").exists():
+        index = SparseIndex.load(directory)
+        up_to_date = previous_version is not None and index.meta.get("version") == previous_version
+        index = index.add(documents)
+    else:
+        # Index partiel (seulement les nouveaux documents) : reconstruit complètement au prochain chargement
+        index = SparseIndex.build(documents, meta={"collection": collection_name})
+        up_to_date = False
+    index.meta = {**index.meta, "version": version if up_to_date else None}
+    index.save(directory)
+    return index.n_docs
@@ -0,0 +1,205 @@
+"""
+Pré-classifieur local de suffisance du contexte (CPU, sans appel LLM).
+
+Régression logistique entraînée hors ligne (app/scripts/train_sufficiency_classifier.py)
+sur les décisions de l'agent de validation journalisées dans `validation_outcomes`
+(journalisation optionnelle, SUFFICIENCY_LOG_OUTCOMES). Le texte brut n'est pas conservé :
+seulement son empreinte, son embedding et ses caractéristiques, avec une durée de rétention (index TTL).
+Entrées : l'embedding du texte et quelques caractéristiques simples (longueur, symptômes,
+catégories, marqueurs de durée, urgence). Seules les probabilités hors de la bande
+[low, high] sont décidées localement ; la bande incertaine reste confiée au LLM.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils.text import fold, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Décisions de l'agent de validation (données d'entraînement du pré-classifieur)
+VALIDATION_OUTCOMES_COLLECTION = "validation_outcomes"
+
+# Écritures de journalisation en cours (références conservées jusqu'à leur fin)
+_OUTCOME_TASKS: Set[asyncio.Task] = set()
+_outcome_indexes_ready = False
+
+FEATURE_NAMES = ("log_tokens", "symptoms", "categories", "duration_markers", "urgency_level")
+
+_DURATION = re.compile(
+    r"\b(depuis|pendant|semaines?|mois|jours?|ans|annees?|heures?|toujours|souvent|chaque|"
+    r"regulierement|quotidien(ne)?|nuits?|matins?|soirs?)\b"
+)
+_TOKEN = re.compile(r"\w+")
+
+
+def text_features(text: str, analysis: Dict[str, Any]) -> np.ndarray:
+    """Caractéristiques simples du texte et de son analyse structurée (ordre : FEATURE_NAMES)."""
+    folded = fold(text or "")
+    structured = analysis.get("structured_analysis") or {}
+    symptoms = structured.get("symptoms") or []
+    return np.array([
+        math.log1p(len(_TOKEN.findall(folded))),
+        len(symptoms),
+        len({symptom.get("category") for symptom in symptoms}),
+        len(_DURATION.findall(folded)),
+        float(structured.get("urgency_level") or 0.0),
+    ], dtype=np.float32)
+
+
+def choose_thresholds(probabilities: np.ndarray, labels: np.ndarray, target_precision: float) -> Tuple[float, float]:
+    """
+    Bornes (low, high) de la bande incertaine, choisies sur un jeu de validation :
+    `high` est le plus petit seuil dont les décisions "suffisant" atteignent `target_precision`,
+    `low` le plus grand seuil dont les décisions "insuffisant" l'atteignent.
+    Sans seuil atteignable, la borne exclut toute décision locale (1.0 / 0.0).
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    high, low = 1.0, 0.0
+    for threshold in np.unique(probabilities):
+        decided = probabilities >= threshold
+        if labels[decided].mean() >= target_precision:
+            high = float(threshold)
+            break
+    for threshold in np.unique(probabilities)[::-1]:
+        decided = probabilities <= threshold
+        if (~labels[decided]).mean() >= target_precision:
+            low = float(threshold)
+            break
+    if low >= high:
+        # Bandes qui se recouvrent : tout passe par le LLM plutôt que de trancher arbitrairement
+        return 0.0, 1.0
+    return low, high
+
+
+class SufficiencyClassifier:
+    """Logistic regression over [embedding, standardised features], evaluated in NumPy."""
+
+    def __init__(self, coef: np.ndarray, intercept: float, feature_mean: np.ndarray, feature_scale: np.ndarray,
+                 low: float, high: float, model_version: str = ""):
+        self.coef = np.asarray(coef, dtype=np.float32).reshape(-1)
+        self.intercept = float(intercept)
+        self.feature_mean = np.asarray(feature_mean, dtype=np.float32)
+        self.feature_scale = np.asarray(feature_scale, dtype=np.float32)
+        self.low = float(low)
+        self.high = float(high)
+        self.model_version = model_version
+
+    @property
+    def embedding_dim(self) -> int:
+        return len(self.coef) - len(self.feature_mean)
+
+    def _inputs(self, embeddings: np.ndarray, features: np.ndarray) -> np.ndarray:
+        features = (np.asarray(features, dtype=np.float32) - self.feature_mean) / self.feature_scale
+        return np.hstack([np.asarray(embeddings, dtype=np.float32), features])
+
+    def predict_proba_many(self, embeddings: np.ndarray, features: np.ndarray) -> np.ndarray:
+        logits = self._inputs(embeddings, features) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def predict_proba(self, text: str, analysis: Dict[str, Any]) -> Optional[float]:
+        """Probabilité que le contexte soit suffisant, ou None si l'analyse n'a pas d'embedding exploitable."""
+        embedding = analysis.get("user_embedding")
+        if embedding is None:
+            return None
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        if embedding.shape[1] != self.embedding_dim:
+            return None
+        return float(self.predict_proba_many(embedding, text_features(text, analysis)[None, :])[0])
+
+    def decide(self, probability: Optional[float]) -> Optional[bool]:
+        """True (suffisant) / False (insuffisant) hors de la bande incertaine, None sinon."""
+        if probability is None or self.low < probability < self.high:
+            return None
+        return probability >= self.high
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, coef=self.coef, intercept=self.intercept, feature_mean=self.feature_mean,
+                 feature_scale=self.feature_scale, low=self.low, high=self.high,
+                 model_version=self.model_version, feature_names=np.array(FEATURE_NAMES))
+
+    @classmethod
+    def load(cls, path: Path) -> "SufficiencyClassifier":
+        with np.load(Path(path)) as data:
+            if tuple(data["feature_names"].tolist()) != FEATURE_NAMES:
+                raise ValueError("Sufficiency classifier was trained on a different feature set.")
+            return cls(data["coef"], float(data["intercept"]), data["feature_mean"], data["feature_scale"],
+                       float(data["low"]), float(data["high"]), str(data["model_version"]))
+
+
+def load_sufficiency_classifier(settings) -> Optional[SufficiencyClassifier]:
+    """Classifieur entraîné pour le modèle d'embedding courant, ou None (toutes les validations passent par le LLM)."""
+    path = Path(settings.SUFFICIENCY_MODEL_PATH)
+    if not settings.SUFFICIENCY_CLASSIFIER_ENABLED or not path.exists():
+        return None
+    try:
+        classifier = SufficiencyClassifier.load(path)
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Sufficiency classifier not loaded from {path}: {e}")
+        return None
+    if classifier.model_version != settings.EMBEDDING_MODEL_NAME:
+        logger.warning(f"Sufficiency classifier trained for '{classifier.model_version}', "
+                       f"not '{settings.EMBEDDING_MODEL_NAME}': disabled.")
+        return None
+    logger.info(f"Sufficiency classifier loaded (uncertain band {classifier.low:.2f}-{classifier.high:.2f}).")
+    return classifier
+
+
+async def ensure_validation_outcome_indexes(db, ttl_days: float) -> None:
+    """Index TTL : MongoDB supprime les décisions journalisées après `ttl_days` jours."""
+    await db[VALIDATION_OUTCOMES_COLLECTION].create_index(
+        "created_at", expireAfterSeconds=int(ttl_days * 86400), name="created_at_ttl"
+    )
+
+
+def outcome_document(text: str, analysis: Dict[str, Any], result: Dict[str, Any], model_version: str) -> Optional[Dict[str, Any]]:
+    """
+    Décision journalisée : empreinte du texte (dédoublonnage), entrées du classifieur
+    (embedding et caractéristiques) et étiquette du LLM. None si l'analyse n'a pas d'embedding.
+    """
+    embedding = analysis.get("user_embedding")
+    if embedding is None:
+        return None
+    return {
+        "text_sha256": hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest(),
+        "model_version": model_version,
+        "embedding": np.asarray(embedding, dtype=np.float32).reshape(-1).tolist(),
+        "features": text_features(text, analysis).tolist(),
+        "context_sufficient": result["status"] == "ok",
+        "confidence_score": result.get("confidence_score"),
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+async def record_validation_outcome(db, nlp_analyzer, text: str, result: Dict[str, Any],
+                                    model_version: str, ttl_days: float) -> None:
+    """Journalise une décision de l'agent de validation ; un échec n'affecte pas la requête."""
+    global _outcome_indexes_ready
+    try:
+        if not _outcome_indexes_ready:
+            await ensure_validation_outcome_indexes(db, ttl_days)
+            _outcome_indexes_ready = True
+        # Analyse du texte brut (en général déjà en cache : le pipeline vient de l'analyser)
+        document = outcome_document(text, await nlp_analyzer.analyze_free_text(text), result, model_version)
+        if document is not None:
+            await db[VALIDATION_OUTCOMES_COLLECTION].insert_one(document)
+    except Exception as e:
+        logger.warning(f"Validation outcome not recorded: {e}")
+
+
+def schedule_validation_outcome(db, nlp_analyzer, text: str, result: Dict[str, Any],
+                                model_version: str, ttl_days: float) -> None:
+    """Journalisation hors du chemin de la requête (tâche de fond, non attendue)."""
+    task = asyncio.create_task(record_validation_outcome(db, nlp_analyzer, text, result, model_version, ttl_days))
+    _OUTCOME_TASKS.add(task)
+    task.add_done_callback(_OUTCOME_TASKS.discard)
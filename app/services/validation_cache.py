@@ -0,0 +1,120 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.monitoring.monitoring import VALIDATION_CACHE
+from app.utils.cache import TTLCache
+from app.utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Champs de la réponse de l'agent conservés en cache
+CACHED_FIELDS = ("status", "corrected_text", "context_sufficient", "confidence_score", "clarifying_question", "reasoning")
+
+
+def prompt_version(prompt: str, model_name: str) -> str:
+    """Empreinte courte du prompt et du modèle : un changement de prompt invalide le cache."""
+    return hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+class ValidationCache:
+    """
+    Cache des réponses de l'agent de validation, indexé par le texte normalisé et la
+    version du prompt. Deux niveaux : un TTLCache en mémoire, puis Redis (partagé entre
+    workers et redémarrages) si un client est fourni ; une erreur Redis n'est que journalisée.
+    Les requêtes concurrentes sur une même clé absente ne déclenchent qu'un appel (single-flight).
+    """
+
+    def __init__(self, prompt_version: str, max_entries: int = 10000, ttl_seconds: float = 86400.0,
+                 redis_client=None, key_prefix: str = "validation:"):
+        self.prompt_version = prompt_version
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self._local = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def key(self, text: str) -> str:
+        payload = f"{self.prompt_version}\x00{normalize_text(text)}"
+        return self.key_prefix + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, text: str) -> Optional[Dict[str, Any]]:
+        key = self.key(text)
+        result = self._local.get(key)
+        if result is not None:
+            VALIDATION_CACHE.labels(result="local_hit").inc()
+            return copy.deepcopy(result)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Validation cache: Redis read failed ({e}), using the in-process cache only.")
+                raw = None
+            if raw is not None:
+                result = json.loads(raw)
+                self._local.set(key, result)
+                VALIDATION_CACHE.labels(result="redis_hit").inc()
+                return copy.deepcopy(result)
+        VALIDATION_CACHE.labels(result="miss").inc()
+        return None
+
+    async def set(self, text: str, result: Dict[str, Any]) -> None:
+        key = self.key(text)
+        entry = {field: result.get(field) for field in CACHED_FIELDS}
+        self._local.set(key, entry)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(entry, ensure_ascii=False), ex=int(self.ttl_seconds))
+            except Exception as e:
+                logger.warning(f"Validation cache: Redis write failed ({e}).")
+
+    async def _compute_and_store(self, text: str, compute, cacheable) -> Dict[str, Any]:
+        result = await compute()
+        if cacheable(result):
+            await self.set(text, result)
+        return result
+
+    async def get_or_compute(self, text: str, compute: Callable[[], Awaitable[Dict[str, Any]]],
+                             cacheable: Callable[[Dict[str, Any]], bool] = lambda result: True) -> Tuple[Dict[str, Any], bool]:
+        """
+        Résultat en cache, sinon `compute()` ; un seul calcul par clé à la fois, les autres
+        appelants attendent son résultat. Seuls les résultats `cacheable` sont conservés.
+        Retourne (résultat, True si `compute` a été appelé pour cet appelant).
+        """
+        key = self.key(text)
+        task = self._inflight.get(key)
+        if task is None:
+            cached = await self.get(text)
+            if cached is not None:
+                return cached, False
+            # Un appel concurrent a pu démarrer pendant la lecture Redis
+            task = self._inflight.get(key)
+        computed = task is None
+        if computed:
+            # Tâche indépendante : l'annulation du premier appelant n'interrompt pas les autres
+            task = asyncio.ensure_future(self._compute_and_store(text, compute, cacheable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            VALIDATION_CACHE.labels(result="coalesced").inc()
+        return copy.deepcopy(await asyncio.shield(task)), computed
+
+
+def build_validation_cache(settings, prompt: str) -> Optional[ValidationCache]:
+    """Cache configuré (Redis si REDIS_URL est défini), ou None si désactivé."""
+    if not settings.VALIDATION_CACHE_ENABLED:
+        return None
+    redis_client = None
+    if settings.REDIS_URL:
+        import redis.asyncio as redis
+        redis_client = redis.from_url(settings.REDIS_URL, socket_timeout=settings.REDIS_TIMEOUT_SECONDS,
+                                      socket_connect_timeout=settings.REDIS_TIMEOUT_SECONDS)
+    return ValidationCache(
+        prompt_version=prompt_version(prompt, settings.GEMINI_MODEL_NAME),
+        max_entries=settings.VALIDATION_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.VALIDATION_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+    )
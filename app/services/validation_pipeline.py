@@ -0,0 +1,114 @@
+"""
+Validation de l'entrée, analyse NLP et scoring des pratiques pour une requête en texte libre.
+
+- "sequential" : validation (LLM) puis analyse et scoring du texte corrigé ;
+- "speculative" : l'analyse et le scoring du texte brut démarrent pendant la validation.
+  Le résultat spéculatif est réutilisé si le texte corrigé reste proche de l'original
+  (similarité >= `min_similarity`), recalculé sinon, et abandonné si la validation
+  conclut à une urgence ou à un contexte insuffisant.
+"""
+import asyncio
+import contextlib
+import difflib
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.monitoring.monitoring import SPECULATION_OUTCOMES, VALIDATION_PIPELINE_LATENCY
+from app.utils.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_MODES = ("sequential", "speculative")
+
+
+class PipelineResult(NamedTuple):
+    validation: Dict[str, Any]
+    # None si la validation n'a pas abouti (urgence, contexte insuffisant)
+    nlp_analysis: Optional[Dict[str, Any]]
+    recommendations: Optional[List[Dict[str, Any]]]
+
+
+def text_similarity(original: str, corrected: str) -> float:
+    """Similarité (0-1) entre le texte brut et le texte corrigé, après normalisation."""
+    original, corrected = normalize_text(original), normalize_text(corrected)
+    if original == corrected:
+        return 1.0
+    return difflib.SequenceMatcher(None, original, corrected, autojunk=False).ratio()
+
+
+async def _recommend(recommender, nlp_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if not nlp_analysis or nlp_analysis.get("user_embedding") is None:
+        return []
+    return await recommender.recommend(nlp_analysis)
+
+
+async def _cancel(*tasks: asyncio.Task) -> None:
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+
+
+async def _sequential(text: str, validation_service, nlp_analyzer, recommender) -> PipelineResult:
+    nlp_analysis = None
+    if validation_service.sufficiency_classifier is not None:
+        # L'analyse du texte brut (mise en cache) sert d'entrée au pré-classifieur local
+        nlp_analysis = await nlp_analyzer.analyze_free_text(text)
+    validation = await validation_service.validate_and_process_input(text, nlp_analysis)
+    if validation["status"] != "ok":
+        return PipelineResult(validation, None, None)
+
+    corrected_text = validation["corrected_text"]
+    if nlp_analysis is None or corrected_text != text:
+        nlp_analysis = await nlp_analyzer.analyze_free_text(corrected_text)
+    return PipelineResult(validation, nlp_analysis, await _recommend(recommender, nlp_analysis))
+
+
+async def _speculative(text: str, validation_service, nlp_analyzer, recommender,
+                       min_similarity: float) -> PipelineResult:
+    analysis_task = asyncio.ensure_future(nlp_analyzer.analyze_free_text(text))
+
+    async def _score_raw_text():
+        return await _recommend(recommender, await analysis_task)
+
+    scoring_task = asyncio.ensure_future(_score_raw_text())
+    try:
+        nlp_analysis = None
+        if validation_service.sufficiency_classifier is not None:
+            nlp_analysis = await analysis_task
+        validation = await validation_service.validate_and_process_input(text, nlp_analysis)
+    except BaseException:
+        await _cancel(scoring_task, analysis_task)
+        raise
+
+    if validation["status"] != "ok":
+        SPECULATION_OUTCOMES.labels(outcome="abandoned").inc()
+        await _cancel(scoring_task, analysis_task)
+        return PipelineResult(validation, None, None)
+
+    corrected_text = validation["corrected_text"]
+    if text_similarity(text, corrected_text) >= min_similarity:
+        SPECULATION_OUTCOMES.labels(outcome="reused").inc()
+        return PipelineResult(validation, await analysis_task, await scoring_task)
+
+    # Correction trop importante : le texte corrigé est analysé à nouveau
+    SPECULATION_OUTCOMES.labels(outcome="redone").inc()
+    await _cancel(scoring_task, analysis_task)
+    nlp_analysis = await nlp_analyzer.analyze_free_text(corrected_text)
+    return PipelineResult(validation, nlp_analysis, await _recommend(recommender, nlp_analysis))
+
+
+async def run_validation_pipeline(text: str, validation_service, nlp_analyzer, recommender,
+                                  mode: str = "speculative", min_similarity: float = 0.9) -> PipelineResult:
+    """Valide `text`, puis l'analyse et calcule les recommandations (voir les modes ci-dessus)."""
+    started = time.perf_counter()
+    if mode == "speculative":
+        result = await _speculative(text, validation_service, nlp_analyzer, recommender, min_similarity)
+    elif mode == "sequential":
+        result = await _sequential(text, validation_service, nlp_analyzer, recommender)
+    else:
+        raise ValueError(f"Unknown validation pipeline mode: {mode}")
+    VALIDATION_PIPELINE_LATENCY.labels(mode=mode).observe(time.perf_counter() - started)
+    return result
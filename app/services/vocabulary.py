@@ -0,0 +1,74 @@
+"""
+Vocabulaire métier partagé par l'analyse NLP et le recommender.
+Ce module ne dépend d'aucun modèle : il peut être importé sans charger spaCy ni torch.
+"""
+from typing import Any, Dict, List, Tuple
+
+from app.utils.aho_corasick import AhoCorasick
+
+# Mots-clés enrichis basés sur le notebook : catégorie de symptôme -> expressions associées
+HOLISTIC_KEYWORDS = {
+    'stress': ['stress', 'anxiété', 'angoisse', 'nervosité', 'tension', 'éprouver du stress', 'irritabilité', 'pression', 'tension nerveuse', 'stress_anxiety'],
+    'douleur': ['douleur', 'mal', 'souffrance', 'inflammation', 'douleur physique', 'back_pain_specific', 'cervicalgie', 'lombalgie', 'mal de dos', 'tensions musculaires', 'douleur persistante', 'physical_pain'],
+    'fatigue': ['fatigue', 'épuisement', 'burnout', 'surmenage', 'manque d’énergie', 'épuisement mental', 'fatigue chronique', 'épuisement physique'],
+    'sommeil': ['insomnie', 'sommeil', 'dormir', 'cauchemar', 'troubles du sommeil', 'sommeil agité', 'dérèglement du sommeil', 'sleep_issues', 'fatigue liée au sommeil', 'trouble du sommeil'],
+    'digestion': ['digestion', 'ventre', 'intestin', 'estomac', 'troubles digestifs', 'ballonnements', 'indigestion', 'digestive', 'problèmes digestifs', 'mal de ventre', 'acidité gastrique']
+}
+
+
+# Marqueurs d'urgence et niveau associé ; le niveau le plus élevé trouvé l'emporte
+URGENCY_MARKERS = {
+    'high': ['urgent', 'insupportable', 'sévère', 'aigu', 'extrême', 'intolérable', 'critique', 'insoutenable', 'très intense', 'très grave'],
+    'medium': ['gênant', 'difficile', 'intense', 'modéré', 'inconfortable', 'problématique', 'notable', 'significatif', 'perturbant'],
+    'low': ['léger', 'occasionnel', 'faible', 'discret', 'supportable', 'modéré', 'bénin', 'peu dérangeant', 'passager']
+}
+URGENCY_LEVELS = {'high': 0.9, 'medium': 0.6, 'low': 0.3}
+DEFAULT_URGENCY = 0.3
+
+
+class VocabularyMatcher:
+    """
+    Compile tous les mots-clés de symptômes et marqueurs d'urgence dans un seul automate
+    (Aho-Corasick) : catégories de symptômes et niveau d'urgence sont extraits en une passe.
+    La recherche reste une recherche de sous-chaînes insensible à la casse.
+    """
+
+    def __init__(self, holistic_keywords: Dict[str, List[str]] = HOLISTIC_KEYWORDS,
+                 urgency_markers: Dict[str, List[str]] = URGENCY_MARKERS):
+        patterns = []
+        for category, keywords in holistic_keywords.items():
+            for keyword in keywords:
+                # Gérer les espaces dans les mots-clés (ex: 'stress_anxiety')
+                patterns.append((keyword.replace('_', ' ').lower(), ('symptom', category, keyword)))
+        for level, markers in urgency_markers.items():
+            for marker in markers:
+                patterns.append((marker.lower(), ('urgency', level)))
+        self.automaton = AhoCorasick(patterns)
+
+    def match(self, text: str) -> Tuple[List[Dict[str, str]], float]:
+        """Retourne (symptômes sans doublons [{'category', 'keyword'}], niveau d'urgence)."""
+        symptoms: Dict[Tuple[str, str], Dict[str, str]] = {}
+        urgency = None
+        for _, _, value in self.automaton.iter_matches(text.lower()):
+            if value[0] == 'symptom':
+                _, category, keyword = value
+                symptoms.setdefault((category, keyword), {'category': category, 'keyword': keyword})
+            else:
+                level = URGENCY_LEVELS[value[1]]
+                urgency = level if urgency is None else max(urgency, level)
+        return list(symptoms.values()), urgency if urgency is not None else DEFAULT_URGENCY
+
+
+def responses_to_text(data: Dict[str, Any]) -> str:
+    """Convertit un dictionnaire de réponses de QCM en une phrase lisible."""
+    parts = []
+    for key, values in data.items():
+        # Remplace les clés techniques par des termes compréhensibles
+        key_fr = key.replace('_', ' ').replace('main concern', 'préoccupation principale').replace('pain location', 'localisation de la douleur')
+        if isinstance(values, list):
+            value_fr = ", ".join(str(v).replace('_', ' ') for v in values)
+            parts.append(f"{key_fr} est {value_fr}")
+        else:
+            parts.append(f"{key_fr} est {str(values).replace('_', ' ')}")
+    # Joindre toutes les parties en une seule phrase descriptive
+    return ". ".join(parts) + "."
@@ -0,0 +1,76 @@
+"""
+Automate d'Aho-Corasick : recherche simultanée de nombreux motifs en une seule passe sur le texte.
+Le coût de la recherche dépend de la longueur du texte et du nombre d'occurrences,
+pas du nombre de motifs.
+"""
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher. Every (overlapping) occurrence is reported."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        # Trie : transitions, lien d'échec et sorties (longueur du motif, valeur associée) par état
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]
+
+        for pattern, value in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append((len(pattern), value))
+
+        # Liens d'échec en largeur ; les sorties des suffixes sont fusionnées dans chaque état
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+        # Automate déterministe : les liens d'échec sont résolus à la construction, la recherche
+        # ne fait plus qu'une consultation de dictionnaire par caractère (caractère inconnu -> racine)
+        # (le lien d'échec pointe vers un état moins profond, donc déjà résolu dans l'ordre BFS)
+        self._delta: List[Dict[str, int]] = [{} for _ in self._goto]
+        for state in self._bfs_order():
+            transitions = dict(self._delta[self._fail[state]]) if state else {}
+            transitions.update(self._goto[state])
+            self._delta[state] = transitions
+
+    def _bfs_order(self) -> List[int]:
+        order, queue = [], deque([0])
+        while queue:
+            state = queue.popleft()
+            order.append(state)
+            queue.extend(self._goto[state].values())
+        return order
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yields ``(start, end, value)`` for every occurrence of every pattern in ``text``."""
+        delta, outputs = self._delta, self._outputs
+        state = 0
+        for position, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                for length, value in outputs[state]:
+                    yield position + 1 - length, position + 1, value
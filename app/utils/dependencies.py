@@ -1,33 +1,42 @@
-from app.services.nlp_analyzer import NLPAnalyzer
+from typing import TYPE_CHECKING
+from app.services.nlp_executor import AsyncNLPAnalyzer
 from app.services.recommender import Recommender
-from app.services.rag_agent_service import RAGAgentService
 from app.config import get_settings
 from fastapi import Request
-from app.services.input_validation_service import InputValidationService
 
+if TYPE_CHECKING:
+    # Imports de typage seulement : ces modules chargent langchain / agno
+    from app.services.rag_agent_service import RAGAgentService
+    from app.services.input_validation_service import InputValidationService
 
 
 
 
-def get_nlp_analyzer(request: Request) -> NLPAnalyzer:
-    # Cette fonction instancie notre service unifié.
-    return request.app.state.nlp_analyzer
 
-def get_recommender() -> Recommender:
-    return Recommender()
+def get_nlp_analyzer(request: Request) -> AsyncNLPAnalyzer:
+    # Façade asynchrone du service NLP unifié, chargée en arrière-plan au démarrage (lifespan).
+    # Lève ComponentNotReadyError (503) tant qu'elle n'est pas prête.
+    return request.app.state.components.get("nlp_analyzer")
+
+def get_recommender(request: Request) -> Recommender:
+    """
+    Récupère le Recommender partagé (et son index des pratiques résident)
+    créé au démarrage de l'application via la fonction lifespan.
+    """
+    return request.app.state.components.get("recommender")
 
 
-def get_rag_agent_service(request: Request) -> RAGAgentService:
+def get_rag_agent_service(request: Request) -> "RAGAgentService":
     """
     Récupère l'instance unique du RAGAgentService qui a été
     pré-chargée au démarrage de l'application via la fonction lifespan.
     """
-    return request.app.state.rag_service
+    return request.app.state.components.get("rag_service")
 
 
-def get_input_validation_service(request: Request) -> InputValidationService:
+def get_input_validation_service(request: Request) -> "InputValidationService":
     """Récupère l'instance unique du service de validation."""
-    return request.app.state.validation_service
+    return request.app.state.components.get("validation_service")
 
 
 
@@ -0,0 +1,50 @@
+"""
+Encodage des embeddings des pratiques dans MongoDB.
+
+Les embeddings sont stockés sous forme d'un champ BSON binaire (float32 little-endian)
+accompagné de leur dimension et de la version du modèle qui les a produits, au lieu
+d'une liste de doubles BSON décodée élément par élément.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+from bson.binary import Binary
+
+EMBEDDING_DTYPE = np.dtype("<f4")
+
+# Champs du document "practices" liés à l'embedding
+EMBEDDING_FIELD = "embedding"
+EMBEDDING_DIM_FIELD = "embedding_dim"
+EMBEDDING_MODEL_FIELD = "embedding_model"
+
+
+def encode_embedding(vector: Any, model_version: str) -> Dict[str, Any]:
+    """Retourne les champs à enregistrer pour un embedding (binaire float32 + dimension + modèle)."""
+    if hasattr(vector, "detach"):  # torch.Tensor
+        vector = vector.detach().cpu().numpy()
+    array = np.ascontiguousarray(vector, dtype=EMBEDDING_DTYPE).reshape(-1)
+    return {
+        EMBEDDING_FIELD: Binary(array.tobytes()),
+        EMBEDDING_DIM_FIELD: int(array.shape[0]),
+        EMBEDDING_MODEL_FIELD: model_version,
+    }
+
+
+def is_binary_embedding(value: Any) -> bool:
+    """Vrai si la valeur est déjà au format binaire (bytes ou bson.Binary)."""
+    return isinstance(value, (bytes, bytearray, memoryview))
+
+
+def decode_embedding(value: Any, dim: Optional[int] = None) -> np.ndarray:
+    """
+    Décode un embedding stocké en vecteur float32.
+    Le format binaire est lu avec np.frombuffer (sans copie ni objet Python par élément) ;
+    l'ancien format liste reste accepté pour les collections pas encore migrées.
+    """
+    if is_binary_embedding(value):
+        vector = np.frombuffer(value, dtype=EMBEDDING_DTYPE)
+    else:
+        vector = np.asarray(value, dtype=np.float32).reshape(-1)
+    if dim is not None and vector.shape[0] != dim:
+        raise ValueError(f"Embedding dimension mismatch: expected {dim}, got {vector.shape[0]}")
+    return vector
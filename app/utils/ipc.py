@@ -0,0 +1,43 @@
+"""
+Protocole du serveur de modèles : messages JSON préfixés par leur longueur (4 octets, big-endian)
+sur une socket Unix. Les embeddings transitent par des segments de mémoire partagée.
+"""
+import asyncio
+import json
+import os
+import struct
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict
+
+_HEADER = struct.Struct(">I")
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+async def read_message(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    """Lit un message ; lève asyncio.IncompleteReadError si la connexion est fermée."""
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message too large: {length} bytes")
+    return json.loads(await reader.readexactly(length))
+
+
+def write_message(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+def attach_shared_memory(name: str, owner_pid: int) -> SharedMemory:
+    """
+    S'attache à un segment créé par le processus `owner_pid`, sans en prendre la propriété :
+    seul le créateur (le client) le détruit.
+    """
+    shm = SharedMemory(name=name)
+    # Avant Python 3.13, l'attachement enregistre le segment auprès du resource tracker,
+    # qui le détruirait à la sortie de ce processus
+    if owner_pid != os.getpid():
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm
@@ -0,0 +1,112 @@
+"""
+Mode de service prefork (gunicorn + workers uvicorn, voir gunicorn.conf.py).
+
+Les ressources en lecture seule sont chargées une seule fois dans le processus maître,
+avant le fork : les workers en héritent en copy-on-write au lieu de les recharger.
+- modèles spaCy / embedding : cache lru de get_nlp_resources ;
+- catalogue des pratiques : instantané sur disque, matrice relue en mmap par chaque worker ;
+- index ANN du catalogue : reconstruit ici s'il est périmé (seul écrivain), relu en mmap ;
+- index BM25 : persisté sur disque, relu en mmap (pages partagées entre workers) ;
+- table des contextes RAG précalculés : vérifiée une fois et héritée par les workers.
+Le GC est désactivé pendant le préchargement puis les objets sont gelés (gc.freeze) avant
+chaque fork, pour que les collectes des workers n'écrivent pas dans les pages partagées.
+"""
+import asyncio
+import gc
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ressources préchargées par le maître, héritées par les workers
+_PRELOADED: Dict[str, Any] = {}
+
+
+def get_preloaded(name: str) -> Optional[Any]:
+    """Ressource préchargée par le processus maître (None hors mode prefork)."""
+    return _PRELOADED.get(name)
+
+
+def build_ann_index_for(settings, index) -> bool:
+    """Vérifie/reconstruit et persiste l'index ANN du catalogue (seul écrivain de ANN_INDEX_DIR)."""
+    from app.services.ann_index import load_or_build_ann_index
+
+    if not settings.ANN_ENABLED or len(index) < settings.ANN_MIN_PRACTICES:
+        return False
+    load_or_build_ann_index(index.embeddings, [p["_id"] for p in index.practices],
+                            Path(settings.ANN_INDEX_DIR), settings.ANN_N_LISTS, persist=True)
+    return True
+
+
+async def _write_practice_snapshot(settings, directory: Path) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.services.practice_index import INDEX_PROJECTION, PracticeIndex
+    from app.services.vocabulary import HOLISTIC_KEYWORDS
+
+    client = AsyncIOMotorClient(settings.MONGO_URI)
+    try:
+        practices = await client[settings.MONGO_DB_NAME].practices.find({}, INDEX_PROJECTION).to_list(length=None)
+    finally:
+        client.close()
+    index = PracticeIndex(practices, model_version=settings.EMBEDDING_MODEL_NAME,
+                          symptom_vocabulary=HOLISTIC_KEYWORDS.keys())
+    index.save(directory)
+    build_ann_index_for(settings, index)
+    return len(index)
+
+
+def preload_shared_resources(settings) -> None:
+    """Charge dans le maître tout ce que les workers peuvent partager. Chaque étape est optionnelle."""
+    gc.disable()
+
+    # 1. Modèles NLP (mis en cache par get_nlp_resources, réutilisés par NLPAnalyzer dans les workers)
+    if settings.NLP_EXECUTOR == "thread":
+        try:
+            from app.services.nlp_analyzer import get_nlp_resources
+            get_nlp_resources()
+            _PRELOADED["nlp_resources"] = True
+        except Exception as e:
+            logger.warning(f"NLP models not preloaded: {e}")
+
+    # 2. Instantané du catalogue des pratiques, relu en mmap par les workers
+    snapshot_dir = Path(settings.PRACTICE_SNAPSHOT_DIR)
+    try:
+        count = asyncio.run(_write_practice_snapshot(settings, snapshot_dir))
+        _PRELOADED["practice_snapshot_dir"] = snapshot_dir
+        logger.info(f"Practice snapshot written to {snapshot_dir} ({count} practices).")
+    except Exception as e:
+        logger.warning(f"Practice snapshot not written: {e}")
+
+    # 3. Index BM25 : vérifié (reconstruit s'il est périmé) une fois, relu en mmap ;
+    # le client Qdrant du maître n'est pas transmis aux workers
+    try:
+        from qdrant_client import QdrantClient
+        from app.services.sparse_index import load_or_build_sparse_index
+        client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY, timeout=60)
+        try:
+            _PRELOADED["sparse_index"] = load_or_build_sparse_index(
+                client, settings.QDRANT_COLLECTION_NAME, settings.SPARSE_INDEX_DIR
+            )
+            # 4. Table des contextes précalculés (None si absente ou périmée)
+            if settings.CONTEXT_TABLE_ENABLED:
+                from app.services.context_table import load_context_table
+                _PRELOADED["context_table"] = load_context_table(
+                    settings.CONTEXT_TABLE_PATH, client, settings.QDRANT_COLLECTION_NAME
+                )
+        finally:
+            client.close()
+    except Exception as e:
+        logger.warning(f"Sparse index not preloaded: {e}")
+
+    gc.collect()
+
+
+def freeze_before_fork() -> None:
+    """Déplace tous les objets existants dans la génération permanente du GC."""
+    gc.freeze()
+
+
+def after_fork() -> None:
+    """Dans le worker : réactive le GC (les objets gelés hérités ne sont plus parcourus)."""
+    gc.enable()
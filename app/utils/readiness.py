@@ -0,0 +1,96 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from app.monitoring.monitoring import COMPONENT_STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+class ComponentNotReadyError(Exception):
+    """Levée quand une route dépend d'un composant encore en cours de chargement (ou en échec)."""
+
+    def __init__(self, name: str, state: str):
+        super().__init__(f"Component '{name}' is {state}.")
+        self.name = name
+        self.state = state
+
+
+class ComponentRegistry:
+    """
+    Chargement concurrent, en arrière-plan, des composants lourds de l'application
+    (modèles NLP, connexion Qdrant + BM25, agents...). Chaque composant passe par les états
+    pending -> loading -> ready | failed ; sa durée de chargement est exportée en métrique.
+    Les loaders synchrones sont exécutés dans un thread pour ne pas bloquer la boucle.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Loader] = {}
+        self._components: Dict[str, Any] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def register(self, name: str, loader: Loader) -> None:
+        self._loaders[name] = loader
+        self._states[name] = {"state": "pending", "duration_seconds": None, "error": None}
+
+    def start(self) -> None:
+        """Lance tous les chargements en parallèle, sans les attendre."""
+        for name, loader in self._loaders.items():
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._load(name, loader), name=f"load-{name}")
+
+    async def _load(self, name: str, loader: Loader) -> None:
+        self._states[name]["state"] = "loading"
+        started = time.monotonic()
+        try:
+            if inspect.iscoroutinefunction(loader):
+                component = await loader()
+            else:
+                component = await asyncio.to_thread(loader)
+        except Exception as e:
+            duration = time.monotonic() - started
+            self._states[name].update(state="failed", error=str(e), duration_seconds=duration)
+            COMPONENT_STARTUP_SECONDS.labels(component=name, state="failed").set(duration)
+            logger.error(f"🔴 Component '{name}' failed to load: {e}")
+            return
+        duration = time.monotonic() - started
+        self._components[name] = component
+        self._states[name].update(state="ready", duration_seconds=duration)
+        COMPONENT_STARTUP_SECONDS.labels(component=name, state="ready").set(duration)
+        logger.info(f"✅ Component '{name}' ready in {duration:.2f}s.")
+
+    async def wait(self, name: Optional[str] = None) -> None:
+        """Attend la fin du chargement d'un composant (ou de tous)."""
+        tasks = [self._tasks[name]] if name is not None else list(self._tasks.values())
+        await asyncio.gather(*tasks)
+
+    def get(self, name: str) -> Any:
+        state = self._states.get(name, {}).get("state", "unknown")
+        if state != "ready":
+            raise ComponentNotReadyError(name, state)
+        return self._components[name]
+
+    def get_if_ready(self, name: str) -> Optional[Any]:
+        return self._components.get(name)
+
+    def is_ready(self) -> bool:
+        return all(state["state"] == "ready" for state in self._states.values())
+
+    def has_failed(self) -> bool:
+        """Un composant a échoué : le processus ne deviendra jamais prêt sans redémarrage."""
+        return any(state["state"] == "failed" for state in self._states.values())
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(state) for name, state in self._states.items()}
+
+    async def shutdown(self) -> None:
+        """Annule les chargements encore en cours."""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
@@ -0,0 +1,26 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Forme canonique d'un texte utilisateur : Unicode NFC et espaces fusionnés."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+@lru_cache(maxsize=None)
+def _fold_char(char: str) -> str:
+    return unicodedata.normalize("NFD", char)[0].lower()
+
+
+def fold(text: str) -> str:
+    """Minuscules et accents retirés, caractère par caractère : les positions sont conservées."""
+    return "".join(map(_fold_char, text))
+
+
+def normalize_practice_id(practice_name: str) -> str:
+    """Identifiant stable d'une pratique : "Yoga Nidra" -> "yoga-nidra" (accents et ponctuation retirés)."""
+    return _NON_ALNUM.sub("-", fold(normalize_text(practice_name))).strip("-")
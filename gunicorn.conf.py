@@ -0,0 +1,33 @@
+# Configuration gunicorn du mode de service prefork :
+#   gunicorn -c gunicorn.conf.py app.main:app
+# Les modèles et index en lecture seule sont chargés une fois dans le maître puis partagés
+# en copy-on-write par les workers (voir app/utils/prefork.py).
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# PREFORK_PRELOAD=0 : chaque worker charge ses propres modèles (pour comparer la mémoire)
+preload_app = os.getenv("PREFORK_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    # Appelé dans le maître, avant le fork des workers
+    if not preload_app:
+        return
+    from app.config import get_settings
+    from app.utils.prefork import preload_shared_resources
+    preload_shared_resources(get_settings())
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from app.utils.prefork import freeze_before_fork
+        freeze_before_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.utils.prefork import after_fork
+        after_fork()
@@ -0,0 +1,61 @@
+import asyncio
+
+import numpy as np
+
+from app.services.analysis_cache import AnalysisCache
+from app.services.nlp_executor import AsyncNLPAnalyzer
+from app.utils.cache import TTLCache
+
+
+class CountingAnalyzer:
+    """Analyseur factice qui compte les appels aux modèles."""
+    def __init__(self):
+        self.calls = 0
+
+    def analyze_free_text(self, text):
+        self.calls += 1
+        return {"structured_analysis": {"keywords": [text], "symptoms": [], "urgency_level": 0.3},
+                "user_embedding": np.array([1.0, 2.0, 3.0])}
+
+    def analyze_many(self, texts):
+        return [self.analyze_free_text(text) for text in texts]
+
+
+def test_repeated_inputs_skip_the_models():
+    """
+    Un texte identique à la normalisation près (espaces, NFC) ne doit pas repasser par les modèles.
+    """
+    analyzer = CountingAnalyzer()
+    nlp = AsyncNLPAnalyzer(analyzer, mode="thread", cache=AnalysisCache("model-v1"))
+
+    async def scenario():
+        first = await nlp.analyze_free_text("Je suis  stressé\n")
+        second = await nlp.analyze_free_text("Je suis stressé")
+        batch = await nlp.analyze_many(["Je suis stressé", "autre texte"])
+        return first, second, batch
+
+    first, second, batch = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert analyzer.calls == 2
+    assert second["structured_analysis"] == first["structured_analysis"]
+    assert second["user_embedding"].dtype == np.float32
+    assert np.allclose(second["user_embedding"], [1.0, 2.0, 3.0])
+    assert batch[0]["structured_analysis"] == first["structured_analysis"]
+
+
+def test_cache_key_depends_on_model_version():
+    assert AnalysisCache("model-v1").key("texte") != AnalysisCache("model-v2").key("texte")
+
+
+def test_ttl_cache_evicts_lru_and_expired_entries():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+    expired = TTLCache(max_entries=2, ttl_seconds=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
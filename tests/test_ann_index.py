@@ -0,0 +1,62 @@
+import numpy as np
+
+from app.services.ann_index import IVFInt8Index, load_or_build_ann_index, recall_at_k
+
+
+def _clustered_catalog(n: int = 3000, dim: int = 32, n_clusters: int = 40, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(n_clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32), rng
+
+
+def test_ann_recall_against_exact_search():
+    """
+    Vérification rappel ANN vs recherche exacte : le rappel augmente avec nprobe
+    et reste élevé au réglage par défaut.
+    """
+    embeddings, rng = _clustered_catalog()
+    index = IVFInt8Index.build(embeddings)
+    queries = embeddings[rng.choice(len(embeddings), size=50, replace=False)] + 0.05 * rng.normal(size=(50, 32))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    low = recall_at_k(embeddings, index, queries, k=10, nprobe=1)
+    default = recall_at_k(embeddings, index, queries, k=10, nprobe=8)
+    full = recall_at_k(embeddings, index, queries, k=10, nprobe=index.n_lists)
+
+    assert low <= default <= full
+    assert default >= 0.9
+    assert full >= 0.95
+
+
+def test_ann_index_is_persisted_and_reloaded(tmp_path):
+    embeddings, _ = _clustered_catalog(n=500)
+    ids = [f"p{i}" for i in range(len(embeddings))]
+
+    built = load_or_build_ann_index(embeddings, ids, tmp_path)
+    reloaded = load_or_build_ann_index(embeddings, ids, tmp_path)
+
+    assert reloaded.fingerprint == built.fingerprint
+    assert np.array_equal(reloaded.search(embeddings[0], 5, 4), built.search(embeddings[0], 5, 4))
+
+    # Un catalogue modifié invalide l'index persisté
+    changed = load_or_build_ann_index(embeddings[:-1], ids[:-1], tmp_path)
+    assert changed.fingerprint != built.fingerprint
+    assert len(changed) == len(embeddings) - 1
+
+
+def test_mapped_index_survives_a_rebuild(tmp_path):
+    """Un index relu en mmap avant une reconstruction + sauvegarde garde ses anciens résultats."""
+    embeddings, rng = _clustered_catalog(n=500)
+    IVFInt8Index.build(embeddings, fingerprint="old").save(tmp_path / "ann")
+    mapped = IVFInt8Index.load(tmp_path / "ann")
+    expected = mapped.search(embeddings[0], 5, 4).copy()
+
+    other = rng.normal(size=(400, 32))
+    other = (other / np.linalg.norm(other, axis=1, keepdims=True)).astype(np.float32)
+    IVFInt8Index.build(other, fingerprint="new").save(tmp_path / "ann")
+
+    assert np.array_equal(mapped.search(embeddings[0], 5, 4), expected)
+    assert IVFInt8Index.load(tmp_path / "ann").fingerprint == "new"
+    assert not (tmp_path / "ann.tmp").exists() and not (tmp_path / "ann.old").exists()
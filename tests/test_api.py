@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from app.config import get_settings
 
 def test_read_root(client: TestClient):
     """
@@ -51,3 +52,23 @@ def test_submit_feedback_invalid_rating(client: TestClient):
     # Vérifie que l'API rejette la requête avec une erreur 422 (Unprocessable Entity)
     assert response.status_code == 422
 
+
+def test_feedback_updates_practice_stats(client: TestClient, db_connection):
+    """
+    Chaque feedback lié à une pratique incrémente ses statistiques matérialisées.
+    """
+    db = db_connection[get_settings().MONGO_DB_NAME]
+
+    for rating in (4, 2):
+        response = client.post("/api/v1/feedback/", json={
+            "session_id": "session_stats",
+            "rating": rating,
+            "comment": "ok",
+            "practice_name": "Pratique Stats"
+        })
+        assert response.status_code == 201
+
+    stats = db["feedback_stats"].find_one({"_id": "Pratique Stats"})
+    assert stats["count"] == 2
+    assert stats["sum"] == 6
+    assert stats["sum_sq"] == 20
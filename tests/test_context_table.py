@@ -0,0 +1,63 @@
+import asyncio
+
+from qdrant_client import QdrantClient, models
+
+from app.services.context_table import ContextTable, category_combinations, collection_version, load_context_table
+from app.services.retrieval import RetrievedDocument
+
+
+class FakeRetriever:
+    """Retriever qui renvoie la requête et la pratique demandées comme unique document."""
+    def __init__(self):
+        self.batches = []
+
+    async def retrieve_many(self, queries, practice_ids=None):
+        self.batches.append(len(queries))
+        return [[RetrievedDocument(query, {"practice_id": practice_id})] for query, practice_id in zip(queries, practice_ids)]
+
+
+def _build(retriever, version="docs:3"):
+    return asyncio.run(ContextTable.build(retriever, ["Yoga", "Méditation"], ["stress", "sommeil", "douleur"],
+                                          version, max_categories=2))
+
+
+def test_every_practice_and_category_combination_is_precomputed():
+    assert category_combinations(["stress", "sommeil"], 2) == [("sommeil",), ("stress",), ("sommeil", "stress")]
+    retriever = FakeRetriever()
+    table = _build(retriever)
+
+    assert len(table) == 2 * 6 and retriever.batches == [12]
+    docs = table.get("Méditation", ["stress", "sommeil"])
+    assert docs[0].metadata == {"practice_id": "meditation"}
+    # L'ordre des catégories ne change pas la clé ; les combinaisons trop grandes ne sont pas précalculées
+    assert table.get("Méditation", ["sommeil", "stress"]) == docs
+    assert table.get("Méditation", ["stress", "sommeil", "douleur"]) is None
+    assert table.get("Reiki", ["stress"]) is None
+    assert table.get("Yoga", []) is None
+
+
+def test_table_is_ignored_once_the_collection_changed(tmp_path):
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert("docs", points=[
+        models.PointStruct(id=i, vector=[1.0, float(i)], payload={"page_content": f"chunk {i}", "metadata": {}})
+        for i in range(3)
+    ])
+
+    path = tmp_path / "context_table.json"
+    version = collection_version(client, "docs", batch_size=2)
+    assert version == collection_version(client, "docs")
+    _build(FakeRetriever(), version=version).save(path)
+    reloaded = load_context_table(path, client, "docs")
+    assert reloaded.get("Yoga", ["stress"]) == _build(FakeRetriever()).get("Yoga", ["stress"])
+
+    # Réécriture d'un payload sans changer le nombre de points (ré-étiquetage des pratiques)
+    client.set_payload("docs", payload={"practice_id": "yoga"}, points=[0], key="metadata")
+    assert load_context_table(path, client, "docs") is None
+
+    # Remplacement d'un chunk, même nombre de points
+    _build(FakeRetriever(), version=collection_version(client, "docs")).save(path)
+    assert load_context_table(path, client, "docs") is not None
+    client.upsert("docs", points=[models.PointStruct(id=1, vector=[1.0, 0.0], payload={"page_content": "nouveau", "metadata": {}})])
+    assert load_context_table(path, client, "docs") is None
+    assert load_context_table(tmp_path / "missing.json", client, "docs") is None
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.embedding_backends import l2_normalize, load_embedding_backend, mean_pool
+
+
+def test_mean_pool_ignores_padding_tokens():
+    """
+    Le pooling doit reproduire celui de sentence-transformers : moyenne sur les seuls tokens réels.
+    """
+    hidden_states = np.array([[[1.0, 1.0], [3.0, 3.0], [100.0, 100.0]]], dtype=np.float32)
+    attention_mask = np.array([[1, 1, 0]])
+
+    pooled = mean_pool(hidden_states, attention_mask)
+
+    assert np.allclose(pooled, [[2.0, 2.0]])
+    assert np.allclose(np.linalg.norm(l2_normalize(pooled), axis=1), 1.0)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        load_embedding_backend(SimpleNamespace(EMBEDDING_BACKEND="tensorrt"))
@@ -0,0 +1,69 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeEncoder:
+    """Encodeur factice : chaque texte devient [len(texte)], et chaque appel est enregistré."""
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[float(len(t))] for t in texts], dtype=np.float32)
+
+
+def test_concurrent_texts_are_encoded_in_one_batch():
+    encoder = FakeEncoder()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=5)
+        return await asyncio.gather(*(batcher.embed("x" * i) for i in range(1, 11)))
+
+    rows = asyncio.run(scenario())
+
+    assert len(encoder.calls) == 1
+    assert [float(r[0]) for r in rows] == [float(i) for i in range(1, 11)]
+
+
+def test_batches_are_capped_at_max_size():
+    encoder = FakeEncoder()
+
+    async def scenario():
+        batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=50)
+        return await asyncio.gather(*(batcher.embed(str(i)) for i in range(10)))
+
+    asyncio.run(scenario())
+
+    assert [len(call) for call in encoder.calls] == [4, 4, 2]
+
+
+def test_encoding_errors_reach_every_caller():
+    async def failing_encoder(texts):
+        raise RuntimeError("model down")
+
+    async def scenario():
+        batcher = EmbeddingBatcher(failing_encoder, max_wait_ms=1)
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_a_failing_batch_never_leaves_callers_waiting():
+    async def short_encoder(texts):
+        return np.zeros((1, 1), dtype=np.float32)  # une ligne de moins que de textes
+
+    async def scenario():
+        batcher = EmbeddingBatcher(short_encoder, max_wait_ms=1)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True), timeout=1
+        )
+        await asyncio.sleep(0)
+        return results, batcher._tasks
+
+    results, tasks = asyncio.run(scenario())
+    assert isinstance(results[0], np.ndarray) and isinstance(results[1], IndexError)
+    assert not tasks
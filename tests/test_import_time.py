@@ -0,0 +1,20 @@
+from app.scripts.import_time_report import HEAVY_MODULES, forbidden_imports, measure, parse_importtime
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        900 |   encodings
+import time:      1500 |       2400 | app.main
+"""
+
+
+def test_parse_importtime():
+    entries = parse_importtime(SAMPLE)
+    assert [(e.module, e.depth) for e in entries] == [("_io", 2), ("encodings", 1), ("app.main", 0)]
+    assert entries[-1].cumulative_us == 2400
+
+
+def test_app_main_does_not_import_heavy_dependencies():
+    """
+    torch, spaCy, langchain, agno... ne doivent être importés qu'au chargement des composants.
+    """
+    assert forbidden_imports(measure("app.main"), HEAVY_MODULES) == []
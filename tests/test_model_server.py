@@ -0,0 +1,113 @@
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.model_client import ModelServerError, RemoteNLPAnalyzer
+from app.services.model_server import ModelServer
+from app.services.nlp_executor import AsyncNLPAnalyzer
+
+
+class FakeAnalyzer:
+    def analyze_free_text(self, text):
+        if text == "lent":
+            time.sleep(0.3)
+        embedding = np.full(4, float(len(text)), dtype=np.float32)
+        return {"structured_analysis": {"keywords": [text], "symptoms": [], "urgency_level": 0.3},
+                "user_embedding": embedding}
+
+    def analyze_many(self, texts):
+        return [self.analyze_free_text(text) if text else {"structured_analysis": {}, "user_embedding": None}
+                for text in texts]
+
+
+def test_embeddings_round_trip_through_shared_memory():
+    """
+    Les embeddings reviennent par la mémoire partagée du client ; au-delà de la taille
+    d'un slot, ils sont renvoyés en ligne dans la réponse JSON.
+    """
+    socket_path = os.path.join(tempfile.gettempdir(), f"model-server-{uuid.uuid4().hex[:8]}.sock")
+    nlp = AsyncNLPAnalyzer(FakeAnalyzer(), mode="thread")
+
+    async def scenario():
+        server = ModelServer(nlp, socket_path, dimension=4)
+        await server.start()
+        client = await RemoteNLPAnalyzer.connect(socket_path, slots=2, slot_rows=2)
+        try:
+            single = await client.analyze_free_text("abc")
+            concurrent = await asyncio.gather(*(client.analyze_free_text("x" * i) for i in range(1, 6)))
+            many = await client.analyze_many(["a", "", "bb", "ccc"])
+        finally:
+            client.shutdown()
+            await server.close()
+        return single, concurrent, many
+
+    single, concurrent, many = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert single["structured_analysis"]["keywords"] == ["abc"]
+    assert np.array_equal(single["user_embedding"], np.full(4, 3.0, dtype=np.float32))
+    assert [r["user_embedding"][0] for r in concurrent] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert many[1]["user_embedding"] is None
+    assert [many[i]["user_embedding"][0] for i in (0, 2, 3)] == [1.0, 2.0, 3.0]
+
+
+def _socket_path():
+    return os.path.join(tempfile.gettempdir(), f"model-server-{uuid.uuid4().hex[:8]}.sock")
+
+
+def test_timed_out_slot_is_reclaimed_when_the_late_response_arrives():
+    socket_path = _socket_path()
+    nlp = AsyncNLPAnalyzer(FakeAnalyzer(), mode="thread")
+
+    async def scenario():
+        server = ModelServer(nlp, socket_path, dimension=4)
+        await server.start()
+        client = await RemoteNLPAnalyzer.connect(socket_path, slots=1, slot_rows=2, timeout=0.1)
+        try:
+            with pytest.raises(ModelServerError):
+                await client.analyze_free_text("lent")
+            # Le seul slot est réservé : l'attente est bornée au lieu de bloquer indéfiniment
+            with pytest.raises(ModelServerError):
+                await client.analyze_free_text("abc")
+            await asyncio.sleep(0.4)
+            return await client.analyze_free_text("abc")
+        finally:
+            client.shutdown()
+            await server.close()
+
+    result = asyncio.run(scenario())
+    nlp.shutdown()
+    assert result["user_embedding"][0] == 3.0
+
+
+def test_unreadable_response_fails_pending_requests_and_reconnects():
+    socket_path = _socket_path()
+
+    async def handle(reader, writer):
+        from app.utils.ipc import read_message, write_message
+        request = await read_message(reader)
+        write_message(writer, {"id": request["id"], "result": {"dimension": 4, "pid": 0}})
+        await read_message(reader)
+        writer.write(b"\x00\x00\x00\x03{{{")
+        await writer.drain()
+
+    async def scenario():
+        server = await asyncio.start_unix_server(handle, path=socket_path)
+        client = await RemoteNLPAnalyzer.connect(socket_path, slots=1, slot_rows=2, timeout=5.0)
+        try:
+            started = time.monotonic()
+            with pytest.raises(ModelServerError):
+                await client.analyze_free_text("abc")
+            # Échec immédiat (pas d'attente du délai) et la connexion sera rouverte au prochain appel
+            assert time.monotonic() - started < 1.0
+            assert client._writer.is_closing()
+        finally:
+            client.shutdown()
+            server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.nlp_executor import AsyncNLPAnalyzer, NLPQueueFullError
+
+
+class SlowAnalyzer:
+    """Analyseur factice : simule un calcul bloquant et note le thread utilisé."""
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.threads = set()
+
+    def analyze_free_text(self, text):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        return {"structured_analysis": {"text": text}, "user_embedding": [1.0]}
+
+
+def test_analysis_runs_off_the_event_loop():
+    analyzer = SlowAnalyzer()
+    nlp = AsyncNLPAnalyzer(analyzer, mode="thread", max_workers=2)
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        beat = asyncio.create_task(heartbeat())
+        results = await asyncio.gather(*(nlp.analyze_free_text(f"texte {i}") for i in range(4)))
+        beat.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert [r["structured_analysis"]["text"] for r in results] == [f"texte {i}" for i in range(4)]
+    assert all(name.startswith("nlp") for name in analyzer.threads)
+    # La boucle d'événements a continué de tourner pendant les analyses
+    assert ticks > 5
+
+
+def test_queue_depth_is_bounded():
+    nlp = AsyncNLPAnalyzer(SlowAnalyzer(delay=0.1), mode="thread", max_workers=1, max_queue_depth=2)
+
+    async def scenario():
+        return await asyncio.gather(*(nlp.analyze_free_text("x") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert sum(isinstance(r, NLPQueueFullError) for r in results) == 1
+    assert sum(isinstance(r, dict) for r in results) == 2
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        AsyncNLPAnalyzer(SlowAnalyzer(), mode="gpu")
+
+
+def test_cancelled_analysis_counts_until_its_computation_ends():
+    nlp = AsyncNLPAnalyzer(SlowAnalyzer(delay=0.2), mode="thread", max_workers=1, max_queue_depth=1)
+
+    async def scenario():
+        running = asyncio.create_task(nlp.analyze_free_text("a"))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        # L'appelant est annulé mais le calcul continue dans le thread : la file reste pleine
+        with pytest.raises(NLPQueueFullError):
+            await nlp.analyze_free_text("b")
+        await asyncio.sleep(0.3)
+        return nlp._pending, await nlp.analyze_free_text("c")
+
+    pending, result = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert pending == 0
+    assert result["structured_analysis"]["text"] == "c"
@@ -0,0 +1,109 @@
+import numpy as np
+
+from app.services.practice_index import PracticeIndex
+from app.utils.embedding_codec import decode_embedding, encode_embedding
+
+
+def _practice(practice_id: str, name: str, embedding):
+    return {
+        "_id": practice_id,
+        "practice": {"name": name},
+        "indications": {"primary": [{"condition": "stress"}], "secondary": ["fatigue"]},
+        "keywords": {"symptoms": ["stress"]},
+        "embedding": embedding,
+    }
+
+
+def test_similarities_match_cosine():
+    """
+    Le produit matrice-vecteur sur l'index normalisé doit donner la similarité cosinus.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    index = PracticeIndex([_practice(f"p{i}", f"Practice {i}", v.tolist()) for i, v in enumerate(vectors)])
+    query = rng.normal(size=8).astype(np.float32)
+
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+
+    assert len(index) == 20
+    assert index.embeddings.dtype == np.float32
+    assert np.allclose(index.similarities(query), expected, atol=1e-5)
+
+
+def test_top_k_returns_best_rows_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.2], dtype=np.float32)
+
+    assert PracticeIndex.top_k(scores, 3).tolist() == [1, 3, 2]
+    assert PracticeIndex.top_k(scores, 10).tolist() == [1, 3, 2, 4, 0]
+    assert PracticeIndex.top_k(scores, 0).tolist() == []
+
+
+def test_practices_without_embedding_are_skipped():
+    index = PracticeIndex([
+        _practice("a", "A", [1.0, 0.0]),
+        {"_id": "b", "practice": {"name": "B"}},
+    ])
+
+    assert len(index) == 1
+    assert index.practices[0]["practice_name"] == "A"
+    assert index.practices[0]["primary_indications"] == {"stress"}
+
+
+def test_binary_embeddings_round_trip():
+    """
+    Les embeddings stockés en float32 binaire sont relus à l'identique par l'index.
+    """
+    vector = np.linspace(-1, 1, 16, dtype=np.float32)
+    fields = encode_embedding(vector, "test-model")
+
+    assert fields["embedding_dim"] == 16
+    assert fields["embedding_model"] == "test-model"
+    assert len(fields["embedding"]) == 16 * 4
+    assert np.array_equal(decode_embedding(fields["embedding"], 16), vector)
+
+    practice = _practice("a", "A", None)
+    practice.update(fields)
+    index = PracticeIndex([practice, _practice("b", "B", vector.tolist())], model_version="test-model")
+    assert np.allclose(index.embeddings[0], index.embeddings[1])
+
+
+def test_keyword_match_counts_use_precomputed_tables():
+    """
+    Indication exacte + correspondance fuzzy précalculée, et repli mémorisé hors vocabulaire.
+    """
+    stress = _practice("a", "A", [1.0, 0.0])
+    sleep = _practice("b", "B", [0.0, 1.0])
+    sleep["indications"] = {"primary": [{"condition": "Insomnie"}], "secondary": []}
+    sleep["keywords"] = {"symptoms": ["troubles du sommeil"]}
+    index = PracticeIndex([stress, sleep], symptom_vocabulary=["stress", "sommeil"])
+
+    assert index.symptom_matches["stress"] == {0}
+    assert index.symptom_matches["sommeil"] == {1}
+    assert index.keyword_match_counts({"stress"}).tolist() == [2.0, 0.0]
+    assert index.keyword_match_counts({"insomnie", "sommeil"}).tolist() == [0.0, 2.0]
+    assert "insomnie" in index.symptom_matches
+
+
+def test_snapshot_roundtrip_is_memory_mapped(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(6, 8)).astype(np.float32)
+    index = PracticeIndex([_practice(f"p{i}", f"Practice {i}", v.tolist()) for i, v in enumerate(vectors)],
+                          symptom_vocabulary=["stress"])
+    index.save(tmp_path / "snapshot")
+
+    reloaded = PracticeIndex.load(tmp_path / "snapshot")
+
+    assert isinstance(reloaded.embeddings, np.memmap)
+    assert np.array_equal(np.asarray(reloaded.embeddings), index.embeddings)
+    assert reloaded.practices == index.practices
+    assert reloaded.symptom_matches == index.symptom_matches
+    assert np.array_equal(reloaded.keyword_match_counts(["stress", "fatigue"]), index.keyword_match_counts(["stress", "fatigue"]))
+
+
+def test_snapshot_accepts_practices_with_missing_conditions(tmp_path):
+    practice = _practice("p0", "Practice 0", [1.0, 0.0])
+    practice["indications"]["primary"].append({"severity": "high"})
+    index = PracticeIndex([practice])
+    index.save(tmp_path / "snapshot")
+
+    assert PracticeIndex.load(tmp_path / "snapshot").practices[0]["primary_indications"] == {"stress"}
@@ -0,0 +1,65 @@
+import asyncio
+
+import numpy as np
+
+from app.services.nlp_executor import AsyncNLPAnalyzer
+from app.services.questionnaire_model import QuestionnaireModel
+
+QUESTIONS = {
+    "main_concern": {"type": "multiple_choice", "options": [{"value": "stress_anxiety"}, {"value": "fatigue"}]},
+    "stress_level": {"type": "scale", "options": [{"value": 1}, {"value": 10}]},
+    "notes": {"type": "text"},
+}
+
+
+class FakeAnalyzer:
+    """Analyseur factice : embedding one-hot dérivé du texte, compte les appels."""
+    def __init__(self):
+        self.analyzed = []
+
+    def analyze_free_text(self, text):
+        self.analyzed.append(text)
+        embedding = np.zeros(4, dtype=np.float32)
+        embedding[len(text) % 4] = 1.0
+        urgency = 0.9 if "insupportable" in text else 0.3
+        return {"structured_analysis": {"keywords": [text], "symptoms": [], "urgency_level": urgency},
+                "user_embedding": embedding}
+
+    def analyze_many(self, texts):
+        return [self.analyze_free_text(text) for text in texts]
+
+
+def test_enumerated_answers_are_analyzed_without_inference():
+    analyzer = FakeAnalyzer()
+    nlp = AsyncNLPAnalyzer(analyzer, mode="thread")
+
+    async def scenario():
+        nlp.questionnaire_model = await QuestionnaireModel.compile(QUESTIONS, nlp.analyze_many)
+        compiled_calls = len(analyzer.analyzed)
+        result = await nlp.analyze_questionnaire_responses({"main_concern": ["stress_anxiety", "fatigue"], "stress_level": 7})
+        return compiled_calls, result
+
+    compiled_calls, result = asyncio.run(scenario())
+    nlp.shutdown()
+
+    # 2 options + échelle 1..10
+    assert compiled_calls == len(nlp.questionnaire_model) == 12
+    assert len(analyzer.analyzed) == compiled_calls
+    assert result["user_embedding"].shape == (4,)
+    assert len(result["structured_analysis"]["keywords"]) == 3
+
+
+def test_free_text_answers_fall_back_to_the_models():
+    analyzer = FakeAnalyzer()
+    nlp = AsyncNLPAnalyzer(analyzer, mode="thread")
+
+    async def scenario():
+        nlp.questionnaire_model = await QuestionnaireModel.compile(QUESTIONS, nlp.analyze_many)
+        analyzer.analyzed.clear()
+        return await nlp.analyze_questionnaire_responses({"main_concern": "fatigue", "notes": "douleur insupportable"})
+
+    result = asyncio.run(scenario())
+    nlp.shutdown()
+
+    assert analyzer.analyzed == ["notes est douleur insupportable."]
+    assert result["structured_analysis"]["urgency_level"] == 0.9
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import health
+from app.utils.readiness import ComponentNotReadyError, ComponentRegistry
+
+
+def test_components_load_concurrently_and_report_state():
+    """
+    Les loaders synchrones tournent en parallèle ; un échec n'empêche pas les autres composants.
+    """
+    def slow_component():
+        time.sleep(0.2)
+        return "model"
+
+    async def failing_component():
+        raise RuntimeError("qdrant unreachable")
+
+    async def scenario():
+        registry = ComponentRegistry()
+        registry.register("a", slow_component)
+        registry.register("b", slow_component)
+        registry.register("c", failing_component)
+        started = time.monotonic()
+        registry.start()
+        with pytest.raises(ComponentNotReadyError):
+            registry.get("a")
+        await registry.wait()
+        return registry, time.monotonic() - started
+
+    registry, elapsed = asyncio.run(scenario())
+
+    assert elapsed < 0.35
+    assert registry.get("a") == "model"
+    report = registry.report()
+    assert report["b"]["state"] == "ready" and report["b"]["duration_seconds"] >= 0.2
+    assert report["c"]["state"] == "failed" and "qdrant" in report["c"]["error"]
+    assert not registry.is_ready()
+
+
+def test_health_endpoints():
+    app = FastAPI()
+    app.include_router(health.router, prefix="/health")
+    app.state.components = ComponentRegistry()
+    app.state.components.register("nlp_analyzer", lambda: None)
+
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+        assert response.json()["components"]["nlp_analyzer"]["state"] == "pending"
+
+
+def test_failed_component_is_reported_without_retry_after():
+    async def failing_component():
+        raise RuntimeError("qdrant unreachable")
+
+    async def load():
+        registry = ComponentRegistry()
+        registry.register("rag_service", failing_component)
+        registry.register("recommender", lambda: "ok")
+        registry.start()
+        await registry.wait()
+        return registry
+
+    app = FastAPI()
+    app.include_router(health.router, prefix="/health")
+    app.state.components = asyncio.run(load())
+
+    with TestClient(app) as client:
+        response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+    assert "Retry-After" not in response.headers
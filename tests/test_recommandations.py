@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 from unittest import mock
+import json
 
 BASE_URL = "http://localhost:8000/api/v1"
 
@@ -13,3 +14,69 @@ def test_recommendation_free_text_empty(client:TestClient):
         })
 
         assert response.status_code == 400  # Validation error (Texte vide)
+
+
+def test_recommendation_batch_streams_one_line_per_item(client: TestClient):
+        """
+        L'endpoint batch renvoie du NDJSON, une ligne par item et dans l'ordre de la requête.
+        """
+        response = client.post(f"{BASE_URL}/recommendations/batch", json={
+            "items": [
+                {"session_id": "batch_1"},
+                {"session_id": "batch_2", "text": "J'ai une douleur thoracique depuis ce matin"}
+            ]
+        })
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["session_id"] for line in lines] == ["batch_1", "batch_2"]
+        assert lines[0]["status"] == "invalid"
+        assert lines[1]["status"] == "emergency"
+
+
+def test_recommendation_batch_does_not_wait_for_the_rag_service():
+        """
+        Sans generate_advice, le lot est servi même si le service RAG (Qdrant) n'est pas prêt ;
+        avec generate_advice, la route répond 503 tant qu'il ne l'est pas.
+        """
+        import asyncio
+        from fastapi import FastAPI
+        from app.api.routes import recommandations
+        from app.main import component_not_ready_handler
+        from app.utils.readiness import ComponentNotReadyError, ComponentRegistry
+
+        class FakeValidation:
+            def check_for_red_flags(self, text):
+                return False
+
+        class FakeNLP:
+            async def analyze_many(self, inputs):
+                return [{"user_embedding": [1.0], "structured_analysis": {"symptoms": []}} for _ in inputs]
+
+        class FakeRecommender:
+            async def recommend_many(self, analyses):
+                return [[{"practice_name": "Yoga", "relevance_score": 1.0, "matched_symptoms": []}] for _ in analyses]
+
+        async def load():
+            registry = ComponentRegistry()
+            registry.register("validation_service", FakeValidation)
+            registry.register("nlp_analyzer", FakeNLP)
+            registry.register("recommender", FakeRecommender)
+            registry.start()
+            await registry.wait()
+            return registry
+
+        app = FastAPI()
+        app.include_router(recommandations.router)
+        app.add_exception_handler(ComponentNotReadyError, component_not_ready_handler)
+        app.state.components = asyncio.run(load())
+
+        with TestClient(app) as client:
+            response = client.post("/recommendations/batch", json={"items": [{"session_id": "s1", "text": "stress"}]})
+            assert response.status_code == 200
+            assert json.loads(response.text.splitlines()[0])["status"] == "ok"
+
+            response = client.post("/recommendations/batch", json={"items": [{"session_id": "s1", "text": "stress"}],
+                                                                   "generate_advice": True})
+            assert response.status_code == 503
@@ -0,0 +1,75 @@
+from fuzzywuzzy import fuzz
+
+from app.services.red_flags import RED_FLAGS, RedFlagDetector, fold
+
+# Entrées signalées par l'ancien contrôle (sous-chaîne puis partial_ratio pour chaque expression)
+LEGACY_POSITIVES = [
+    "suicidaire", "thoracique", "saignement", "confusion", "souffle", "respirer", "poitrine",
+    "hémoragie", "engourdissement", "j'ai des pensées suicidaires", "se faire du mal",
+    "difficulté à respirer depuis hier", "hier j'ai eu une hemorragie nasale importante",
+    "j'ai eu un évanouisement hier soir au travail", "Depuis ce matin j'ai une Douleur Thoracique intense",
+]
+LEGACY_NEGATIVES = [
+    "j'ai du mal à respirer", "Je dors mal et je suis stressé au travail depuis des semaines.",
+    "j'ai mal au dos", "je me sens mal",
+]
+
+
+def legacy_check(text):
+    text_lower = text.lower()
+    return any(flag in text_lower or fuzz.partial_ratio(text_lower, flag) > 80 for flag in RED_FLAGS)
+
+
+def test_exact_match_reports_span_in_original_text():
+    detector = RedFlagDetector()
+    text = "Depuis ce matin j'ai une Douleur Thoracique intense"
+    match = detector.detect(text)
+
+    assert match.flag == "douleur thoracique"
+    assert match.score == 100
+    assert text[match.start:match.end] == "Douleur Thoracique"
+
+
+def test_typos_and_missing_accents_are_detected():
+    detector = RedFlagDetector()
+    assert detector.detect("j'ai une dificulte a respirer").flag == "difficulté à respirer"
+    assert detector.detect("engourdisement du bras gauche").flag == "engourdissement bras"
+    assert detector.detect("perte de consience hier soir").flag == "perte de conscience"
+
+
+def test_benign_text_has_no_red_flag():
+    detector = RedFlagDetector()
+    assert detector.detect("Je dors mal et je suis stressé au travail depuis des semaines.") is None
+    assert detector.detect("") is None
+
+
+def test_large_vocabulary_keeps_matches():
+    extra = [f"symptome rare numero {i:03d}" for i in range(500)]
+    detector = RedFlagDetector(RED_FLAGS + extra)
+
+    assert len(detector) == len(RED_FLAGS) + 500
+    assert detector.detect("on note un symptome rare numero 421 ce jour").flag == "symptome rare numero 421"
+    assert detector.detect("souffle cour et fatigue").flag == "souffle court"
+
+
+def test_fold_preserves_positions():
+    assert fold("Évanouissement") == "evanouissement"
+    assert len(fold("œdème à l'épaule")) == len("œdème à l'épaule")
+
+
+def test_same_decisions_as_the_legacy_check():
+    detector = RedFlagDetector()
+    for text in LEGACY_POSITIVES + LEGACY_NEGATIVES:
+        assert (detector.detect(text) is not None) == legacy_check(text), text
+    assert all(legacy_check(text) for text in LEGACY_POSITIVES)
+
+
+def test_partial_phrases_and_whole_word_only_flags():
+    detector = RedFlagDetector()
+    match = detector.detect("suicidaire")
+    assert match.flag == "pensées suicidaires" and (match.start, match.end) == (0, len("suicidaire"))
+    assert detector.detect("thoracique").flag == "douleur thoracique"
+    # "faire du mal" exige une occurrence exacte en mots entiers
+    assert detector.detect("j'ai du mal à respirer") is None
+    assert detector.detect("parfaire du maladroit") is None
+    assert detector.detect("envie de me faire du mal").flag == "faire du mal"
@@ -0,0 +1,103 @@
+import asyncio
+import numpy as np
+from qdrant_client import AsyncQdrantClient, models
+
+from app.services.retrieval import HybridRetriever, RetrievedDocument, weighted_rrf
+from app.services.sparse_index import SparseIndex
+from app.utils.text import normalize_practice_id
+
+TEXTS = [
+    "Le yoga améliore la souplesse et réduit le stress.",
+    "La méditation aide à mieux dormir.",
+    "L'acupuncture soulage certaines douleurs chroniques.",
+    "La sophrologie accompagne la gestion de l'anxiété.",
+]
+# La sophrologie n'est pas étiquetée (corpus ingéré avant l'étiquetage des pratiques)
+PRACTICE_IDS = ["yoga", "meditation", "acupuncture", None]
+
+
+def _metadata(i):
+    metadata = {"file_name": f"doc{i}.pdf", "raw_html": "<html>"}
+    if PRACTICE_IDS[i]:
+        metadata["practice_id"] = PRACTICE_IDS[i]
+    return metadata
+
+
+async def _collection():
+    client = AsyncQdrantClient(":memory:")
+    await client.create_collection("docs", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    await client.upsert("docs", points=[
+        models.PointStruct(id=i, vector=np.eye(4)[i].tolist(),
+                           payload={"page_content": text, "metadata": _metadata(i)})
+        for i, text in enumerate(TEXTS)
+    ])
+    return client
+
+
+def _retrieve(embed_queries, queries, practice_ids=None, **kwargs):
+    async def scenario():
+        retriever = HybridRetriever(await _collection(), "docs", embed_queries, sparse_index=_sparse_index(), **kwargs)
+        return await retriever.retrieve_many(queries, practice_ids)
+    return asyncio.run(scenario())
+
+
+class SlowClient:
+    """Client Qdrant dont la recherche ne répond jamais à temps."""
+    async def query_batch_points(self, **kwargs):
+        await asyncio.sleep(10)
+
+
+def _sparse_index():
+    return SparseIndex.build({"id": str(i), "page_content": text, "metadata": _metadata(i)} for i, text in enumerate(TEXTS))
+
+
+def test_weighted_rrf_merges_duplicates():
+    a, b, c = (RetrievedDocument(t, {}) for t in "abc")
+    fused = weighted_rrf([[a, b], [b, c]], weights=[0.5, 0.5])
+    assert [d.page_content for d in fused] == ["b", "a", "c"]
+
+
+def test_queries_are_embedded_and_searched_in_one_batch():
+    embed_calls = []
+
+    def embed_queries(queries):
+        embed_calls.append(list(queries))
+        return [np.eye(4)[0].tolist(), np.eye(4)[1].tolist()]
+
+    results = _retrieve(embed_queries, ["yoga souplesse", "méditation dormir"], k=2)
+
+    assert len(embed_calls) == 1
+    assert results[0][0].page_content == TEXTS[0]
+    assert results[1][0].page_content == TEXTS[1]
+    # Seuls les champs utiles du payload sont renvoyés par Qdrant
+    assert results[0][0].metadata == {"file_name": "doc0.pdf"}
+
+
+def test_failed_embedding_falls_back_to_bm25():
+    results = _retrieve(lambda queries: [[] for _ in queries], ["acupuncture douleurs"], k=1)
+    assert [d.page_content for d in results[0]] == [TEXTS[2]]
+
+
+def test_dense_timeout_falls_back_to_bm25():
+    retriever = HybridRetriever(SlowClient(), "docs", lambda queries: [np.eye(4)[0].tolist()],
+                                sparse_index=_sparse_index(), k=1, timeout=0.05)
+    results = asyncio.run(retriever.retrieve_many(["acupuncture douleurs"]))
+    assert [d.page_content for d in results[0]] == [TEXTS[2]]
+
+
+def test_practice_ids_are_normalized():
+    assert normalize_practice_id("Méditation") == "meditation"
+    assert normalize_practice_id("  Massage Bien-être ") == "massage-bien-etre"
+
+
+def test_retrieval_is_restricted_to_the_practice_chunks():
+    # Le vecteur et les termes de la requête visent le yoga, mais la pratique demandée est la méditation
+    results = _retrieve(lambda queries: [np.eye(4)[0].tolist()], ["yoga stress"], ["meditation"], k=2)
+    assert [d.page_content for d in results[0]] == [TEXTS[1]]
+
+
+def test_untagged_practice_falls_back_to_unfiltered_retrieval():
+    results = _retrieve(lambda queries: [np.eye(4)[3].tolist(), np.eye(4)[0].tolist()],
+                        ["sophrologie anxiété", "yoga souplesse"], ["sophrologie", "yoga"], k=1)
+    assert [d.page_content for d in results[0]] == [TEXTS[3]]
+    assert [d.page_content for d in results[1]] == [TEXTS[0]]
@@ -0,0 +1,83 @@
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from app.services.sparse_index import SparseIndex, load_or_build_sparse_index, scroll_documents, update_sparse_index
+
+
+def _collection(n_points):
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert("docs", points=[
+        models.PointStruct(id=i, vector=[1.0, float(i)], payload={"page_content": f"document {i} sur le yoga" if i % 2 else f"document {i} sur la méditation", "metadata": {"n": i, "practice_id": "yoga" if i % 2 else "meditation"}})
+        for i in range(n_points)
+    ])
+    return client
+
+
+def test_scroll_is_paginated_over_the_whole_collection():
+    documents = list(scroll_documents(_collection(25), "docs", batch_size=10))
+    assert sorted(int(d["id"]) for d in documents) == list(range(25))
+
+
+def test_bm25_ranks_matching_documents_and_folds_accents():
+    index = SparseIndex.build([
+        {"id": "a", "page_content": "La méditation aide à dormir", "metadata": {}},
+        {"id": "b", "page_content": "Le yoga et la meditation réduisent le stress", "metadata": {}},
+        {"id": "c", "page_content": "L'acupuncture", "metadata": {}},
+    ])
+    results = index.search_many(["Méditation pour dormir", "stress"], k=5)
+
+    assert [d.page_content for d in results[0]] == ["La méditation aide à dormir", "Le yoga et la meditation réduisent le stress"]
+    assert [d.page_content for d in results[1]] == ["Le yoga et la meditation réduisent le stress"]
+    assert index.search_many(["inconnu"], k=5) == [[]]
+
+
+def test_persisted_index_is_reused_then_rebuilt_when_stale(tmp_path):
+    client = _collection(6)
+    index = load_or_build_sparse_index(client, "docs", tmp_path / "sparse", batch_size=4)
+    assert index.n_docs == 6 and isinstance(index.doc_ids, np.memmap)
+
+    client.upsert("docs", points=[models.PointStruct(id=99, vector=[1.0, 0.0], payload={"page_content": "sophrologie"})])
+    rebuilt = load_or_build_sparse_index(client, "docs", tmp_path / "sparse")
+    assert rebuilt.n_docs == 7
+    assert rebuilt.search_many(["sophrologie"], k=1)[0][0].page_content == "sophrologie"
+
+
+def test_same_count_content_change_triggers_a_rebuild(tmp_path):
+    client = _collection(6)
+    load_or_build_sparse_index(client, "docs", tmp_path / "sparse")
+
+    # Chunk remplacé et pratique ré-étiquetée : le nombre de points ne change pas
+    client.upsert("docs", points=[models.PointStruct(id=2, vector=[1.0, 2.0], payload={"page_content": "sophrologie", "metadata": {"practice_id": "sophrologie"}})])
+    client.set_payload("docs", payload={"metadata": {"practice_id": "tai-chi"}}, points=[3])
+    rebuilt = load_or_build_sparse_index(client, "docs", tmp_path / "sparse")
+
+    assert rebuilt.n_docs == 6
+    assert [d.page_content for d in rebuilt.search_many(["sophrologie"], k=5, practice_ids=["sophrologie"])[0]] == ["sophrologie"]
+    assert [d.page_content for d in rebuilt.search_many(["document"], k=5, practice_ids=["tai-chi"])[0]] == ["document 3 sur le yoga"]
+
+
+def test_incremental_update_matches_a_full_rebuild(tmp_path):
+    documents = list(scroll_documents(_collection(8), "docs"))
+    update_sparse_index(tmp_path / "sparse", documents[:5], "docs")
+    # Les documents déjà indexés (même id) sont ignorés
+    assert update_sparse_index(tmp_path / "sparse", documents[3:], "docs") == 8
+
+    incremental = SparseIndex.load(tmp_path / "sparse")
+    full = SparseIndex.build(documents)
+    queries = ["yoga", "méditation document 3"]
+    assert np.allclose(incremental.scores(queries), full.scores(queries))
+    # Les pratiques des documents déjà indexés sont conservées
+    assert np.allclose(incremental.scores(queries, ["meditation", "yoga"]), full.scores(queries, ["meditation", "yoga"]))
+
+
+def test_search_is_restricted_to_the_practice_postings():
+    index = SparseIndex.build(scroll_documents(_collection(6), "docs"))
+    assert list(index.practices) == ["meditation", "yoga"]
+    assert index.has_practice("yoga") and not index.has_practice("reiki")
+
+    results = index.search_many(["document yoga", "document yoga", "document"], k=10, practice_ids=["meditation", None, "reiki"])
+    assert sorted(d.page_content for d in results[0]) == [f"document {i} sur la méditation" for i in (0, 2, 4)]
+    assert len(results[1]) == 6
+    # Une pratique sans document ne renvoie rien : c'est au retriever de retomber sur la recherche non filtrée
+    assert results[2] == []
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.sufficiency_classifier import (
+    FEATURE_NAMES, SufficiencyClassifier, choose_thresholds, load_sufficiency_classifier, outcome_document,
+    text_features,
+)
+
+
+def _analysis(embedding, symptoms=()):
+    return {"structured_analysis": {"symptoms": [{"category": c, "keyword": k} for c, k in symptoms],
+                                    "urgency_level": 0.3},
+            "user_embedding": np.asarray(embedding, dtype=np.float32)}
+
+
+def _classifier(low=0.2, high=0.8):
+    # Un seul poids non nul : le nombre de marqueurs de durée
+    coef = np.zeros(2 + len(FEATURE_NAMES), dtype=np.float32)
+    coef[2 + FEATURE_NAMES.index("duration_markers")] = 3.0
+    return SufficiencyClassifier(coef, -1.5, np.zeros(len(FEATURE_NAMES)), np.ones(len(FEATURE_NAMES)),
+                                 low, high, model_version="test-model")
+
+
+def test_text_features_counts_duration_markers():
+    features = text_features("Je suis épuisé depuis des semaines, chaque nuit", _analysis([0, 0], [("sleep", "nuit")]))
+    assert features[FEATURE_NAMES.index("duration_markers")] == 4
+    assert features[FEATURE_NAMES.index("symptoms")] == 1
+
+
+def test_only_the_uncertain_band_is_left_undecided():
+    classifier = _classifier()
+    assert classifier.decide(classifier.predict_proba("fatigué depuis des semaines, chaque matin", _analysis([1, 0]))) is True
+    assert classifier.decide(classifier.predict_proba("fatigué", _analysis([1, 0]))) is False
+    assert classifier.decide(0.5) is None
+    # Embedding d'une autre dimension (modèle changé) : pas de décision locale
+    assert classifier.predict_proba("fatigué", _analysis([1, 0, 0])) is None
+
+
+def test_choose_thresholds_reaches_target_precision():
+    probabilities = np.array([0.05, 0.1, 0.3, 0.45, 0.55, 0.7, 0.9, 0.95])
+    labels = np.array([False, False, True, False, True, False, True, True])
+    low, high = choose_thresholds(probabilities, labels, target_precision=1.0)
+    assert (low, high) == (0.1, 0.9)
+
+
+def test_saved_classifier_round_trips(tmp_path):
+    path = tmp_path / "sufficiency.npz"
+    _classifier().save(path)
+    settings = SimpleNamespace(SUFFICIENCY_CLASSIFIER_ENABLED=True, SUFFICIENCY_MODEL_PATH=str(path),
+                               EMBEDDING_MODEL_NAME="test-model")
+
+    loaded = load_sufficiency_classifier(settings)
+    assert (loaded.low, loaded.high, loaded.embedding_dim) == (0.2, 0.8, 2)
+    # Classifieur entraîné pour un autre modèle d'embedding : désactivé
+    assert load_sufficiency_classifier(SimpleNamespace(**{**vars(settings), "EMBEDDING_MODEL_NAME": "other"})) is None
+
+
+def test_logged_outcome_keeps_classifier_inputs_but_not_the_text():
+    text = "Je suis épuisé depuis des semaines"
+    document = outcome_document(text, _analysis([0.5, 0.5]), {"status": "ok", "confidence_score": 0.9}, "test-model")
+
+    assert text not in str(document)
+    assert len(document["text_sha256"]) == 64
+    assert document["embedding"] == [0.5, 0.5]
+    assert document["features"] == text_features(text, _analysis([0.5, 0.5])).tolist()
+    assert document["context_sufficient"] is True
+    assert outcome_document(text, {"structured_analysis": {}, "user_embedding": None}, {"status": "ok"}, "m") is None
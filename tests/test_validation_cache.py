@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.validation_cache import ValidationCache
+
+
+class FakeRedis:
+    """Client Redis factice (sous-ensemble asynchrone get/set)."""
+    def __init__(self, fail=False):
+        self.data = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.data[key] = value
+
+
+def _agent(calls, delay=0.05):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {"status": "ok", "corrected_text": "Je dors mal.", "confidence_score": 0.9, "source": "llm"}
+    return compute
+
+
+def test_concurrent_duplicates_make_one_call():
+    calls = []
+    cache = ValidationCache(prompt_version="v1")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("je dors mal", _agent(calls)) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert [computed for _, computed in results].count(True) == 1
+    assert all(result["status"] == "ok" for result, _ in results)
+
+
+def test_redis_tier_is_shared_and_keyed_by_normalized_text_and_prompt():
+    calls, redis = [], FakeRedis()
+    first = ValidationCache(prompt_version="v1", redis_client=redis)
+    other_worker = ValidationCache(prompt_version="v1", redis_client=redis)
+    new_prompt = ValidationCache(prompt_version="v2", redis_client=redis)
+
+    asyncio.run(first.get_or_compute("je dors  mal ", _agent(calls)))
+    result, computed = asyncio.run(other_worker.get_or_compute("je dors mal", _agent(calls)))
+    assert (result["corrected_text"], computed, len(calls)) == ("Je dors mal.", False, 1)
+
+    asyncio.run(new_prompt.get_or_compute("je dors mal", _agent(calls)))
+    assert len(calls) == 2
+
+
+def test_redis_failure_falls_back_to_process_cache_and_skips_uncacheable():
+    calls = []
+    cache = ValidationCache(prompt_version="v1", redis_client=FakeRedis(fail=True))
+
+    asyncio.run(cache.get_or_compute("je dors mal", _agent(calls)))
+    asyncio.run(cache.get_or_compute("je dors mal", _agent(calls)))
+    assert len(calls) == 1
+
+    asyncio.run(cache.get_or_compute("autre texte", _agent(calls), cacheable=lambda r: False))
+    asyncio.run(cache.get_or_compute("autre texte", _agent(calls), cacheable=lambda r: False))
+    assert len(calls) == 3
@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.services.validation_pipeline import run_validation_pipeline, text_similarity
+
+
+class FakeValidationService:
+    """Agent de validation factice : répond `result` après `delay` secondes."""
+    def __init__(self, result, delay=0.05):
+        self.result = result
+        self.delay = delay
+        self.sufficiency_classifier = None
+
+    async def validate_and_process_input(self, text, nlp_analysis=None):
+        await asyncio.sleep(self.delay)
+        return dict(self.result, corrected_text=self.result.get("corrected_text", text))
+
+
+class FakeAnalyzer:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.texts, self.completed = [], []
+
+    async def analyze_free_text(self, text):
+        self.texts.append(text)
+        await asyncio.sleep(self.delay)
+        self.completed.append(text)
+        return {"structured_analysis": {"symptoms": []}, "user_embedding": np.ones(2, dtype=np.float32)}
+
+
+class FakeRecommender:
+    async def recommend(self, nlp_analysis):
+        return [{"practice_name": "Yoga"}]
+
+
+def _run(validation_service, analyzer, mode):
+    return asyncio.run(run_validation_pipeline("j'ai du mal a dormir depuis un mois", validation_service,
+                                               analyzer, FakeRecommender(), mode=mode))
+
+
+def test_speculative_result_is_reused_when_text_is_unchanged():
+    analyzer = FakeAnalyzer()
+    result = _run(FakeValidationService({"status": "ok"}), analyzer, "speculative")
+
+    assert result.recommendations == [{"practice_name": "Yoga"}]
+    assert analyzer.texts == ["j'ai du mal a dormir depuis un mois"]
+
+
+def test_heavily_corrected_text_is_analyzed_again():
+    analyzer = FakeAnalyzer()
+    corrected = "Je souffre d'insomnie chronique depuis plusieurs semaines."
+    result = _run(FakeValidationService({"status": "ok", "corrected_text": corrected}), analyzer, "speculative")
+
+    assert analyzer.texts[-1] == corrected
+    assert result.nlp_analysis is not None
+
+
+@pytest.mark.parametrize("status", ["emergency", "insufficient"])
+def test_speculative_work_is_abandoned(status):
+    analyzer = FakeAnalyzer(delay=0.2)
+    result = _run(FakeValidationService({"status": status}, delay=0.01), analyzer, "speculative")
+
+    assert result.nlp_analysis is None and result.recommendations is None
+    assert analyzer.completed == []
+
+
+def test_speculative_mode_overlaps_analysis_with_validation():
+    elapsed = {}
+    for mode in ("sequential", "speculative"):
+        started = time.perf_counter()
+        _run(FakeValidationService({"status": "ok"}, delay=0.1), FakeAnalyzer(delay=0.1), mode)
+        elapsed[mode] = time.perf_counter() - started
+
+    assert elapsed["sequential"] >= 0.2
+    assert elapsed["speculative"] < 0.18
+
+
+def test_text_similarity_ignores_whitespace():
+    assert text_similarity("mal  au dos ", "mal au dos") == 1.0
+    assert text_similarity("mal au dos", "douleurs lombaires") < 0.9
@@ -0,0 +1,24 @@
+from app.services.vocabulary import DEFAULT_URGENCY, VocabularyMatcher
+from app.utils.aho_corasick import AhoCorasick
+
+
+def test_aho_corasick_reports_overlapping_matches():
+    automaton = AhoCorasick([("he", 1), ("she", 2), ("hers", 3), ("his", 4)])
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+
+def test_vocabulary_matcher_matches_substring_semantics():
+    """
+    Même résultat que les anciens tests de sous-chaînes : symptômes sans doublons,
+    urgence la plus élevée parmi les marqueurs trouvés.
+    """
+    matcher = VocabularyMatcher(
+        {"sleep": ["insomnie", "sommeil"], "stress_anxiety": ["stress", "anxiété"]},
+        {"high": ["insupportable"], "medium": ["gênant"], "low": ["léger"]},
+    )
+    symptoms, urgency = matcher.match("Un STRESS léger, du stress et une insomnie insupportable")
+
+    assert sorted((s["category"], s["keyword"]) for s in symptoms) == [("sleep", "insomnie"), ("stress_anxiety", "stress")]
+    assert urgency == 0.9
+    assert matcher.match("rien à signaler") == ([], DEFAULT_URGENCY)